@@ -10,6 +10,7 @@ from crashed import shared
 
 def predict_alcohol(
         inference_app: hml.HmlInferenceApp,
+        model_container: hml.ModelContainer,
         params: Dict[str, str]):
 
     logging.info("predict_alcohol")
@@ -19,23 +20,16 @@ def predict_alcohol(
         if k not in params:
             params[k] = shared.default_features[k]
 
-    # Translate features to a dataframe
-    features_df = pd.DataFrame([params])
-
     try:
-        # # Now we turn it into a matrix, ready for some XTREME boosting
-        # feature_matrix = shared.build_feature_matrix(
-        #     model_container, features_df, throw_on_missing=True
-        # )
-
-        # Ask the model to do the predictions
-        predictions = [v for v in model_container.model.predict(feature_matrix)]
+        # Ask the model for a prediction, encoding the request directly rather than
+        # via a single row dataframe (and using the app's prediction cache, if enabled)
+        prediction = inference_app.predict_with(model_container, params, throw_on_missing=True)
 
         return jsonify(
             {
                 "success": True,
                 "features": params,
-                "prediction": f"{predictions[0]}",
+                "prediction": f"{prediction}",
             }
         )
     except Exception as ex:
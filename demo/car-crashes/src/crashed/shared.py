@@ -39,15 +39,22 @@ FEATURES_CATEGORICAL: List[str] = [
 
 TARGET = "alcohol_related"
 
-def build_feature_matrix(model_container, data_frame: pd.DataFrame, throw_on_missing=False):
+def build_feature_matrix(model_container, data_frame: pd.DataFrame, throw_on_missing=False, sparse=False):
     """
         Given an input dataframe, encode the categorical features (one-hot)
         and use the numeric features without change.  If we see a value in our
         dataframe, and "throw_on_missing" == True, then we will throw an exception
-        as the mapping back to the original matrix wont make sense.
+        as the mapping back to the original matrix wont make sense.  If "sparse"
+        == True, we build a scipy CSR matrix with the same columns instead (see
+        `ModelContainer.build_training_matrix`).
     """
     logging.info(f"build_feature_matrix: {model_container.name}")
 
+    if sparse:
+        return model_container.get_encoder().encode_matrix(
+            data_frame, throw_on_missing=throw_on_missing, sparse=True
+        )
+
     # Now lets do the encoding thing...
     encoded_df = one_hot_encode(
         data_frame, model_container.feature_uniques, throw_on_missing=throw_on_missing
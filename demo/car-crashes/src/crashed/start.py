@@ -3,6 +3,7 @@ import os
 from typing import Dict, List
 from hypermodel import hml
 from flask import request
+from hypermodel.hml.prediction.routes.routing import request_routing, version_headers
 
 # Import my local modules
 from crashed import shared, pipeline, inference
@@ -115,7 +116,8 @@ def main():
     def crashed_inference(inference_app: hml.HmlInferenceApp):
         # Get a reference to the current version of my model
         model_container = inference_app.get_model(shared.MODEL_NAME)
-        model_container.load()
+        # Memory map the model, so that inference workers share a single copy
+        model_container.load(mmap_mode="r")
 
         # Define our routes here, which can then call other functions with more
         # context
@@ -124,7 +126,11 @@ def main():
             logging.info("api: /predict")
 
             feature_params = request.args.to_dict()
-            return inference.predict_alcohol(inference_app, model_container, feature_params)
+            # The version asked for (or routed to) by the request's headers, as for /predict/batch
+            model = inference_app.select_model(model_container.name, **request_routing(request.headers))
+            response = inference.predict_alcohol(inference_app, model, feature_params)
+            response.headers.extend(version_headers(model))
+            return response
 
     @hml.deploy_inference(app.inference)
     def deploy_inference(deployment: hml.HmlInferenceDeployment):
@@ -5,6 +5,7 @@ from hypermodel import hml
 from titanic import shared, pipeline, inference
 import os
 from flask import request
+from hypermodel.hml.prediction.routes.routing import request_routing, version_headers
 
 
 def main():
@@ -93,7 +94,11 @@ def main():
             logging.info("api: /predict")
 
             feature_params = request.args.to_dict()
-            return inference.predict_survival(inference_app, model_container, feature_params)
+            # The version asked for (or routed to) by the request's headers, as for /predict/batch
+            model = inference_app.select_model(model_container.name, **request_routing(request.headers))
+            response = inference.predict_survival(inference_app, model, feature_params)
+            response.headers.extend(version_headers(model))
+            return response
 
     @hml.deploy_inference(app.inference)
     def deploy_inference(deployment: hml.HmlInferenceDeployment):
@@ -0,0 +1,143 @@
+"""
+Benchmark the cost of serving predictions through `/predict/batch` with JSON
+compared to MessagePack payloads, for both single rows and batches, including
+the time clients spend encoding requests and decoding responses.  Each comparison
+sends the same shape of payload in both formats, so that the predictions are made
+the same way (a single row through `HmlInferenceApp.predict`, and batches through
+the vectorized path) and only the payload handling differs.
+
+The features are numeric heavy, as sent by our internal callers, and the model
+is a stand in (a weighted sum) so that the payload handling dominates.
+
+Usage:
+    python benchmarks/binary_payloads.py [iterations] [batch_rows]
+"""
+import sys
+import time
+import json
+import click
+import msgpack
+import numpy
+import pandas as pd
+from typing import Callable, List
+
+from hypermodel.hml.hml_inference_app import HmlInferenceApp
+from hypermodel.hml.model_container import ModelContainer
+
+FEATURES_NUMERIC = [f"numeric_{i}" for i in range(48)]
+FEATURES_CATEGORICAL = ["day_of_week", "speed_zone"]
+
+
+class WeightedSumModel:
+    def __init__(self, width: int):
+        self.weights = numpy.random.rand(width)
+
+    def predict(self, matrix):
+        return matrix @ self.weights
+
+
+def build_app(rows: int) -> HmlInferenceApp:
+    @click.group()
+    def cli_root():
+        pass
+
+    app = HmlInferenceApp(
+        name="benchmark",
+        services=object(),
+        cli=cli_root,
+        image_url="benchmark",
+        package_entrypoint="benchmark",
+        port=8000,
+        k8s_namespace="benchmark",
+        envs=dict(),
+    )
+
+    container = ModelContainer(
+        name="benchmark",
+        project_name="benchmark",
+        features_numeric=FEATURES_NUMERIC,
+        features_categorical=FEATURES_CATEGORICAL,
+        target="target",
+        services=None,
+    )
+    container.analyze_distributions(build_features(rows))
+    container.bind_model(WeightedSumModel(container.get_encoder().width))
+    app.models[container.name] = container
+    return app
+
+
+def build_features(rows: int) -> pd.DataFrame:
+    data = {f: numpy.random.rand(rows) * 100 for f in FEATURES_NUMERIC}
+    data["day_of_week"] = [f"day-{v}" for v in numpy.random.randint(0, 7, rows)]
+    data["speed_zone"] = [f"zone-{v}" for v in numpy.random.randint(0, 12, rows)]
+    return pd.DataFrame(data)
+
+
+def post_json(client, payload):
+    response = client.post("/predict/batch", data=json.dumps(payload), content_type="application/json")
+    return json.loads(response.data)
+
+
+def post_msgpack(client, payload):
+    response = client.post("/predict/batch", data=msgpack.packb(payload), content_type="application/msgpack")
+    return msgpack.unpackb(response.data)
+
+
+def measure(func: Callable, client, payloads: List) -> List[float]:
+    timings = []
+    for payload in payloads:
+        start = time.perf_counter()
+        func(client, payload)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(title: str, client, cases):
+    print(title)
+    for name, func, payloads in cases:
+        timings = measure(func, client, payloads)
+        p50, p99 = numpy.percentile(timings, [50, 99])
+        print(f"  {name:<20} p50: {p50:8.3f}ms  p99: {p99:8.3f}ms")
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    batch_rows = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+
+    app = build_app(5000)
+    client = app.flask.test_client()
+
+    rows = build_features(iterations).to_dict(orient="records")
+    batch = build_features(batch_rows)
+    records = batch.to_dict(orient="records")
+    columns = batch.to_dict(orient="list")
+    batches = max(1, iterations // 50)
+
+    # Make sure every format (and path) agrees before timing them
+    single = [post_json(client, row) for row in rows[:20]]
+    assert numpy.allclose(single, [post_msgpack(client, row) for row in rows[:20]])
+    assert numpy.allclose(single, [post_json(client, [row])[0] for row in rows[:20]])
+    expected = post_json(client, records)
+    assert numpy.allclose(expected, post_msgpack(client, records))
+    assert numpy.allclose(expected, post_msgpack(client, columns))
+    assert numpy.allclose(expected, post_json(client, columns))
+
+    report(
+        f"Single row predictions ({len(FEATURES_NUMERIC)} numeric features, {iterations} requests)",
+        client,
+        [("JSON object", post_json, rows), ("MessagePack map", post_msgpack, rows)],
+    )
+    report(
+        f"Batch predictions ({batch_rows} rows, {batches} requests)",
+        client,
+        [
+            ("JSON rows", post_json, [records] * batches),
+            ("MessagePack rows", post_msgpack, [records] * batches),
+            ("JSON columns", post_json, [columns] * batches),
+            ("MessagePack columns", post_msgpack, [columns] * batches),
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark the latency of encoding a single inference request, comparing the
+DataFrame path (`pd.DataFrame([params])` -> `one_hot_encode`) with the dict based
+`ModelContainer.encode_row` fast path.
+
+The features are shaped like the car-crashes demo, with a couple of high
+cardinality categorical features.
+
+Usage:
+    python benchmarks/encode_row.py [iterations]
+"""
+import sys
+import time
+import numpy
+import pandas as pd
+from typing import Callable, Dict, List
+
+from hypermodel.hml.model_container import ModelContainer
+from hypermodel.features import one_hot_encode
+
+FEATURES_NUMERIC = [f"numeric_{i}" for i in range(12)]
+CARDINALITY = {
+    "accident_time": 1400,
+    "dca_code": 80,
+    "accident_type": 9,
+    "day_of_week": 7,
+    "hit_run_flag": 2,
+    "light_condition": 7,
+    "road_geometry": 9,
+    "speed_zone": 12,
+}
+
+
+def build_training_data(rows: int) -> pd.DataFrame:
+    data = {f: numpy.random.randint(0, 10, rows) for f in FEATURES_NUMERIC}
+    for feature, count in CARDINALITY.items():
+        data[feature] = [f"{feature}-{v}" for v in numpy.random.randint(0, count, rows)]
+    return pd.DataFrame(data)
+
+
+def build_container(training_df: pd.DataFrame) -> ModelContainer:
+
+    container = ModelContainer(
+        name="benchmark",
+        project_name="benchmark",
+        features_numeric=FEATURES_NUMERIC,
+        features_categorical=list(CARDINALITY.keys()),
+        target="target",
+        services=None,
+    )
+    container.analyze_distributions(training_df)
+    return container
+
+
+def dataframe_path(container: ModelContainer, params: Dict[str, str]):
+    features_df = pd.DataFrame([params])
+    encoded_df = one_hot_encode(features_df, container.feature_uniques, throw_on_missing=True)
+    for nf in container.features_numeric:
+        encoded_df[nf] = features_df[nf]
+    return encoded_df.values
+
+
+def row_path(container: ModelContainer, params: Dict[str, str]):
+    return container.encode_row(params, throw_on_missing=True)
+
+
+def measure(func: Callable, container: ModelContainer, requests: List[Dict[str, str]]) -> List[float]:
+    timings = []
+    for params in requests:
+        start = time.perf_counter()
+        func(container, params)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    training_df = build_training_data(5000)
+    container = build_container(training_df)
+
+    # Requests arrive as query string parameters, so every value is a string
+    requests = training_df.sample(iterations, replace=True).astype(str).to_dict(orient="records")
+
+    # Make sure both paths agree before timing them
+    for params in requests[:50]:
+        expected = numpy.asarray(dataframe_path(container, params), dtype=float)
+        assert (expected == row_path(container, params)).all()
+
+    print(f"Encoding {iterations} single row requests ({container.get_encoder().width} columns)")
+    for name, func in [("DataFrame", dataframe_path), ("encode_row", row_path)]:
+        timings = measure(func, container, requests)
+        p50, p99 = numpy.percentile(timings, [50, 99])
+        print(f"  {name:<12} p50: {p50:8.3f}ms  p99: {p99:8.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Benchmark loading CSVs into SQLite, comparing the pandas round-trip (`read_csv` ->
+`to_sql` on a connection of its own, committing once) with `SqliteDataWarehouse.import_csv`,
+both reading the whole file and streaming it (`bulk=True`), for the time taken and the
+peak memory allocated.
+
+The CSVs are generated with the columns of the tragic-titanic and car-crashes demo
+datasets, scaled up to millions of rows.
+
+Usage:
+    python benchmarks/sqlite_import.py [rows] [chunk_rows]
+"""
+import os
+import sys
+import sqlite3
+import time
+import types
+import numpy
+import tempfile
+import tracemalloc
+import pandas as pd
+from typing import Callable, Dict
+
+from hypermodel.platform.local.data_warehouse import SqliteDataWarehouse
+
+CRASH_NUMERIC = [
+    "inj_or_fatal",
+    "fatality",
+    "males",
+    "females",
+    "driver",
+    "pedestrian",
+    "old_driver",
+    "young_driver",
+    "unlicencsed",
+    "heavyvehicle",
+    "passengervehicle",
+    "motorcycle",
+]
+CRASH_CARDINALITY = {
+    "accident_time": 1400,
+    "accident_type": 9,
+    "day_of_week": 7,
+    "dca_code": 80,
+    "hit_run_flag": 2,
+    "light_condition": 7,
+    "road_geometry": 9,
+    "speed_zone": 12,
+}
+
+
+def build_titanic(rows: int) -> pd.DataFrame:
+    age = numpy.round(numpy.random.rand(rows) * 80, 1)
+    age[numpy.random.rand(rows) < 0.2] = numpy.nan
+    return pd.DataFrame(
+        {
+            "Survived": numpy.random.randint(0, 2, rows),
+            "Pclass": numpy.random.randint(1, 4, rows),
+            "Name": [f"Passenger {v}" for v in numpy.random.randint(0, 100000, rows)],
+            "Sex": numpy.where(numpy.random.rand(rows) < 0.5, "male", "female"),
+            "Age": age,
+            "Siblings/Spouses Aboard": numpy.random.randint(0, 6, rows),
+            "Parents/Children Aboard": numpy.random.randint(0, 5, rows),
+            "Fare": numpy.round(numpy.random.rand(rows) * 500, 4),
+        }
+    )
+
+
+def build_crashes(rows: int) -> pd.DataFrame:
+    data = {f: numpy.random.randint(0, 4, rows) for f in CRASH_NUMERIC}
+    for feature, count in CRASH_CARDINALITY.items():
+        data[feature] = [f"{feature}-{v}" for v in numpy.random.randint(0, count, rows)]
+    data["alcohol_related"] = numpy.random.randint(0, 2, rows)
+    return pd.DataFrame(data)
+
+
+def to_sql(csv: str, db: str, table: str):
+    # The default isolation level, so the inserts share the transaction `to_sql` commits
+    connection = sqlite3.connect(db)
+    try:
+        pd.read_csv(csv).to_sql(table, connection, if_exists="replace")
+    finally:
+        connection.close()
+
+
+def measure(func: Callable) -> Dict[str, float]:
+    start = time.perf_counter()
+    func()
+    seconds = time.perf_counter() - start
+
+    # A second run to measure memory, as tracing allocations slows everything down
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": seconds, "peak_mb": peak / 1024 / 1024}
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 2000000
+    chunk_rows = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+
+    with tempfile.TemporaryDirectory() as folder:
+        db = os.path.join(folder, "benchmark.db")
+        warehouse = SqliteDataWarehouse(types.SimpleNamespace(default_sql_lite_db_file=db))
+
+        for name, build in [("titanic", build_titanic), ("crashes", build_crashes)]:
+            csv = os.path.join(folder, f"{name}.csv")
+            build(rows).to_csv(csv, index=False)
+            megabytes = os.path.getsize(csv) / 1024 / 1024
+            print(f"{name}: {rows} rows, {megabytes:.1f}MB of csv")
+
+            cases = [
+                ("pandas to_sql", lambda: to_sql(csv, db, f"{name}_pandas")),
+                ("import_csv", lambda: warehouse.import_csv(csv, db, f"{name}_default")),
+                (f"bulk ({chunk_rows} rows)", lambda: warehouse.import_csv(csv, db, f"{name}_bulk", bulk=True, chunk_rows=chunk_rows)),
+            ]
+            for case, func in cases:
+                result = measure(func)
+                print(f"  {case:<24} {result['seconds']:8.2f}s  peak: {result['peak_mb']:8.1f}MB")
+
+            # Make sure every load agrees
+            expected = warehouse.dataframe_from_query(f"SELECT count(*) AS c, sum(\"index\") AS s FROM {name}_pandas")
+            for table in [f"{name}_default", f"{name}_bulk"]:
+                actual = warehouse.dataframe_from_query(f"SELECT count(*) AS c, sum(\"index\") AS s FROM {table}")
+                assert expected.equals(actual)
+
+        warehouse.pool.close()
+
+
+if __name__ == "__main__":
+    main()
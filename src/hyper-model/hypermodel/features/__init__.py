@@ -1,2 +1,3 @@
 from hypermodel.features.numerical import scale_by_mean_stdev, describe_features
 from hypermodel.features.categorical import get_unique_feature_values, one_hot_encode
+from hypermodel.features.feature_encoder import FeatureEncoder
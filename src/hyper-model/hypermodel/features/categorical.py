@@ -4,8 +4,9 @@ Helper functions for dealing with categorical features
 
 import pandas as pd
 import math
-from typing import List, Dict
+from typing import List, Dict, Tuple, Union
 import numpy
+import scipy.sparse
 import math 
 
 
@@ -33,7 +34,9 @@ def get_unique_feature_values(dataframe: pd.DataFrame, features: List[str]) -> D
     return feature_uniques
 
 
-def one_hot_encode(dataframe: pd.DataFrame, uniques: Dict[str, List[str]], throw_on_missing=False) -> pd.DataFrame:
+def one_hot_encode(
+    dataframe: pd.DataFrame, uniques: Dict[str, List[str]], throw_on_missing=False, sparse=False
+) -> Union[pd.DataFrame, Tuple[scipy.sparse.csr_matrix, List[str]]]:
     """
     Create a new dataframe that one-hot-encodes values from the given dataframe
     against the known list of unique feature values (calculated using `get_unique_feature_values`).
@@ -45,26 +48,102 @@ def one_hot_encode(dataframe: pd.DataFrame, uniques: Dict[str, List[str]], throw
             `uniques` dict(), and this parameter is True, we will throw an Exception to prevent 
             further execution.  When encoding unseen data against known data, this can be useful
             to ensure you are not predicting using unseen data.
+        sparse (bool): If True, return a `scipy.sparse.csr_matrix` and its column names
+            rather than a DataFrame, which is far smaller for high cardinality features
     Returns:
         A new DataFrame with each Feature/Value pair as a new column with a "1" where
-        the row contains the features value, and a "0" where it does not
+        the row contains the features value, and a "0" where it does not.  If `sparse`
+        is True, a tuple of the CSR matrix and the list of column names is returned instead.
 
     """
-    new_frame = pd.DataFrame()
-    for feature in uniques:
-        feature_value_list = uniques[feature]
-
-        # Validate that our values are actually in our seen set
-        if throw_on_missing:
-            sample_uniques = dataframe[feature].unique()
-            for s in sample_uniques:
-                if str(s) not in feature_value_list:
+    lookups = {feature: _build_value_lookup(uniques[feature]) for feature in uniques}
+
+    # Map every feature to the column index of its value once, rather than comparing
+    # the whole column against every unique value
+    codes = {
+        feature: _encode_codes(dataframe[feature], feature, lookups[feature], throw_on_missing)
+        for feature in lookups
+    }
+
+    columns = [f"{feature}:{value}" for feature in lookups for value in lookups[feature]]
+
+    if sparse:
+        return _one_hot_sparse(codes, lookups, len(dataframe)), columns
+
+    matrix = _one_hot_block(codes, lookups, len(dataframe))
+
+    return pd.DataFrame(matrix, columns=columns, index=dataframe.index)
+
+
+def _build_value_lookup(feature_value_list: List[str]) -> pd.Index:
+    """
+    Build a hash based lookup from a feature value to its position within
+    that feature's block of one-hot columns.  Duplicate values share the
+    position of their first occurrence.
+    """
+    return pd.Index(list(dict.fromkeys(feature_value_list)), dtype=object)
+
+
+def _encode_codes(series: pd.Series, feature: str, lookup: pd.Index, throw_on_missing=False, seen: set = None) -> numpy.ndarray:
+    """
+    Translate a column of raw values into integer codes using the `lookup` for
+    that feature, where values that have not been seen are given a code of -1.
+    The `seen` set of stringified values is built from `lookup` if not provided.
+    """
+    codes = lookup.get_indexer(series)
+
+    # Nulls never match a value (NaN != NaN), even if "nan" was seen before
+    codes[series.isna().values] = -1
+
+    if throw_on_missing:
+        unmatched = codes == -1
+        if unmatched.any():
+            if seen is None:
+                seen = set(str(v) for v in lookup)
+            for s in series[unmatched].unique():
+                if str(s) not in seen:
                     raise Exception(f"The value '{s}' has not been seen before in feature '{feature}', unable to one_hot_encode")
 
+    return codes
+
+
+def _one_hot_block(codes: Dict[str, numpy.ndarray], lookups: Dict[str, pd.Index], rows: int) -> numpy.ndarray:
+    """
+    Allocate the full one-hot matrix once and set a "1" at the offset of each
+    row's encoded value for every feature.
+    """
+    width = sum(len(lookups[feature]) for feature in lookups)
+    matrix = numpy.zeros((rows, width), dtype=int)
+
+    offset = 0
+    for feature in lookups:
+        feature_codes = codes[feature]
+        matched = numpy.flatnonzero(feature_codes >= 0)
+        matrix[matched, offset + feature_codes[matched]] = 1
+        offset += len(lookups[feature])
+
+    return matrix
+
+
+def _one_hot_sparse(codes: Dict[str, numpy.ndarray], lookups: Dict[str, pd.Index], rows: int) -> scipy.sparse.csr_matrix:
+    """
+    Build the one-hot matrix as a CSR matrix, storing only the "1" values.
+    """
+    width = sum(len(lookups[feature]) for feature in lookups)
+
+    row_indexes = [numpy.zeros(0, dtype=int)]
+    col_indexes = [numpy.zeros(0, dtype=int)]
+
+    offset = 0
+    for feature in lookups:
+        feature_codes = codes[feature]
+        matched = numpy.flatnonzero(feature_codes >= 0)
+        row_indexes.append(matched)
+        col_indexes.append(offset + feature_codes[matched])
+        offset += len(lookups[feature])
 
-        for feature_value in feature_value_list:
-            # Track a new column list that gets a "1" if it matches and "0" otherwise
-            one_hot_col = (dataframe[feature] == feature_value).astype(int)
-            new_frame[f"{feature}:{feature_value}"] = one_hot_col
+    row_index = numpy.concatenate(row_indexes)
+    col_index = numpy.concatenate(col_indexes)
+    data = numpy.ones(len(row_index), dtype=int)
 
-    return new_frame
+    return scipy.sparse.csr_matrix((data, (row_index, col_index)), shape=(rows, width))
@@ -0,0 +1,210 @@
+"""
+A compiled encoder for turning DataFrames into model ready matrices
+"""
+
+import pandas as pd
+import numpy
+import scipy.sparse
+from typing import List, Dict, Any
+
+from hypermodel.features.categorical import (
+    _build_value_lookup,
+    _encode_codes,
+    _one_hot_block,
+    _one_hot_sparse,
+)
+
+
+class FeatureEncoder:
+    """
+    The `FeatureEncoder` compiles the unique values of categorical features (as found by
+    `get_unique_feature_values`) and the list of numeric features into the structures
+    needed to encode data, so that they are built once rather than on every call to
+    `one_hot_encode`.  This includes a hash based lookup from each value to its column,
+    the set of values seen for each feature, and the column order and width of the
+    output matrix.
+
+    The encoded matrix always has the one-hot "feature:value" columns first, followed
+    by the numeric features, matching `ModelContainer.build_training_matrix`.
+    """
+
+    feature_uniques: Dict[str, List[str]]
+    features_numeric: List[str]
+    columns: List[str]
+    width: int
+
+    def __init__(self, feature_uniques: Dict[str, List[str]], features_numeric: List[str]):
+        """
+        Compile a new `FeatureEncoder`
+
+        Args:
+            feature_uniques (Dict[str, List[str]]): A dict keyed by categorical feature name,
+                containing a list of unique values
+            features_numeric (List[str]): The numeric features, in the order they should
+                be appended to the matrix
+        """
+        self.feature_uniques = feature_uniques
+        self.features_numeric = list(features_numeric)
+
+        self.lookups: Dict[str, pd.Index] = {
+            feature: _build_value_lookup(feature_uniques[feature]) for feature in feature_uniques
+        }
+        self.seen_values: Dict[str, set] = {
+            feature: set(str(v) for v in self.lookups[feature]) for feature in self.lookups
+        }
+
+        self.offsets: Dict[str, int] = dict()
+        offset = 0
+        for feature in self.lookups:
+            self.offsets[feature] = offset
+            offset += len(self.lookups[feature])
+
+        # Plain dict lookups straight to the output column, for encoding single rows
+        self.value_columns: Dict[str, Dict[Any, int]] = {
+            feature: {value: self.offsets[feature] + i for i, value in enumerate(self.lookups[feature])}
+            for feature in self.lookups
+        }
+
+        self.categorical_columns: List[str] = [
+            f"{feature}:{value}" for feature in self.lookups for value in self.lookups[feature]
+        ]
+        self.categorical_width = len(self.categorical_columns)
+        self.columns = self.categorical_columns + self.features_numeric
+        self.width = len(self.columns)
+
+    def encode(self, data_frame: pd.DataFrame, throw_on_missing=False) -> pd.DataFrame:
+        """
+        One-hot encode the categorical features of `data_frame` and append the numeric
+        features, returning a new DataFrame with the columns given by `columns`
+
+        Args:
+            data_frame (pd.DataFrame): The DataFrame to encode
+            throw_on_missing (bool): Throw an Exception if a categorical value has not
+                been seen before (see `one_hot_encode`)
+
+        Returns:
+            The encoded DataFrame
+        """
+        codes = self._encode_codes(data_frame, throw_on_missing)
+        matrix = _one_hot_block(codes, self.lookups, len(data_frame))
+
+        encoded_df = pd.DataFrame(matrix, columns=self.categorical_columns, index=data_frame.index)
+        for nf in self.features_numeric:
+            encoded_df[nf] = data_frame[nf]
+
+        return encoded_df
+
+    def encode_matrix(self, data_frame: pd.DataFrame, throw_on_missing=False, sparse=False):
+        """
+        Encode `data_frame` into a matrix with the columns given by `columns`
+
+        Args:
+            data_frame (pd.DataFrame): The DataFrame to encode
+            throw_on_missing (bool): Throw an Exception if a categorical value has not
+                been seen before (see `one_hot_encode`)
+            sparse (bool): If True, return a `scipy.sparse.csr_matrix`, storing the
+                numeric features as dense columns
+
+        Returns:
+            A numpy array of the encoded data (or a CSR matrix if `sparse` is True)
+        """
+        if not sparse:
+            return self.encode(data_frame, throw_on_missing=throw_on_missing).values
+
+        codes = self._encode_codes(data_frame, throw_on_missing)
+        encoded = _one_hot_sparse(codes, self.lookups, len(data_frame))
+        numeric = self._numeric_sparse_block(data_frame)
+
+        return scipy.sparse.hstack([encoded, numeric], format="csr")
+
+    def encode_row(self, features: Dict[str, Any], throw_on_missing=False, out: numpy.ndarray = None) -> numpy.ndarray:
+        """
+        Encode a single row of features given as a dict (e.g. the parameters of an
+        inference request) directly into a numpy vector, without building a DataFrame.
+        Categorical features that are absent or unseen are left as all zeros and
+        absent numeric features are set to NaN.
+
+        Args:
+            features (Dict[str, Any]): The value of each feature, keyed by feature name
+            throw_on_missing (bool): Throw an Exception if a categorical value has not
+                been seen before (see `one_hot_encode`)
+            out (numpy.ndarray): An optional preallocated float vector of length `width`
+                to write into, which will be overwritten
+
+        Returns:
+            A matrix with a single row, in the same layout as `encode_matrix`
+        """
+        if out is None:
+            row = numpy.zeros(self.width)
+        else:
+            row = out
+            row.fill(0)
+
+        for feature, value_columns in self.value_columns.items():
+            value = features.get(feature)
+            # Nulls never match a value, (NaN != NaN) as per `one_hot_encode`
+            column = value_columns.get(value) if value is not None and value == value else None
+
+            if column is not None:
+                row[column] = 1
+            elif throw_on_missing and str(value) not in self.seen_values[feature]:
+                raise Exception(f"The value '{value}' has not been seen before in feature '{feature}', unable to one_hot_encode")
+
+        for i, nf in enumerate(self.features_numeric):
+            value = features.get(nf)
+            row[self.categorical_width + i] = numpy.nan if value is None else value
+
+        return row.reshape(1, self.width)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Get a JSON serializable representation of this encoder, suitable
+        for saving alongside the model's distributions
+
+        Returns:
+            A dictionary which can be passed to `FeatureEncoder.from_dict`
+        """
+        return {
+            "feature_values": {feature: self.lookups[feature].tolist() for feature in self.lookups},
+            "features_numeric": self.features_numeric,
+            "columns": self.columns,
+            "width": self.width,
+        }
+
+    @staticmethod
+    def from_dict(obj: Dict[str, Any]) -> "FeatureEncoder":
+        """
+        Load an encoder from the dictionary created by `to_dict`
+
+        Args:
+            obj (Dict[str, Any]): The serialized encoder
+
+        Returns:
+            A new `FeatureEncoder`
+        """
+        encoder = FeatureEncoder(obj["feature_values"], obj["features_numeric"])
+        if encoder.columns != obj["columns"] or encoder.width != obj["width"]:
+            raise ValueError("The serialized FeatureEncoder columns do not match its feature values")
+        return encoder
+
+    def _encode_codes(self, data_frame: pd.DataFrame, throw_on_missing: bool) -> Dict[str, numpy.ndarray]:
+        return {
+            feature: _encode_codes(
+                data_frame[feature], feature, self.lookups[feature], throw_on_missing, self.seen_values[feature]
+            )
+            for feature in self.lookups
+        }
+
+    def _numeric_sparse_block(self, data_frame: pd.DataFrame) -> scipy.sparse.csr_matrix:
+        """
+        Wrap the numeric features as a CSR matrix which explicitly stores every
+        value (including zeros), so that sparse aware estimators do not treat a
+        numeric zero as a missing value.
+        """
+        values = numpy.asarray(data_frame[self.features_numeric].values, dtype=float)
+        rows, cols = values.shape
+
+        indptr = numpy.arange(0, rows * cols + 1, cols) if cols > 0 else numpy.zeros(rows + 1, dtype=int)
+        indices = numpy.tile(numpy.arange(cols), rows)
+
+        return scipy.sparse.csr_matrix((values.ravel(), indices, indptr), shape=(rows, cols))
@@ -12,6 +12,7 @@ from hypermodel.hml.hml_package import HmlPackage
 from hypermodel.hml.hml_pipeline_app import HmlPipelineApp
 from hypermodel.hml.hml_inference_app import HmlInferenceApp
 from hypermodel.hml.hml_inference_deployment import HmlInferenceDeployment
+from hypermodel.hml.model_container import ModelContainer
 
 from hypermodel.hml.hml_global import get_package
 
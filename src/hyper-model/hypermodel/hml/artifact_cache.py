@@ -0,0 +1,171 @@
+import logging
+import os
+import shutil
+import uuid
+
+from typing import List, Optional, Tuple
+
+from hypermodel.utilities.file_hash import file_md5
+
+
+class ArtifactCache:
+    """
+    The `ArtifactCache` is a local, content-addressed store of artifacts (such
+    as model `.joblib` files and distributions), keyed by the md5 recorded for each
+    artifact in a model's reference file.  Once an artifact has been downloaded, loading
+    any reference with the same md5 is served from the cache.  The cache is bounded in
+    size, evicting the least recently used artifacts first.
+
+    Entries are never modified in place (they are written to a temporary file and renamed),
+    so several processes may safely share the same cache directory.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        """
+        Create a new `ArtifactCache`
+
+        Args:
+            path (str): The directory to store cached artifacts in
+            max_bytes (int): The total size the cache is allowed to grow to
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+
+        if not os.path.exists(path):
+            os.makedirs(path, exist_ok=True)
+
+    def get(self, md5: str) -> Optional[str]:
+        """
+        Get the path of the cached artifact with the given md5, marking it as recently used
+
+        Args:
+            md5 (str): The md5 hash of the artifact
+
+        Returns:
+            The path to the cached artifact, or None if it is not cached
+        """
+        entry_path = self._entry_path(md5)
+        try:
+            os.utime(entry_path, None)
+            return entry_path
+        except FileNotFoundError:
+            return None
+
+    def put(self, md5: str, file_path: str) -> Optional[str]:
+        """
+        Add the file at `file_path` to the cache, if its contents match `md5`
+
+        Args:
+            md5 (str): The expected md5 hash of the file
+            file_path (str): The path of the file to add
+
+        Returns:
+            The path to the cached artifact, or None if the file did not match `md5`
+        """
+        actual_md5 = file_md5(file_path)
+        if actual_md5 != md5:
+            logging.warning(f"ArtifactCache: {file_path} has an md5 of {actual_md5}, expected {md5}, not caching")
+            return None
+
+        entry_path = self._entry_path(md5)
+        _copy_atomic(file_path, entry_path)
+        self.evict(keep=md5)
+        return entry_path
+
+    def restore(self, md5: str, destination_path: str) -> bool:
+        """
+        Place the cached artifact with the given md5 at `destination_path`, if it is cached
+        (and its contents still match `md5`, otherwise the entry is removed)
+
+        Args:
+            md5 (str): The md5 hash of the artifact
+            destination_path (str): Where the artifact is needed
+
+        Returns:
+            True if the artifact was found in the cache, False otherwise
+        """
+        entry_path = self.get(md5)
+        if entry_path is None:
+            return False
+
+        tmp_path = f"{destination_path}.{uuid.uuid4().hex}.tmp"
+        try:
+            shutil.copyfile(entry_path, tmp_path)
+
+            # Don't trust whatever is on disk (e.g. a truncated or corrupted entry)
+            actual_md5 = file_md5(tmp_path)
+            if actual_md5 != md5:
+                logging.warning(f"ArtifactCache: {entry_path} has an md5 of {actual_md5}, removing it")
+                self._remove(entry_path)
+                return False
+
+            os.replace(tmp_path, destination_path)
+            logging.info(f"ArtifactCache: {md5} found in cache -> {destination_path}")
+            return True
+        except FileNotFoundError:
+            # Evicted (by another process) since we looked it up
+            return False
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def evict(self, keep: str = None):
+        """
+        Remove the least recently used artifacts until the cache fits within `max_bytes`
+
+        Args:
+            keep (str): The md5 of an artifact which should never be evicted (e.g. the one just added)
+        """
+        entries = self._entries()
+        total = sum(size for _, _, size in entries)
+
+        for mtime, entry_path, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if os.path.basename(entry_path) == keep:
+                continue
+            self._remove(entry_path)
+            logging.info(f"ArtifactCache: evicted {entry_path}")
+            total -= size
+
+    def size(self) -> int:
+        """
+        Get the total size of all the cached artifacts, in bytes
+        """
+        return sum(size for _, _, size in self._entries())
+
+    def _remove(self, entry_path: str):
+        try:
+            os.remove(entry_path)
+        except FileNotFoundError:
+            pass
+
+    def _entry_path(self, md5: str) -> str:
+        return os.path.join(self.path, md5)
+
+    def _entries(self) -> List[Tuple[float, str, int]]:
+        entries = []
+        for name in os.listdir(self.path):
+            entry_path = os.path.join(self.path, name)
+            if name.endswith(".tmp"):
+                continue
+            try:
+                stat = os.stat(entry_path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, entry_path, stat.st_size))
+        return entries
+
+
+def _copy_atomic(from_path: str, to_path: str):
+    """
+    Atomically place a copy of `from_path` at `to_path`.  This is a copy rather
+    than a hard link, as the artifacts outside of the cache may be overwritten in place.
+    """
+    tmp_path = f"{to_path}.{uuid.uuid4().hex}.tmp"
+    try:
+        shutil.copyfile(from_path, tmp_path)
+        os.replace(tmp_path, to_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
@@ -1,16 +1,33 @@
+import asyncio
+import functools
+import inspect
 import logging
 import json
 import click
+import threading
+import numpy
+import pandas as pd
 
-from typing import Dict, List, Optional, Callable
+from typing import Dict, List, Optional, Callable, Any
+from concurrent.futures import ThreadPoolExecutor
 
 from kubernetes import client, config
 from flask import Flask, send_file
 from waitress import serve
 # from hypermodel.hml.model_container import ModelContainer
 from hypermodel.hml.prediction.routes.health import bind_health_routes
+from hypermodel.hml.prediction.routes.batch import bind_batch_routes
+from hypermodel.hml.prediction.routes.metrics import bind_metrics_routes
+from hypermodel.hml.prediction.metrics import InferenceMetrics, Counter, Gauge
+from hypermodel.hml.prediction.micro_batcher import MicroBatcher
+from hypermodel.hml.prediction.asgi_app import AsgiApp
+from hypermodel.hml.prediction.prefork_server import PreforkServer
+from hypermodel.hml.prediction.model_reloader import ModelReloader
+from hypermodel.hml.prediction.model_registry import ModelRegistry
+from hypermodel.hml.prediction.prediction_cache import PredictionCache
 from hypermodel.platform.abstract.services import PlatformServicesBase
 from hypermodel.hml.hml_inference_deployment import HmlInferenceDeployment
+from hypermodel.utilities.cpu import get_cpu_limit
 import os
 
 
@@ -59,8 +76,15 @@ class HmlInferenceApp:
         self.port = port
         self.k8s_namespace = k8s_namespace
 
-        # Bind my health related endpoints
-        bind_health_routes(self.flask)
+        # Bind my health related endpoints, only ready once initialised and warmed up (which happens
+        # while already serving, see `_initialise_in_background`), and no longer alive if that fails
+        self.ready = False
+        self.failed = False
+        bind_health_routes(self.flask, is_ready=lambda: self.ready, is_alive=lambda: not self.failed)
+        self.metrics = InferenceMetrics()
+        self.metrics.add_collector(self._collect_metrics)
+        bind_metrics_routes(self.flask, self.metrics)
+        bind_batch_routes(self.flask, self)
 
         self.image_url = image_url
         self.package_entrypoint = package_entrypoint
@@ -75,12 +99,54 @@ class HmlInferenceApp:
         self.cli_start_prod = click.command()(self.start_prod)
         self.cli_inference_group.add_command(self.cli_start_prod)
 
+        @click.command(name="start-async")
+        @click.option("--threads", default=8, help="The maximum number of requests / predictions to execute at once")
+        def cli_start_async(threads: int):
+            self.start_async(threads=threads)
+
+        self.cli_start_async = cli_start_async
+        self.cli_inference_group.add_command(self.cli_start_async)
+
+        @click.command(name="start-prefork")
+        @click.option("--workers", default=0, help="The number of worker processes (default: one per CPU of the container's limit)")
+        @click.option("--threads", default=4, help="The number of threads in each worker process")
+        def cli_start_prefork(workers: int, threads: int):
+            self.start_prefork(workers=workers or None, threads=threads)
+
+        self.cli_start_prefork = cli_start_prefork
+        self.cli_inference_group.add_command(self.cli_start_prefork)
+
         self.cli_deploy = click.command()(self.deploy)
         self.cli_inference_group.add_command(self.cli_deploy)
 
         self.init_callbacks: List[Callable] = []
+        self.warm_up_callbacks: List[Callable] = []
         self.deploy_callbacks: List[Callable] = []
 
+        # The number of synthetic predictions made by each model before reporting ready (see `with_warm_up`)
+        self.warm_up_rows = 0
+
+        # The asyncio serving mode (see `start_async`), which falls back to the Flask routes
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.asgi = AsgiApp(self.flask)
+        self._initialising: Optional[asyncio.Future] = None
+        self.asgi.on_startup(self._start_initialise_async)
+
+        # Every registered version of each model, with `models` holding the primary version
+        self.registry = ModelRegistry()
+
+        # Micro-batching of predictions is opt-in (see `with_micro_batching`)
+        self.micro_batching: Optional[Dict[str, Any]] = None
+        self.batchers: Dict[str, MicroBatcher] = dict()
+        self._batchers_lock = threading.Lock()
+
+        # Caching of predictions is opt-in (see `with_prediction_cache`)
+        self.prediction_cache: Optional[PredictionCache] = None
+
+        # Hot reloading of models is opt-in (see `with_hot_reload`)
+        self.reloader: Optional[ModelReloader] = None
+        self._reload_lock = threading.Lock()
+
         # Build the HmlInferenceDeployment
         self.deployment = HmlInferenceDeployment(
             name=self.name,
@@ -90,29 +156,465 @@ class HmlInferenceApp:
             k8s_namespace=k8s_namespace,
         )
 
-    # def register_model(self, model_container: ModelContainer):
-    #     """
-    #     Load the Model (its JobLib and Summary statistics) using an
-    #     empy ModelContainer object, and bind it to our internal dictionary
-    #     of models.
+    def register_model(self, model_container: "ModelContainer", version: str = None, weight: float = 1.0, primary: bool = False):
+        """
+        Register a (loaded) version of a model to be served alongside any other versions
+        with the same name (see `ModelRegistry`).  Requests are split between the versions
+        by their weights, unless they ask for a version explicitly (see `select_model`).
+        The first version registered for a name becomes its primary version in `models`.
+
+        Args:
+            model_container (ModelContainer): The container wrapping the model
+            version (str): The version of the model, defaulting to the md5 of the model
+                in its reference file
+            weight (float): The share of traffic to route to this version, relative to
+                the other versions, or 0 to only serve it when asked for explicitly
+            primary (bool): Make this the primary version of the model
+
+        Returns:
+            The model container passed in
+        """
+        replaced = self.registry.get(model_container.name, version or model_container.version)
+        self.registry.register(model_container, version=version, weight=weight)
+        if replaced is not None and replaced is not model_container:
+            self._retire_model(replaced)
+
+        current = self.get_model(model_container.name)
+        if primary or current is None or current is replaced:
+            self.models[model_container.name] = model_container
+        return model_container
+
+    def select_model(self, name: str, version: str = None, routing_key: str = None) -> "ModelContainer":
+        """
+        Choose which version of a model to serve a request with
+
+        Args:
+            name (str): The name of the model
+            version (str): A specific version to use (e.g. from a request header)
+            routing_key (str): A key (e.g. a user id) which is always routed to the same
+                version, rather than splitting traffic randomly
+
+        Returns:
+            The chosen `ModelContainer`, raising a `KeyError` if there is no such model
+        """
+        if version is not None:
+            model_container = self.registry.get(name, version)
+            if model_container is None:
+                raise KeyError(f"No version '{version}' of model '{name}' has been registered with the HmlInferenceApp")
+            return model_container
+
+        model_container = self.registry.route(name, routing_key) or self.get_model(name)
+        if model_container is None:
+            raise KeyError(f"No model named '{name}' has been registered with the HmlInferenceApp")
+        return model_container
+
+    def with_micro_batching(self, max_batch_size: int = 32, max_wait_ms: float = 5.0) -> Optional['HmlInferenceApp']:
+        """
+        Enable micro-batching of predictions made through `predict`, so that concurrent
+        requests for the same model are encoded and predicted together in a single
+        call to `model.predict`.
+
+        Args:
+            max_batch_size (int): The maximum number of requests to predict in one call
+            max_wait_ms (float): The longest a request will wait for a batch to fill up
 
-    #     Args:
-    #         model_container (ModelContainer): The container wrapping the model
+        Returns:
+            A reference to the current `HmlInferenceApp` (self)
+        """
+        self.micro_batching = {"max_batch_size": max_batch_size, "max_wait_ms": max_wait_ms}
+        return self
+
+    def with_prediction_cache(self, max_entries: int = 10000, ttl_seconds: float = 300.0) -> Optional['HmlInferenceApp']:
+        """
+        Cache the predictions made through `predict`, so that repeated requests for the
+        same features (once encoded) and model version are not predicted again.  Cached
+        predictions for a model are dropped when it is replaced (e.g. by `reload_model`).
 
-    #     Returns:
-    #         The model container passed in, having been loaded.
+        Args:
+            max_entries (int): The maximum number of predictions to keep, evicting the
+                least recently used first
+            ttl_seconds (float): How long a prediction may be served from the cache
+
+        Returns:
+            A reference to the current `HmlInferenceApp` (self)
+        """
+        self.prediction_cache = PredictionCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        return self
 
-    #     """
-    #     self.models[model_container.name] = model_container
-    #     return model_container
+    def get_cache_metrics(self) -> Dict[str, Any]:
+        """
+        Get hit rate and size metrics of the prediction cache (see `with_prediction_cache`)
+
+        Returns:
+            A dictionary of metrics, which is empty if the cache is not enabled
+        """
+        if self.prediction_cache is None:
+            return dict()
+        return self.prediction_cache.metrics()
+
+    def with_warm_up(self, rows: int = 8) -> Optional['HmlInferenceApp']:
+        """
+        Warm up every model once the `on_init` callbacks have loaded them, by making
+        `rows` synthetic predictions built from each model's stored distributions (see
+        `ModelContainer.build_synthetic_features`), both one at a time and as a batch.
+        The app only reports itself ready on `/readyz` once this is done, so that the
+        first real requests don't pay for lazy imports and cold caches.
+
+        Args:
+            rows (int): The number of synthetic predictions to make with each model
+
+        Returns:
+            A reference to the current `HmlInferenceApp` (self)
+        """
+        if rows < 1:
+            raise ValueError("Parameter: `rows` must be at least 1")
+        self.warm_up_rows = rows
+        return self
+
+    def with_hot_reload(self, poll_seconds: float = 30.0) -> Optional['HmlInferenceApp']:
+        """
+        Watch the reference file each model was loaded from, and when it changes load
+        the new version in the background and swap it in (see `reload_model`), without
+        needing to restart the app.
+
+        Args:
+            poll_seconds (float): How often to check the reference files for changes
+
+        Returns:
+            A reference to the current `HmlInferenceApp` (self)
+        """
+        self.reloader = ModelReloader(self, poll_seconds=poll_seconds)
+        return self
+
+    def reload_model(self, name: str, reference_file: str = None) -> bool:
+        """
+        Load the version of a model given by `reference_file` into a new `ModelContainer`,
+        warm it up, then swap it into `models`.  Requests already using the old version
+        finish with it, and if the new version fails to load the old one is kept.
+
+        Args:
+            name (str): The name of the model
+            reference_file (str): The path of the reference json file, defaulting to
+                the one the current version was loaded from
+
+        Returns:
+            True if a new version was swapped in, False otherwise
+        """
+        with self._reload_lock:
+            current = self.get_model(name)
+            if current is None:
+                raise KeyError(f"No model named '{name}' has been registered with the HmlInferenceApp")
+
+            reference_file = reference_file or current.reference_file
+            try:
+                with open(reference_file) as f:
+                    if json.load(f) == current.reference:
+                        return False
+
+                model_container = current.clone()
+                model_container.load(reference_file, mmap_mode=current.mmap_mode)
+                self._warm_up_model(model_container)
+            except Exception:
+                logging.exception(f"HmlInferenceApp: failed to reload {name} from {reference_file}, keeping the current version")
+                return False
+
+            self.registry.replace(current, model_container)
+            self.models[name] = model_container
+            self._retire_model(current)
+            logging.info(f"HmlInferenceApp: reloaded {name} from {reference_file}")
+            return True
+
+    def predict(self, name: str, features: Dict[str, Any], throw_on_missing=False, version: str = None, routing_key: str = None) -> Any:
+        """
+        Make a prediction for a single set of features (e.g. the parameters of a
+        request) using the model with the given name.  If micro-batching has been
+        enabled, this will wait to be batched with other concurrent requests.
+
+        Args:
+            name (str): The name of the model
+            features (Dict[str, Any]): The value of each feature, keyed by feature name
+            throw_on_missing (bool): Throw an Exception if a categorical value has not
+                been seen before (see `one_hot_encode`)
+            version (str): The version of the model to use (see `select_model`)
+            routing_key (str): The key to route between versions by (see `select_model`)
+
+        Returns:
+            The prediction for these features
+        """
+        model_container = self.select_model(name, version=version, routing_key=routing_key)
+        return self.predict_with(model_container, features, throw_on_missing=throw_on_missing)
+
+    def predict_with(self, model_container: "ModelContainer", features: Dict[str, Any], throw_on_missing=False) -> Any:
+        """
+        Make a prediction for a single set of features using a specific model (e.g. the
+        version already chosen for a request by `select_model`), micro-batched and cached
+        as for `predict`.
+
+        Args:
+            model_container (ModelContainer): The model to predict with
+            features (Dict[str, Any]): The value of each feature, keyed by feature name
+            throw_on_missing (bool): Throw an Exception if a categorical value has not
+                been seen before (see `one_hot_encode`)
+
+        Returns:
+            The prediction for these features
+        """
+        if self.prediction_cache is None:
+            return self._predict(model_container, features, throw_on_missing)
+
+        with self.metrics.time_stage("encode", model_container.name):
+            feature_matrix = model_container.encode_row(features, throw_on_missing=throw_on_missing)
+        found, prediction = self.prediction_cache.get(model_container, feature_matrix)
+        if not found:
+            prediction = self._predict(model_container, features, throw_on_missing, feature_matrix)
+            self.prediction_cache.put(model_container, feature_matrix, prediction)
+        return prediction
+
+    def _predict(self, model_container: "ModelContainer", features: Dict[str, Any], throw_on_missing: bool, feature_matrix=None) -> Any:
+        if self.micro_batching is not None:
+            # Includes the time spent waiting for the batch to fill
+            with self.metrics.time_stage("batched_predict", model_container.name):
+                batcher = self._get_batcher(model_container)
+                return batcher.predict(features, throw_on_missing=throw_on_missing, row=feature_matrix)
+
+        if feature_matrix is None:
+            with self.metrics.time_stage("encode", model_container.name):
+                feature_matrix = model_container.encode_row(features, throw_on_missing=throw_on_missing)
+        with self.metrics.time_stage("predict", model_container.name):
+            return model_container.model.predict(feature_matrix)[0]
+
+    async def predict_async(
+        self, name: str, features: Dict[str, Any], throw_on_missing=False, version: str = None, routing_key: str = None
+    ) -> Any:
+        """
+        Make a prediction from a coroutine (such as a route registered with `async_route`),
+        executing the encoding and `model.predict` on the bounded executor so that the
+        event loop is free to serve other requests in the meantime.
+
+        Args:
+            name (str): The name of the model
+            features (Dict[str, Any]): The value of each feature, keyed by feature name
+            throw_on_missing (bool): Throw an Exception if a categorical value has not
+                been seen before (see `one_hot_encode`)
+            version (str): The version of the model to use (see `select_model`)
+            routing_key (str): The key to route between versions by (see `select_model`)
+
+        Returns:
+            The prediction for these features
+        """
+        loop = asyncio.get_event_loop()
+        predict = functools.partial(
+            self.predict, name, features, throw_on_missing=throw_on_missing, version=version, routing_key=routing_key
+        )
+        return await loop.run_in_executor(self.executor, predict)
+
+    def get_batching_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get batch size and queueing delay metrics for each model being micro-batched
+
+        Returns:
+            A dictionary of the metrics of each `MicroBatcher`, keyed by model name
+            (and ":<version>" for models loaded from a reference)
+        """
+        return {name: batcher.metrics() for name, batcher in self.batchers.items()}
+
+    def _get_batcher(self, model_container: "ModelContainer") -> MicroBatcher:
+        # Each version of a model is batched separately
+        key = model_container.name
+        if model_container.version is not None:
+            key = f"{model_container.name}:{model_container.version}"
+
+        with self._batchers_lock:
+            batcher = self.batchers.get(key)
+            if batcher is not None and batcher.model_container is model_container:
+                return batcher
+
+            # The model has been replaced, so let the old batcher finish what it has queued
+            if batcher is not None:
+                threading.Thread(target=batcher.stop, daemon=True).start()
+
+            batcher = MicroBatcher(model_container, **self.micro_batching).start()
+            self.batchers[key] = batcher
+            return batcher
+
+    def _collect_metrics(self) -> List[Any]:
+        """
+        Build metrics about the models being served, their micro-batching and the prediction cache
+        """
+        load_seconds = Gauge("hml_model_load_seconds", "The time taken to load each model")
+        size_bytes = Gauge("hml_model_size_bytes", "The size of the artifacts each model was loaded from")
+        for name, versions in self.registry.versions.items():
+            for version, model_container in versions.items():
+                self._collect_model_metrics(model_container, version, load_seconds, size_bytes)
+        for name, model_container in self.models.items():
+            if model_container not in self.registry.versions.get(name, dict()).values():
+                self._collect_model_metrics(model_container, model_container.version, load_seconds, size_bytes)
+        collected = [load_seconds, size_bytes]
+
+        if len(self.batchers) > 0:
+            batch_requests = Counter("hml_batcher_requests_total", "The number of predictions micro-batched")
+            batches = Counter("hml_batcher_batches_total", "The number of batches predicted")
+            batch_size = Gauge("hml_batcher_batch_size_mean", "The mean number of predictions in each batch")
+            queue_delay = Gauge("hml_batcher_queue_delay_mean_seconds", "The mean time predictions wait to be batched")
+            for key, batch_metrics in self.get_batching_metrics().items():
+                batch_requests.inc(batch_metrics["requests"], batcher=key)
+                batches.inc(batch_metrics["batches"], batcher=key)
+                batch_size.set(batch_metrics["batch_size_mean"], batcher=key)
+                queue_delay.set(batch_metrics["queue_delay_mean_ms"] / 1000, batcher=key)
+            collected += [batch_requests, batches, batch_size, queue_delay]
+
+        if self.prediction_cache is not None:
+            cache_metrics = self.prediction_cache.metrics()
+            cache_hits = Counter("hml_prediction_cache_hits_total", "The number of predictions served from the cache")
+            cache_misses = Counter("hml_prediction_cache_misses_total", "The number of predictions not found in the cache")
+            cache_size = Gauge("hml_prediction_cache_size", "The number of predictions in the cache")
+            cache_hits.inc(cache_metrics["hits"])
+            cache_misses.inc(cache_metrics["misses"])
+            cache_size.set(cache_metrics["size"])
+            collected += [cache_hits, cache_misses, cache_size]
+
+        return collected
+
+    def _collect_model_metrics(self, model_container: "ModelContainer", version: str, load_seconds: Gauge, size_bytes: Gauge):
+        labels = {"model": model_container.name, "version": version or ""}
+        if model_container.load_seconds is not None:
+            load_seconds.set(model_container.load_seconds, **labels)
+        if model_container.size_bytes is not None:
+            size_bytes.set(model_container.size_bytes, **labels)
+
+    def _retire_model(self, model_container: "ModelContainer"):
+        # Drop anything held for a model that is no longer served, letting its
+        # batchers finish what they have queued
+        if self.prediction_cache is not None:
+            self.prediction_cache.invalidate(model_container)
+
+        with self._batchers_lock:
+            for key, batcher in list(self.batchers.items()):
+                if batcher.model_container is model_container:
+                    self.batchers.pop(key)
+                    threading.Thread(target=batcher.stop, daemon=True).start()
 
     def on_init(self, func: Callable):
         self.init_callbacks.append(func)
 
+    def on_warm_up(self, func: Callable):
+        """
+        Add a callback which warms up the app (e.g. by calling its own routes) after
+        the models have been warmed up, but before the app reports itself ready
+        """
+        self.warm_up_callbacks.append(func)
+
+    def async_route(self, path: str, methods: List[str] = ["GET"]):
+        """
+        Register a coroutine as a route, served on the event loop when running via
+        `start_async` (see `AsgiApp.route`).  Routes registered on `flask` are
+        still served, on the executor.
+
+        Args:
+            path (str): The exact path of the route
+            methods (List[str]): The HTTP methods to accept
+
+        Returns:
+            The decorator
+        """
+        return self.asgi.route(path, methods)
+
     def _initialise(self):
         logging.info(f"HmlInferenceApp._initialize()")
+        self.ready = False
         for callback in self.init_callbacks:
             callback(self)
+        self._warm_up()
+        self.ready = True
+
+    def _initialise_in_background(self) -> threading.Thread:
+        """
+        Initialise the app (see `_initialise`) on a thread of its own, then start the background
+        tasks, so that the server can start straight away and answer `/healthz` and `/readyz`
+        while the models are loaded.  If initialisation fails the app stops reporting itself alive.
+        """
+
+        def initialise():
+            try:
+                self._initialise()
+            except Exception:
+                logging.exception("HmlInferenceApp: initialisation failed")
+                self.failed = True
+                return
+            self._start_background_tasks()
+
+        thread = threading.Thread(target=initialise, name="hml-initialise", daemon=True)
+        thread.start()
+        return thread
+
+    def _start_initialise_async(self):
+        # Not awaited by the lifespan startup, which Uvicorn waits on before binding its socket
+        self._initialising = asyncio.ensure_future(self._initialise_async())
+
+    async def _initialise_async(self):
+        logging.info(f"HmlInferenceApp._initialise_async()")
+        self.ready = False
+        try:
+            loop = asyncio.get_event_loop()
+            for callback in self.init_callbacks:
+                if inspect.iscoroutinefunction(callback):
+                    await callback(self)
+                else:
+                    # Synchronous callbacks (e.g. loading models) would block the health checks
+                    result = await loop.run_in_executor(self.executor, callback, self)
+                    if inspect.isawaitable(result):
+                        await result
+
+            await loop.run_in_executor(self.executor, self._warm_up)
+        except Exception:
+            logging.exception("HmlInferenceApp: initialisation failed")
+            self.failed = True
+            return
+        self.ready = True
+        self._start_background_tasks()
+
+    def _start_background_tasks(self):
+        # Called in the process which serves requests (i.e. after forking)
+        if self.reloader is not None:
+            self.reloader.start()
+
+    def _warm_up(self):
+        """
+        Warm up every loaded model (see `with_warm_up`), then run the `on_warm_up` callbacks
+        """
+        warmed = set()
+        if self.warm_up_rows < 1:
+            loaded = []
+        else:
+            loaded = [mc for versions in self.registry.versions.values() for mc in versions.values()]
+            loaded += list(self.models.values())
+
+        for model_container in loaded:
+            if id(model_container) in warmed or getattr(model_container, "model", None) is None:
+                continue
+            warmed.add(id(model_container))
+            self._warm_up_model(model_container)
+
+        for callback in self.warm_up_callbacks:
+            callback(self)
+
+    def _warm_up_model(self, model_container: "ModelContainer"):
+        """
+        Make throw away predictions, so that the first real request does not pay for
+        compiling the encoder or faulting in the model's (possibly memory mapped) pages
+        """
+        try:
+            if self.warm_up_rows <= 1:
+                model_container.model.predict(model_container.encode_row(dict()))
+                return
+
+            synthetic = model_container.build_synthetic_features(self.warm_up_rows)
+            for features in synthetic:
+                model_container.model.predict(model_container.encode_row(features))
+            model_container.predict_data_frame(pd.DataFrame(synthetic))
+            logging.info(f"HmlInferenceApp: warmed up {model_container.name} with {len(synthetic)} predictions")
+        except Exception as ex:
+            logging.warning(f"HmlInferenceApp: warm up of {model_container.name} failed: {ex}")
 
     def on_deploy(self, func: Callable[[HmlInferenceDeployment], None]):
         self.deploy_callbacks.append(func)
@@ -153,6 +655,8 @@ class HmlInferenceApp:
 
         self.apply_deployment(self.deployment.k8s_deployment)
         self.apply_service(self.deployment.k8s_service)
+        if self.deployment.k8s_autoscaler is not None:
+            self.apply_autoscaler(self.deployment.k8s_autoscaler)
 
         logging.info("Inference App has been updated deployed")
 
@@ -208,27 +712,107 @@ class HmlInferenceApp:
                 f"Patching Inference Service: {self.k8s_namespace}.{self.deployment.k8s_service.metadata.name}!"
             )
 
+    def apply_autoscaler(self, k8s_autoscaler: client.V2beta2HorizontalPodAutoscaler):
+        logging.info("Getting autoscalers...")
+
+        apiV2Beta2 = client.AutoscalingV2beta2Api()
+        autoscalers = apiV2Beta2.list_namespaced_horizontal_pod_autoscaler(self.k8s_namespace)
+
+        name = k8s_autoscaler.metadata.name
+        existing = [a for a in autoscalers.items if a.metadata.name == name]
+        if len(existing) == 0:
+            logging.info(f"Creating Inference Autoscaler: {self.k8s_namespace}.{name}")
+            apiV2Beta2.create_namespaced_horizontal_pod_autoscaler(body=k8s_autoscaler, namespace=self.k8s_namespace)
+            logging.info(f"Created Inference Autoscaler: {self.k8s_namespace}.{name}!")
+        else:
+            logging.info(f"Patching Inference Autoscaler: {self.k8s_namespace}.{name}")
+            apiV2Beta2.patch_namespaced_horizontal_pod_autoscaler(
+                name=name, body=k8s_autoscaler, namespace=self.k8s_namespace
+            )
+            logging.info(f"Patched Inference Autoscaler: {self.k8s_namespace}.{name}!")
+
     def start_dev(self):
         """
-        Start the Flask App in development mode
+        Start the Flask App in development mode, initialising it in the background
         """
 
-        self._initialise()
+        self._initialise_in_background()
 
         logging.info(f"Development API Starting up on {self.port}")
         self.flask.run(host="127.0.0.1", port=self.port)
 
     def start_prod(self):
         """
-        Start the Flask App in Production mode (via Waitress)
+        Start the Flask App in Production mode (via Waitress), initialising it in the background
         """
 
-        self._initialise()
+        self._initialise_in_background()
 
         logging.info("Production API Starting up on {self.port}")
 
         binding = f"*:{self.port}"
-        serve(self.flask, listen=binding)
+        if self.micro_batching is not None:
+            # Batches can only fill up if there are enough threads to wait on them
+            threads = max(4, self.micro_batching["max_batch_size"])
+            serve(self.flask, listen=binding, threads=threads)
+        else:
+            serve(self.flask, listen=binding)
 
-    def deploy(self, environment):
-        pass
+    def start_async(self, threads: int = 8):
+        """
+        Start the app under an asyncio event loop (via Uvicorn), executing the
+        `on_init` callbacks (which may be coroutines) once serving.  Model calls and
+        Flask routes are executed on an executor of at most `threads` threads.
+
+        Args:
+            threads (int): The maximum number of requests / predictions to execute at once
+        """
+        import uvicorn
+
+        if self.micro_batching is not None:
+            # Batches can only fill up if there are enough threads to wait on them
+            threads = max(threads, self.micro_batching["max_batch_size"])
+
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="hml-inference")
+        self.asgi.executor = self.executor
+
+        logging.info(f"Async API Starting up on {self.port}")
+        uvicorn.run(self.asgi, host="0.0.0.0", port=self.port, lifespan="on")
+
+    def start_prefork(self, workers: int = None, threads: int = 4):
+        """
+        Start the Flask App in Production mode across several worker processes (via
+        Waitress), each forked after the models have been loaded by the `on_init`
+        callbacks so that they share the models' memory copy-on-write.  Until then
+        requests (e.g. health checks) are served by the parent process.
+
+        Args:
+            workers (int): The number of worker processes, defaulting to the number
+                of CPUs in the container's limit (see `get_cpu_limit`)
+            threads (int): The number of threads in each worker process
+        """
+        if workers is None:
+            workers = get_cpu_limit()
+        if self.micro_batching is not None:
+            # Batches can only fill up if there are enough threads to wait on them
+            threads = max(threads, self.micro_batching["max_batch_size"])
+
+        logging.info(f"Production API Starting up on {self.port} with {workers} workers")
+        self._build_prefork_server(workers, threads, before_fork=self._initialise).serve_forever()
+
+    def _build_prefork_server(self, workers: int, threads: int, before_fork: Callable = None) -> PreforkServer:
+        return PreforkServer(
+            self.flask,
+            port=self.port,
+            workers=workers,
+            threads=threads,
+            after_fork=self._after_fork,
+            before_fork=before_fork,
+        )
+
+    def _after_fork(self):
+        # Background threads (and their locks) don't survive a fork, so each worker starts its own
+        self.batchers = dict()
+        self._batchers_lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._start_background_tasks()
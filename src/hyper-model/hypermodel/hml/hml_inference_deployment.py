@@ -4,7 +4,9 @@ from typing import List, Dict, Optional
 from kubernetes import client, config
 from kubernetes.client.models import ExtensionsV1beta1Deployment
 from kubernetes.client.models import V1Service
+from kubernetes.client.models import V2beta2HorizontalPodAutoscaler
 from hypermodel.utilities.k8s import sanitize_k8s_name
+from hypermodel.utilities.cpu import CPU_LIMIT_ENV
 from kfp.dsl._container_op import Container
 
 
@@ -30,6 +32,8 @@ class HmlInferenceDeployment:
         self.k8s_container = self._build_container(image_url, package_entrypoint)
         self.k8s_deployment: ExtensionsV1beta1Deployment = self._build_deployment(self.k8s_container)
         self.k8s_service: V1Service = self._build_service()
+        # Autoscaling is opt-in (see `with_autoscaling`)
+        self.k8s_autoscaler: Optional[V2beta2HorizontalPodAutoscaler] = None
         self.pod_volumes = self.k8s_deployment.spec.template.spec.volumes
 
         self.deployment_name = self.k8s_deployment.metadata.name
@@ -42,7 +46,10 @@ class HmlInferenceDeployment:
         service_yml = self.k8s_service.to_str()
         # deployment_yml = yaml.safe_dump(self.k8s_deployment)
         # service_yml = yaml.safe_dump(self.k8s_service)
-        return deployment_yml + "\n----------\n\n" + service_yml
+        definition = deployment_yml + "\n----------\n\n" + service_yml
+        if self.k8s_autoscaler is not None:
+            definition += "\n----------\n\n" + self.k8s_autoscaler.to_str()
+        return definition
 
     def _build_service(self) -> V1Service:
         """
@@ -79,9 +86,10 @@ class HmlInferenceDeployment:
             kfp.dsl._container_op.Container
         """
 
-        # Define our probes for when the container is ready for action
-        probe_action = client.V1HTTPGetAction(path="/healthz", port=self.port)
-        probe = client.V1Probe(http_get=probe_action, initial_delay_seconds=60, period_seconds=60)
+        # The container is alive as soon as it is serving, but only ready for action once
+        # its models have been loaded and warmed up (see `HmlInferenceApp.with_warm_up`)
+        liveness_probe = self._build_probe("/healthz", initial_delay_seconds=60, period_seconds=60, failure_threshold=3)
+        readiness_probe = self._build_probe("/readyz", initial_delay_seconds=10, period_seconds=10, failure_threshold=3)
 
         container = Container(
             name=f"{self.name}-container",
@@ -89,8 +97,8 @@ class HmlInferenceDeployment:
             command=[entrypoint],
             args=["inference", "start-prod"],
             ports=[client.V1ContainerPort(container_port=self.port)],
-            liveness_probe=probe,
-            readiness_probe=probe
+            liveness_probe=liveness_probe,
+            readiness_probe=readiness_probe
         )
         # The Kubeflow SDK removes the container name, so we need to add them back
         container.swagger_types = client.V1Container.swagger_types
@@ -98,6 +106,20 @@ class HmlInferenceDeployment:
 
         return container
 
+    def _build_probe(self, path: str, initial_delay_seconds: int, period_seconds: int, failure_threshold: int) -> client.V1Probe:
+        """
+        Build an HTTP probe of the given path of the HmlInferenceApp
+
+        Returns:
+            `V1Probe`
+        """
+        return client.V1Probe(
+            http_get=client.V1HTTPGetAction(path=path, port=self.port),
+            initial_delay_seconds=initial_delay_seconds,
+            period_seconds=period_seconds,
+            failure_threshold=failure_threshold,
+        )
+
     def _build_deployment(self, container: Container) -> ExtensionsV1beta1Deployment:
         """
         Build the InferenceApp deployment
@@ -229,4 +251,179 @@ class HmlInferenceDeployment:
             limits={"cpu": limit_cpu, "memory": limit_memory},
             requests={"cpu": request_cpu, "memory": request_memory}
         )
+
+        # Expose the CPU limit (rounded up to whole CPUs) to the app, for sizing its workers
+        if not any(e.name == CPU_LIMIT_ENV for e in (self.k8s_container.env or [])):
+            self.k8s_container.add_env_variable(client.V1EnvVar(
+                name=CPU_LIMIT_ENV,
+                value_from=client.V1EnvVarSource(
+                    resource_field_ref=client.V1ResourceFieldSelector(resource="limits.cpu", divisor="1")
+                )
+            ))
         return self
+
+    def with_prefork_workers(self, workers: int = None) -> Optional['HmlInferenceDeployment']:
+        """
+        Run the `HmlInferenceApp` with several pre-forked worker processes (see
+        `HmlInferenceApp.start_prefork`), rather than a single process.
+
+        Args:
+            workers (int): The number of worker processes, defaulting to the number
+                of CPUs in the container's CPU limit (see `with_resources`)
+
+        Returns:
+            A reference to the current `HmlInferenceDeployment` (self)
+        """
+        args = ["inference", "start-prefork"]
+        if workers is not None:
+            args += ["--workers", str(workers)]
+
+        self.k8s_container.args = args
+        return self
+
+    def with_liveness_probe(self, initial_delay_seconds: int = 60, period_seconds: int = 60, failure_threshold: int = 3) -> Optional['HmlInferenceDeployment']:
+        """
+        Configure how Kubernetes checks that the `HmlInferenceApp` is alive (via `/healthz`),
+        restarting the container if it fails `failure_threshold` checks in a row.  The initial
+        delay should be long enough for the models to be loaded.
+
+        Args:
+            initial_delay_seconds (int): How long to wait after the container starts before checking
+            period_seconds (int): How often to check
+            failure_threshold (int): The number of failed checks before restarting the container
+
+        Returns:
+            A reference to the current `HmlInferenceDeployment` (self)
+        """
+        self.k8s_container.liveness_probe = self._build_probe(
+            "/healthz", initial_delay_seconds, period_seconds, failure_threshold
+        )
+        return self
+
+    def with_readiness_probe(self, initial_delay_seconds: int = 10, period_seconds: int = 10, failure_threshold: int = 3) -> Optional['HmlInferenceDeployment']:
+        """
+        Configure how Kubernetes checks that the `HmlInferenceApp` is ready (via `/readyz`,
+        once its models are loaded and warmed up) before sending it traffic.
+
+        Args:
+            initial_delay_seconds (int): How long to wait after the container starts before checking
+            period_seconds (int): How often to check
+            failure_threshold (int): The number of failed checks before traffic is withdrawn
+
+        Returns:
+            A reference to the current `HmlInferenceDeployment` (self)
+        """
+        self.k8s_container.readiness_probe = self._build_probe(
+            "/readyz", initial_delay_seconds, period_seconds, failure_threshold
+        )
+        return self
+
+    def with_autoscaling(
+        self,
+        min_replicas: int = 1,
+        max_replicas: int = 4,
+        target_cpu_utilization: Optional[int] = 80,
+        scale_down_stabilization_seconds: int = 300,
+    ) -> Optional['HmlInferenceDeployment']:
+        """
+        Scale the number of replicas of the `HmlInferenceApp` with its load, via a
+        HorizontalPodAutoscaler which is applied alongside the Deployment and Service.
+        Scaling on CPU requires `with_resources` to set a CPU request, and further
+        metrics (e.g. request rate) can be added with `with_autoscaling_metric`.
+
+        Args:
+            min_replicas (int): The fewest replicas to run
+            max_replicas (int): The most replicas to run
+            target_cpu_utilization (int): The average CPU utilization (as a percentage of
+                the CPU request) to scale towards, or None to not scale on CPU
+            scale_down_stabilization_seconds (int): How long the load must have been lower
+                before scaling down, to avoid flapping under bursty traffic
+
+        Returns:
+            A reference to the current `HmlInferenceDeployment` (self)
+        """
+        if min_replicas < 1:
+            raise ValueError("Parameter: `min_replicas` must be at least 1")
+        if max_replicas < min_replicas:
+            raise ValueError("Parameter: `max_replicas` must be at least `min_replicas`")
+
+        metrics = []
+        if target_cpu_utilization is not None:
+            metrics.append(client.V2beta2MetricSpec(
+                type="Resource",
+                resource=client.V2beta2ResourceMetricSource(
+                    name="cpu",
+                    target=client.V2beta2MetricTarget(type="Utilization", average_utilization=target_cpu_utilization)
+                )
+            ))
+        if self.k8s_autoscaler is not None:
+            # Keep any metrics added by `with_autoscaling_metric`
+            metrics += [m for m in self.k8s_autoscaler.spec.metrics or [] if m.type != "Resource"]
+
+        self.k8s_autoscaler = self._build_autoscaler(min_replicas, max_replicas, metrics, scale_down_stabilization_seconds)
+
+        # Leave the number of replicas to the autoscaler, so that deploying doesn't reset it
+        self.k8s_deployment.spec.replicas = None
+        return self
+
+    def with_autoscaling_metric(self, metric_name: str, target_average_value: str) -> Optional['HmlInferenceDeployment']:
+        """
+        Also scale on a metric exported by the `HmlInferenceApp` on `/metrics` (e.g. the rate of
+        `hml_requests_total`, or a quantile of `hml_request_duration_seconds`), averaged across
+        the pods.  The metric must be served by the custom metrics API (e.g. via the Prometheus
+        Adapter) under `metric_name`.
+
+        Args:
+            metric_name (str): The name of the metric in the custom metrics API
+                (e.g. "hml_requests_per_second")
+            target_average_value (str): The value to scale towards per pod, as a
+                Kubernetes quantity (e.g. "50" or "250m")
+
+        Returns:
+            A reference to the current `HmlInferenceDeployment` (self)
+        """
+        if self.k8s_autoscaler is None:
+            self.with_autoscaling(target_cpu_utilization=None)
+
+        spec = self.k8s_autoscaler.spec
+        spec.metrics = (spec.metrics or []) + [client.V2beta2MetricSpec(
+            type="Pods",
+            pods=client.V2beta2PodsMetricSource(
+                metric=client.V2beta2MetricIdentifier(name=metric_name),
+                target=client.V2beta2MetricTarget(type="AverageValue", average_value=target_average_value)
+            )
+        )]
+        return self
+
+    def _build_autoscaler(
+        self, min_replicas: int, max_replicas: int, metrics: List[client.V2beta2MetricSpec], scale_down_stabilization_seconds: int
+    ) -> V2beta2HorizontalPodAutoscaler:
+        """
+        Build the HorizontalPodAutoscaler of the InferenceApp deployment
+
+        Returns:
+            `V2beta2HorizontalPodAutoscaler`
+        """
+        spec = client.V2beta2HorizontalPodAutoscalerSpec(
+            scale_target_ref=client.V2beta2CrossVersionObjectReference(
+                api_version="extensions/v1beta1", kind="Deployment", name=self.k8s_deployment.metadata.name
+            ),
+            min_replicas=min_replicas,
+            max_replicas=max_replicas,
+            metrics=metrics,
+        )
+        # This version of the Kubernetes SDK predates `behavior`, so we add it ourselves
+        spec.swagger_types = {**spec.swagger_types, "behavior": "object"}
+        spec.attribute_map = {**spec.attribute_map, "behavior": "behavior"}
+        spec.behavior = {"scaleDown": {"stabilizationWindowSeconds": scale_down_stabilization_seconds}}
+
+        return client.V2beta2HorizontalPodAutoscaler(
+            api_version="autoscaling/v2beta2",
+            kind="HorizontalPodAutoscaler",
+            metadata=client.V1ObjectMeta(
+                name=f"{self.name}-hpa",
+                namespace=self.k8s_namespace,
+                labels={"app": f"{self.name}-app"}
+            ),
+            spec=spec,
+        )
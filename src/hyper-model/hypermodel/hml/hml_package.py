@@ -80,10 +80,10 @@ class HmlPackage:
 
         return artifact_path
 
-    def add_artifact_dataframe(self: "HmlPackage", name: str, dataframe: pd.DataFrame):
-        # Lets save the artifact as JSON to the data lake
+    def add_artifact_dataframe(self: "HmlPackage", name: str, dataframe: pd.DataFrame, compress: bool = False):
+        # Lets stream the artifact as CSV (optionally gzipped) to the data lake
         artifact_path = self.artifact_path(name)
-        self.services.lake.upload_dataframe(self.config.lake_bucket, artifact_path, dataframe)
+        self.services.lake.upload_dataframe(self.config.lake_bucket, artifact_path, dataframe, compress=compress)
 
         # Then lets update our reference artifact (via the link)
         self.link_artifact(name, artifact_path)
@@ -1,19 +1,23 @@
 import pandas as pd
+import numpy
 import json
 import logging
 import os
+import time
+import uuid
 import joblib
 import gitlab
 
-from typing import List, Dict
+from typing import List, Dict, Any, Tuple
 
 from abc import ABC, abstractproperty
 
 from hypermodel.utilities.file_hash import file_md5
+from hypermodel.hml.artifact_cache import ArtifactCache
 from hypermodel.features import (
     get_unique_feature_values,
-    one_hot_encode,
-    describe_features
+    describe_features,
+    FeatureEncoder
 )
 
 
@@ -53,6 +57,16 @@ class ModelContainer:
         self.target = target
         #instantiating self.feature_uniques to null rather than lazy loading it later
         self.feature_uniques=None
+        self.feature_summaries=None
+        self.feature_encoder=None
+        self.artifact_cache=None
+        # The reference (and how it was loaded), for reloading new versions
+        self.reference=None
+        self.reference_file=None
+        self.mmap_mode=None
+        self.load_seconds=None
+        # The size of the artifacts the model was loaded from, as an estimate of its memory
+        self.size_bytes=None
         # File name helpers
         self.filename_distributions = f"{self.name}-distributions.json"
         self.filename_model = f"{self.name}.joblib"
@@ -78,6 +92,7 @@ class ModelContainer:
             data_frame, self.features_categorical
         )
         self.feature_summaries = describe_features(data_frame, self.features_numeric)
+        self.feature_encoder = FeatureEncoder(self.feature_uniques, self.features_numeric)
 
         return self
   
@@ -91,23 +106,29 @@ class ModelContainer:
         file_path = self.get_local_path(self.filename_distributions)
 
         with open(file_path, "w") as f:
+            # There is nothing to encode with until the distributions have been analyzed
+            encoder = self.get_encoder().to_dict() if self.feature_uniques is not None else None
             json_obj = {
                 "feature_uniques": self.feature_uniques,
                 "feature_summaries": self.feature_summaries,
+                "feature_encoder": encoder,
             }
             json.dump(json_obj, f)
         return file_path
 
-    def build_training_matrix(self, data_frame: pd.DataFrame):
+    def build_training_matrix(self, data_frame: pd.DataFrame, sparse: bool = False):
         """
         Convert the provided `data_frame` to a matrix after one-hot encoding
         all the categorical features, using the currently cached `feature_uniques`
 
         Args:
             data_frame (pd.DataFrame): The pandas dataframe to encode
+            sparse (bool): If True, build a `scipy.sparse.csr_matrix` instead of a
+                dense array, with the numeric features stored as dense columns
+                after the one-hot columns (see `get_training_columns`)
 
         Returns:
-            A numpy array of the encoded data
+            A numpy array of the encoded data (or a CSR matrix if `sparse` is True)
         """
         logging.info(f"ModelContainer {self.name}: build_training_matrix")
 
@@ -120,20 +141,98 @@ class ModelContainer:
 
 
         # Now lets do the encoding thing...
+        return self.get_encoder().encode_matrix(data_frame, sparse=sparse)
 
+    def get_encoder(self) -> FeatureEncoder:
+        """
+        Get the compiled `FeatureEncoder` for this model, compiling it from the
+        current `feature_uniques` if it has not been built yet (or if `feature_uniques`
+        has been replaced since it was built)
 
-  
+        Returns:
+            The `FeatureEncoder` for this model
+        """
+        if self.feature_encoder is None or self.feature_encoder.feature_uniques is not self.feature_uniques:
+            self.feature_encoder = FeatureEncoder(self.feature_uniques, self.features_numeric)
+        return self.feature_encoder
 
-        encoded_df = one_hot_encode(data_frame, self.feature_uniques)
+    def encode_row(self, features: Dict[str, Any], throw_on_missing=False):
+        """
+        Encode a single set of features (e.g. from an inference request) straight
+        into a numpy matrix with one row, ready to be passed to `model.predict`.  This
+        avoids the overhead of building a DataFrame for every prediction.
+
+        Args:
+            features (Dict[str, Any]): The value of each feature, keyed by feature name
+            throw_on_missing (bool): Throw an Exception if a categorical value has not
+                been seen before (see `one_hot_encode`)
+
+        Returns:
+            A numpy array with a single row, laid out as per `build_training_matrix`
+        """
+        return self.get_encoder().encode_row(features, throw_on_missing=throw_on_missing)
 
+    def predict_data_frame(self, data_frame: pd.DataFrame, throw_on_missing=False):
+        """
+        Make predictions for every row of `data_frame` with the bound model, encoding
+        the whole frame in one vectorized pass
 
-        for nf in self.features_numeric:
-            encoded_df[nf] = data_frame[nf]
+        Args:
+            data_frame (pd.DataFrame): The features to predict, one row per prediction
+            throw_on_missing (bool): Throw an Exception if a categorical value has not
+                been seen before (see `one_hot_encode`)
 
-        matrix = encoded_df.values
-        return matrix
+        Returns:
+            The predictions as a numpy array, in the same order as the rows of `data_frame`
+        """
+        feature_matrix = self.get_encoder().encode_matrix(data_frame, throw_on_missing=throw_on_missing)
+        return numpy.asarray(self.model.predict(feature_matrix))
 
-    def load(self, reference_file=None):
+    def build_synthetic_features(self, rows: int = 8) -> List[Dict[str, Any]]:
+        """
+        Build plausible sets of features from the stored distributions, for making
+        throw away predictions (e.g. to warm up the model before serving requests).
+        Categorical features cycle through their known values, and numeric features
+        through their median, quartiles, minimum and maximum.
+
+        Args:
+            rows (int): The number of sets of features to build
+
+        Returns:
+            A list of dictionaries of the value of each feature, keyed by feature name
+        """
+        uniques = self.feature_uniques or dict()
+        summaries = getattr(self, "feature_summaries", None) or dict()
+
+        synthetic = [dict() for _ in range(rows)]
+        for feature in self.features_categorical:
+            values = uniques.get(feature) or []
+            if len(values) == 0:
+                continue
+            for i, row in enumerate(synthetic):
+                row[feature] = values[i % len(values)]
+
+        for feature in self.features_numeric:
+            summary = summaries.get(feature) or dict()
+            values = [summary[s] for s in ["50%", "25%", "75%", "min", "max", "mean"] if summary.get(s) is not None]
+            if len(values) == 0:
+                values = [0]
+            for i, row in enumerate(synthetic):
+                row[feature] = values[i % len(values)]
+
+        return synthetic
+
+    def get_training_columns(self) -> List[str]:
+        """
+        Get the names of the columns of the matrix produced by `build_training_matrix`,
+        being the one-hot encoded "feature:value" columns followed by the numeric features
+
+        Returns:
+            A list of column names, in matrix order
+        """
+        return self.get_encoder().columns
+
+    def load(self, reference_file=None, mmap_mode: str = None):
         """
         Given the provided reference file, look up the location of the model
         in the DataLake and load it into memory.  This will load the .joblib
@@ -142,11 +241,14 @@ class ModelContainer:
 
         Args:
             reference_file (str): The path of the reference json file
+            mmap_mode (str): Memory map the model's numpy arrays rather than reading
+                them into memory (see `load_model`)
 
         Returns:
             None
         """
         lake = self.services.lake
+        started_at = time.perf_counter()
 
         if reference_file is None:
             reference_file = self.get_local_path(self.filename_reference)
@@ -157,17 +259,127 @@ class ModelContainer:
         with open(reference_file) as f:
             reference = json.load(f)
 
-            # Load the distributions
-            dist_ref = reference["distributions"]
+            # Download the distributions and the model together
             dist_path = self.get_local_path(self.filename_distributions)
-            lake.download(dist_ref["path"], dist_path)
+            model_path = self.get_local_path(self.filename_model)
+            self._fetch_artifacts(lake, [(reference["distributions"], dist_path), (reference["model"], model_path)])
+
             self.load_distributions(dist_path)
+            self.load_model(mmap_mode=mmap_mode)
 
-            # Load the model
-            model_ref = reference["model"]
-            model_path = self.get_local_path(self.filename_model)
-            lake.download(model_ref["path"], model_path)
-            self.load_model()
+        self.reference = reference
+        self.reference_file = reference_file
+        self.mmap_mode = mmap_mode
+        self.is_loaded = True
+        self.load_seconds = time.perf_counter() - started_at
+        self.size_bytes = os.path.getsize(dist_path) + os.path.getsize(model_path)
+
+    @property
+    def version(self) -> str:
+        """
+        The version of the loaded model, being the md5 of the model in its reference
+        file, or None if the model was not loaded from a reference
+        """
+        if self.reference is None:
+            return None
+        return self.reference.get("model", dict()).get("md5")
+
+    def clone(self):
+        """
+        Create a new, unloaded `ModelContainer` with the same definition (name,
+        features and services) as this one, e.g. for loading a new version of the
+        model alongside the current one.
+
+        Returns:
+            The new `ModelContainer`
+        """
+        container = ModelContainer(
+            name=self.name,
+            project_name=self.project_name,
+            features_numeric=self.features_numeric,
+            features_categorical=self.features_categorical,
+            target=self.target,
+            services=self.services,
+        )
+        container.artifact_cache = self.artifact_cache
+        return container
+
+    def with_artifact_cache(self, artifact_cache: ArtifactCache):
+        """
+        Use the given `ArtifactCache` when loading this model, rather than the one
+        configured by the platform config (`artifact_cache_path`)
+
+        Args:
+            artifact_cache (ArtifactCache): The cache to use
+
+        Returns:
+            A reference to self
+        """
+        self.artifact_cache = artifact_cache
+        return self
+
+    def get_artifact_cache(self) -> ArtifactCache:
+        """
+        Get the local `ArtifactCache` used to avoid re-downloading artifacts which have
+        not changed, creating it from the platform config if needed
+
+        Returns:
+            The `ArtifactCache`, or None if caching is disabled
+        """
+        if self.artifact_cache is None:
+            config = self.services.config
+            if config.artifact_cache_max_bytes > 0:
+                self.artifact_cache = ArtifactCache(config.artifact_cache_path, config.artifact_cache_max_bytes)
+        return self.artifact_cache
+
+    def _fetch_artifacts(self, lake, artifacts: List[Tuple[Dict[str, str], str]]):
+        """
+        Download each artifact described by an artifact reference (from the reference file)
+        to its local path, from the artifact cache if we have seen its md5 before, with the
+        rest downloaded concurrently (see `DataLakeBase.download_many`).  Downloads are
+        written beside the local path and checked against their md5, then swapped in, as
+        a memory mapped model may still be reading from the existing file.
+
+        Args:
+            lake (DataLakeBase): The lake to download from
+            artifacts (List[Tuple[Dict[str, str], str]]): The reference and local path of each artifact
+        """
+        cache = self.get_artifact_cache()
+
+        # Artifacts to download, grouped by the bucket they live in
+        pending: Dict[str, List[Tuple[Dict[str, str], str]]] = dict()
+        for artifact_ref, local_path in artifacts:
+            if cache is not None and "md5" in artifact_ref and cache.restore(artifact_ref["md5"], local_path):
+                continue
+            pending.setdefault(artifact_ref.get("bucket"), []).append((artifact_ref, local_path))
+
+        for bucket_name, bucket_artifacts in pending.items():
+            # Unique per process and attempt, as every (prefork) worker may reload at the same time
+            transfers = [
+                (artifact_ref["path"], f"{local_path}.{os.getpid()}.{uuid.uuid4().hex}.download")
+                for artifact_ref, local_path in bucket_artifacts
+            ]
+            results = lake.download_many(bucket_name, transfers)
+
+            try:
+                for result, (artifact_ref, local_path) in zip(results, bucket_artifacts):
+                    if not result.success:
+                        raise result.error
+
+                    if "md5" in artifact_ref:
+                        actual_md5 = file_md5(result.local_path)
+                        if actual_md5 != artifact_ref["md5"]:
+                            raise ValueError(
+                                f"ModelContainer {self.name}: {artifact_ref['path']} has an md5 of {actual_md5}, expected {artifact_ref['md5']}"
+                            )
+                        if cache is not None:
+                            cache.put(artifact_ref["md5"], result.local_path)
+
+                    os.replace(result.local_path, local_path)
+            finally:
+                for _, download_path in transfers:
+                    if os.path.exists(download_path):
+                        os.remove(download_path)
 
     def load_distributions(self, file_path: str):
         logging.info(f"ModelContainer {self.name}: load_distributions")
@@ -175,6 +387,15 @@ class ModelContainer:
             json_obj = json.load(f)
             self.feature_uniques = json_obj["feature_uniques"]
             self.feature_summaries = json_obj["feature_summaries"]
+
+        # Distributions written before the encoder was persisted get one compiled here
+        if json_obj.get("feature_encoder") is not None:
+            self.feature_encoder = FeatureEncoder.from_dict(json_obj["feature_encoder"])
+            self.feature_uniques = self.feature_encoder.feature_uniques
+        elif self.feature_uniques is not None:
+            self.feature_encoder = FeatureEncoder(self.feature_uniques, self.features_numeric)
+        else:
+            self.feature_encoder = None
         return self
 
     def publish(self):
@@ -193,8 +414,12 @@ class ModelContainer:
         lake = self.services.lake
 
 
-        lake.upload(bucket_path_dist, local_path_dist, bucket_name=config.lake_bucket)
-        lake.upload(bucket_path_model, local_path_model, bucket_name=config.lake_bucket)
+        results = lake.upload_many(
+            config.lake_bucket, [(bucket_path_dist, local_path_dist), (bucket_path_model, local_path_model)]
+        )
+        for result in results:
+            if not result.success:
+                raise result.error
 
         # Now finally we want to write our reference file to our repository and build a merge request
         reference = {
@@ -232,14 +457,36 @@ class ModelContainer:
         self.model = model
         return self
 
-    def dump_model(self):
+    def dump_model(self, compress: int = 0):
+        """
+        Write the model to the local filesystem as a `.joblib` file
+
+        Args:
+            compress (int): The joblib compression level (0-9).  Models must be
+                written uncompressed (the default) to be memory mapped by `load_model`
+
+        Returns:
+            The path to the file that was written
+        """
         model_path = self.get_local_path(self.filename_model)
-        joblib.dump(self.model, model_path)
+        joblib.dump(self.model, model_path, compress=compress)
         return model_path
 
-    def load_model(self):
+    def load_model(self, mmap_mode: str = None):
+        """
+        Load the model from its `.joblib` file on the local filesystem
+
+        Args:
+            mmap_mode (str): If set (e.g. "r"), the numpy arrays within the model are
+                memory mapped from the file rather than read into memory, so that
+                processes loading the same file share it through the page cache.
+                Compressed files cannot be mapped, and are read into memory.
+
+        Returns:
+            The loaded model
+        """
         model_path = self.get_local_path(self.filename_model)
-        self.model = joblib.load(model_path)
+        self.model = joblib.load(model_path, mmap_mode=mmap_mode)
         return self.model
 
     def get_local_path(self, filename):
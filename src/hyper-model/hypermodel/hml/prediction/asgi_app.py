@@ -0,0 +1,302 @@
+import asyncio
+import inspect
+import io
+import json
+import logging
+import sys
+import threading
+
+from concurrent.futures import Executor, TimeoutError as FutureTimeoutError
+from typing import Dict, List, Any, Callable, Tuple
+from urllib.parse import parse_qsl
+
+from flask import Flask
+
+
+class AsgiRequest:
+    """
+    A minimal view of an HTTP request, as passed to routes registered with `AsgiApp.route`
+    """
+
+    def __init__(self, scope: Dict[str, Any], body: bytes):
+        self.method: str = scope["method"]
+        self.path: str = scope["path"]
+        self.query_string: bytes = scope.get("query_string", b"")
+        self.args: Dict[str, str] = dict(parse_qsl(self.query_string.decode("latin-1")))
+        self.headers: Dict[str, str] = {
+            k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope.get("headers", [])
+        }
+        self.body = body
+
+    def get_json(self) -> Any:
+        return json.loads(self.body)
+
+
+class _ReceiveStream(io.RawIOBase):
+    """
+    The body of an ASGI request as a file (e.g. for `wsgi.input`), read from another thread,
+    which receives each chunk from the event loop only as it is needed
+    """
+
+    def __init__(self, receive: Callable, loop: asyncio.AbstractEventLoop):
+        self.receive = receive
+        self.loop = loop
+        self._chunk = memoryview(b"")
+        self._more_body = True
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while len(self._chunk) == 0 and self._more_body:
+            message = asyncio.run_coroutine_threadsafe(self.receive(), self.loop).result()
+            # A client that disconnects simply ends the body early
+            self._chunk = memoryview(message.get("body", b""))
+            self._more_body = message["type"] == "http.request" and message.get("more_body", False)
+
+        count = min(len(buffer), len(self._chunk))
+        buffer[:count] = self._chunk[:count]
+        self._chunk = self._chunk[count:]
+        return count
+
+
+class AsgiApp:
+    """
+    An ASGI application for serving an `HmlInferenceApp` from an asyncio event loop.
+
+    Routes registered with `route` are coroutines executed on the event loop, so they
+    can overlap I/O (such as feature lookups) across requests, handing CPU bound work
+    (such as `HmlInferenceApp.predict_async`) to the bounded executor.  Every other
+    request is passed through to the Flask app, which is executed on the executor so
+    that existing (synchronous) routes keep working unchanged.
+    """
+
+    def __init__(self, flask: Flask, executor: Executor = None):
+        """
+        Create a new `AsgiApp`
+
+        Args:
+            flask (Flask): The WSGI app to serve requests not handled by an async route
+            executor (Executor): The executor to run Flask requests on, which bounds
+                how many execute concurrently.  Uses the event loop's default if None.
+        """
+        self.flask = flask
+        self.executor = executor
+        self.routes: Dict[Tuple[str, str], Callable] = dict()
+        self.startup_callbacks: List[Callable] = []
+
+    def route(self, path: str, methods: List[str] = ["GET"]):
+        """
+        Register a coroutine as the handler for `path`, which is passed an `AsgiRequest`
+        and may return a `dict` / `list` (sent as JSON), a `str` or `bytes`, or a tuple of
+        one of those and a status code.  Returning None sends an empty response, with a
+        status of 204 unless another is given.
+
+        Args:
+            path (str): The exact path of the route
+            methods (List[str]): The HTTP methods to accept
+
+        Returns:
+            The decorator
+        """
+
+        def _register(func):
+            if not inspect.iscoroutinefunction(func):
+                raise TypeError(f"AsgiApp routes must be coroutines (`async def`): {func.__name__}")
+            for method in methods:
+                self.routes[(method.upper(), path)] = func
+            return func
+
+        return _register
+
+    def on_startup(self, func: Callable):
+        self.startup_callbacks.append(func)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+        else:
+            raise ValueError(f"AsgiApp does not support {scope['type']} connections")
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    for callback in self.startup_callbacks:
+                        result = callback()
+                        if inspect.isawaitable(result):
+                            await result
+                except Exception as ex:
+                    logging.exception("AsgiApp: startup failed")
+                    await send({"type": "lifespan.startup.failed", "message": str(ex)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _http(self, scope, receive, send):
+        handler = self.routes.get((scope["method"], scope["path"]))
+        if handler is not None:
+            body = await self._read_body(receive)
+            await self._handle_async(handler, AsgiRequest(scope, body), send)
+        else:
+            # The body is streamed through to Flask as it is read (e.g. by NDJSON routes)
+            await self._handle_wsgi(scope, receive, send)
+
+    async def _read_body(self, receive) -> bytes:
+        chunks = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            more_body = message.get("more_body", False)
+        return b"".join(chunks)
+
+    async def _handle_async(self, handler: Callable, request: AsgiRequest, send):
+        try:
+            result = await handler(request)
+        except Exception as ex:
+            logging.exception(f"AsgiApp: {request.path} failed")
+            result = ({"success": False, "error": str(ex)}, 500)
+
+        status = 200
+        if isinstance(result, tuple):
+            result, status = result
+        elif result is None:
+            status = 204
+
+        if result is None:
+            content_type, body = b"text/html; charset=utf-8", b""
+        elif isinstance(result, (dict, list)):
+            content_type, body = b"application/json", json.dumps(result).encode("utf-8")
+        elif isinstance(result, str):
+            content_type, body = b"text/html; charset=utf-8", result.encode("utf-8")
+        else:
+            content_type, body = b"application/octet-stream", result
+
+        await send({"type": "http.response.start", "status": status, "headers": [(b"content-type", content_type)]})
+        await send({"type": "http.response.body", "body": body})
+
+    async def _handle_wsgi(self, scope, receive, send):
+        """
+        Run the Flask app on the executor, streaming the request body to it and
+        its response back through the event loop.  The whole WSGI call (including
+        iterating its response) happens on one thread, as Flask's request context
+        is thread local.  If the response cannot be sent (e.g. the client has gone)
+        the thread stops iterating it, rather than waiting forever for room to queue
+        the rest.
+        """
+        loop = asyncio.get_event_loop()
+        body = io.BufferedReader(_ReceiveStream(receive, loop))
+        messages: asyncio.Queue = asyncio.Queue(maxsize=16)
+        cancelled = threading.Event()
+
+        def _put(message):
+            put = asyncio.run_coroutine_threadsafe(messages.put(message), loop)
+            while not cancelled.is_set():
+                try:
+                    return put.result(timeout=0.1)
+                except FutureTimeoutError:
+                    pass
+            put.cancel()
+
+        def _run():
+            try:
+                status_headers = []
+
+                def start_response(status, headers, exc_info=None):
+                    status_headers[:] = [status, headers]
+
+                result = self.flask.wsgi_app(self._environ(scope, body), start_response)
+                try:
+                    started = False
+                    for chunk in result:
+                        if cancelled.is_set():
+                            break
+                        if not started:
+                            _put(("start", status_headers))
+                            started = True
+                        if chunk:
+                            _put(("body", chunk))
+                    if not started:
+                        _put(("start", status_headers))
+                finally:
+                    if hasattr(result, "close"):
+                        result.close()
+            except Exception as ex:
+                logging.exception(f"AsgiApp: {scope['path']} failed")
+                _put(("error", ex))
+            finally:
+                _put(("end", None))
+
+        future = loop.run_in_executor(self.executor, _run)
+
+        try:
+            started = False
+            while True:
+                kind, value = await messages.get()
+                if kind == "start":
+                    status, headers = value
+                    await send({
+                        "type": "http.response.start",
+                        "status": int(status.split(" ", 1)[0]),
+                        "headers": [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers],
+                    })
+                    started = True
+                elif kind == "body":
+                    await send({"type": "http.response.body", "body": value, "more_body": True})
+                elif kind == "error" and started:
+                    # Raising (rather than ending the body) makes the server drop the
+                    # connection, so the client can't mistake the truncated body for the whole
+                    raise RuntimeError(f"AsgiApp: {scope['path']} failed after its response started") from value
+                elif kind == "error":
+                    await send({"type": "http.response.start", "status": 500, "headers": []})
+                    started = True
+                elif kind == "end":
+                    break
+
+            await send({"type": "http.response.body", "body": b""})
+        except BaseException:
+            cancelled.set()
+            raise
+        await future
+
+    @staticmethod
+    def _environ(scope, body: io.BufferedReader) -> Dict[str, Any]:
+        server = scope.get("server") or ("localhost", 80)
+        client = scope.get("client") or ("", 0)
+
+        environ = {
+            "REQUEST_METHOD": scope["method"],
+            "SCRIPT_NAME": scope.get("root_path", ""),
+            "PATH_INFO": scope["path"],
+            "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+            "SERVER_NAME": str(server[0]),
+            "SERVER_PORT": str(server[1]),
+            "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+            "REMOTE_ADDR": str(client[0]),
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": scope.get("scheme", "http"),
+            "wsgi.input": body,
+            # The server has already de-chunked the body, which ends when the client's does
+            "wsgi.input_terminated": True,
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+        }
+
+        for name, value in scope.get("headers", []):
+            name = name.decode("latin-1").upper().replace("-", "_")
+            value = value.decode("latin-1")
+            if name in ["CONTENT_TYPE", "CONTENT_LENGTH"]:
+                environ[name] = value
+            else:
+                key = f"HTTP_{name}"
+                environ[key] = f"{environ[key]},{value}" if key in environ else value
+
+        return environ
@@ -0,0 +1,208 @@
+import bisect
+import math
+import threading
+import time
+
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Dict, List, Any, Callable, Iterator, Tuple
+
+
+# Seconds, from 0.5ms to 10s
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class _Metric(ABC):
+    """
+    The base of a metric with a set of values, one for each combination of label values
+    """
+
+    metric_type = "untyped"
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _labels(labels: Dict[str, Any]) -> Labels:
+        return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.metric_type}"]
+        lines.extend(self._render_samples())
+        return lines
+
+    @abstractmethod
+    def _render_samples(self) -> List[str]:
+        pass
+
+
+class Counter(_Metric):
+    """
+    A value which only ever goes up (e.g. a number of requests)
+    """
+
+    metric_type = "counter"
+
+    def __init__(self, name: str, help: str):
+        _Metric.__init__(self, name, help)
+        self.values: Dict[Labels, float] = dict()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._labels(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def _render_samples(self) -> List[str]:
+        with self._lock:
+            return [_sample(self.name, key, value) for key, value in sorted(self.values.items())]
+
+
+class Gauge(_Metric):
+    """
+    A value which can go up and down (e.g. the number of requests in flight)
+    """
+
+    metric_type = "gauge"
+
+    def __init__(self, name: str, help: str):
+        _Metric.__init__(self, name, help)
+        self.values: Dict[Labels, float] = dict()
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self.values[self._labels(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._labels(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def _render_samples(self) -> List[str]:
+        with self._lock:
+            return [_sample(self.name, key, value) for key, value in sorted(self.values.items())]
+
+
+class Histogram(_Metric):
+    """
+    The distribution of a value (e.g. a latency in seconds), counted into cumulative buckets
+    """
+
+    metric_type = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        _Metric.__init__(self, name, help)
+        self.buckets = tuple(sorted(buckets))
+        # Labels -> (count in each bucket (not cumulative), with +Inf last, sum)
+        self.values: Dict[Labels, Tuple[List[int], float]] = dict()
+
+    def observe(self, value: float, **labels):
+        key = self._labels(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self.values.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+            counts[index] += 1
+            self.values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """
+        Observe how long the body of a `with` block takes
+        """
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started_at, **labels)
+
+    def _render_samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for key, (counts, total) in sorted(self.values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (math.inf,), counts):
+                    cumulative += count
+                    le = "+Inf" if bound == math.inf else repr(bound)
+                    lines.append(_sample(f"{self.name}_bucket", key + (("le", le),), cumulative))
+                lines.append(_sample(f"{self.name}_sum", key, total))
+                lines.append(_sample(f"{self.name}_count", key, cumulative))
+        return lines
+
+
+class InferenceMetrics:
+    """
+    The `InferenceMetrics` records how an `HmlInferenceApp` is performing: the latency of
+    each route, how long each stage of a prediction takes (decode, encode, predict and
+    serialize), the number of requests in flight, and how long each model took to load and
+    how large its artifacts are.  `render` produces them in the Prometheus text exposition
+    format, so they can be scraped (see `bind_metrics_routes`) without other services.
+    """
+
+    def __init__(self, prefix: str = "hml"):
+        self.prefix = prefix
+        self.request_seconds = Histogram(f"{prefix}_request_duration_seconds", "The time taken to serve each request, by route")
+        self.requests = Counter(f"{prefix}_requests_total", "The number of requests served, by route and status")
+        self.requests_in_flight = Gauge(f"{prefix}_requests_in_flight", "The number of requests currently being served")
+        self.stage_seconds = Histogram(f"{prefix}_stage_duration_seconds", "The time taken by each stage of a prediction, by model")
+
+        # Metrics about the state of the app, which are collected each time they are rendered
+        self.collectors: List[Callable[[], List[_Metric]]] = []
+
+    def time_stage(self, stage: str, model: str = ""):
+        """
+        Time a stage of making a prediction (e.g. "encode" or "predict") with a `with` block
+
+        Args:
+            stage (str): The name of the stage
+            model (str): The name of the model the stage is for
+        """
+        return self.stage_seconds.time(stage=stage, model=model)
+
+    def observe_request(self, route: str, method: str, status: int, seconds: float):
+        self.request_seconds.observe(seconds, route=route, method=method)
+        self.requests.inc(route=route, method=method, status=status)
+
+    def add_collector(self, collector: Callable[[], List[_Metric]]):
+        """
+        Add a function which is called to build more metrics each time metrics are rendered
+        """
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        """
+        Render every metric in the Prometheus text exposition format (version 0.0.4)
+        """
+        metrics: List[_Metric] = [self.request_seconds, self.requests, self.requests_in_flight, self.stage_seconds]
+        for collector in self.collectors:
+            metrics.extend(collector())
+
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def _sample(name: str, labels: Labels, value: float) -> str:
+    if labels:
+        label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+        name = f"{name}{{{label_text}}}"
+    return f"{name} {_format_value(value)}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, float):
+        if math.isinf(value):
+            return "+Inf" if value > 0 else "-Inf"
+        if value.is_integer():
+            return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
@@ -0,0 +1,241 @@
+import logging
+import threading
+import time
+import queue
+import numpy
+
+from concurrent.futures import Future
+from typing import Dict, List, Any, Optional
+
+
+class _PendingPrediction:
+    """
+    A single queued request for a prediction, waiting to be batched
+    """
+
+    def __init__(self, features: Dict[str, Any], throw_on_missing: bool, row: numpy.ndarray = None):
+        self.features = features
+        self.throw_on_missing = throw_on_missing
+        # The features already encoded (e.g. to look them up in the prediction cache), if they have been
+        self.row = row
+        self.enqueued_at = time.monotonic()
+        self.future: Future = Future()
+
+
+class MicroBatcher:
+    """
+    The `MicroBatcher` collects prediction requests arriving concurrently from many
+    threads (e.g. waitress worker threads) for the same model, and executes them as a
+    single batched encode + `model.predict` call, returning each result to the thread
+    that asked for it.  A batch is executed once it has `max_batch_size` requests, or
+    once the first request in the batch has waited `max_wait_ms`.  Once stopped, any
+    further requests (e.g. racing with the model being replaced) are predicted one
+    at a time on the thread that asked for them.
+    """
+
+    def __init__(self, model_container: "ModelContainer", max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        """
+        Create a new `MicroBatcher` for the given model
+
+        Args:
+            model_container (ModelContainer): The (loaded) container of the model to predict with
+            max_batch_size (int): The maximum number of requests to predict in one call
+            max_wait_ms (float): The longest a request will wait for a batch to fill up
+        """
+        if max_batch_size < 1:
+            raise ValueError("Parameter: `max_batch_size` must be at least 1")
+
+        self.model_container = model_container
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+        self._lock = threading.Lock()
+
+        # Metrics about batching
+        self.requests = 0
+        self.batches = 0
+        self.batch_size_max = 0
+        self.batch_sizes: Dict[int, int] = dict()
+        self.queue_delay_total_ms = 0.0
+        self.queue_delay_max_ms = 0.0
+
+    def start(self):
+        """
+        Start the background thread which executes batches of predictions, unless
+        the batcher has been stopped
+
+        Returns:
+            A reference to self
+        """
+        with self._lock:
+            self._start()
+        return self
+
+    def _start(self):
+        # Called holding the lock
+        if self._thread is None and not self._stopped:
+            name = f"micro-batcher-{self.model_container.name}"
+            self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """
+        Stop the background thread once all the requests already queued have been predicted
+        """
+        with self._lock:
+            self._stopped = True
+            thread = self._thread
+            self._thread = None
+        if thread is not None:
+            # Queued after every request submitted before stopping (see `submit`)
+            self._queue.put(None)
+            thread.join()
+
+    def predict(self, features: Dict[str, Any], throw_on_missing=False, timeout: float = None, row: numpy.ndarray = None) -> Any:
+        """
+        Queue a prediction for a single set of features, blocking until the batch
+        it is a part of has been executed.
+
+        Args:
+            features (Dict[str, Any]): The value of each feature, keyed by feature name
+            throw_on_missing (bool): Throw an Exception if a categorical value has not
+                been seen before (see `one_hot_encode`)
+            timeout (float): The maximum number of seconds to wait for a result
+            row (numpy.ndarray): The features already encoded by `encode_row`, if they
+                have been, so that they are not encoded again
+
+        Returns:
+            The prediction for these features
+        """
+        return self.submit(features, throw_on_missing, row=row).result(timeout=timeout)
+
+    def submit(self, features: Dict[str, Any], throw_on_missing=False, row: numpy.ndarray = None) -> Future:
+        """
+        Queue a prediction for a single set of features, without waiting for it
+
+        Args:
+            features (Dict[str, Any]): The value of each feature, keyed by feature name
+            throw_on_missing (bool): Throw an Exception if a categorical value has not
+                been seen before (see `one_hot_encode`)
+            row (numpy.ndarray): The features already encoded by `encode_row`, if they
+                have been, so that they are not encoded again
+
+        Returns:
+            A `concurrent.futures.Future` which will hold the prediction
+        """
+        pending = _PendingPrediction(features, throw_on_missing, row)
+        with self._lock:
+            stopped = self._stopped
+            if not stopped:
+                self._start()
+                self._queue.put(pending)
+
+        if stopped:
+            self._execute([pending])
+        return pending.future
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Get metrics about the batches executed so far
+
+        Returns:
+            A dictionary of batch size and queueing delay statistics
+        """
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "batches": self.batches,
+                "batch_size_mean": self.requests / self.batches if self.batches > 0 else 0.0,
+                "batch_size_max": self.batch_size_max,
+                "batch_sizes": dict(self.batch_sizes),
+                "queue_delay_mean_ms": self.queue_delay_total_ms / self.requests if self.requests > 0 else 0.0,
+                "queue_delay_max_ms": self.queue_delay_max_ms,
+            }
+
+    def _run(self):
+        logging.info(f"MicroBatcher {self.model_container.name}: started")
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                break
+            self._execute(batch)
+        logging.info(f"MicroBatcher {self.model_container.name}: stopped")
+
+    def _next_batch(self) -> Optional[List[_PendingPrediction]]:
+        """
+        Wait for the next request, then keep collecting requests until either the
+        batch is full or the first request has waited `max_wait_ms`
+        """
+        first = self._queue.get()
+        if first is None:
+            return None
+
+        batch = [first]
+        deadline = first.enqueued_at + self.max_wait_ms / 1000
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                pending = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+
+            if pending is None:
+                # Finish this batch, then stop
+                self._queue.put(None)
+                break
+            batch.append(pending)
+
+        return batch
+
+    def _execute(self, batch: List[_PendingPrediction]):
+        started_at = time.monotonic()
+        self._record(batch, started_at)
+
+        try:
+            encoder = self.model_container.get_encoder()
+            matrix = numpy.zeros((len(batch), encoder.width))
+
+            # Encode each request into its row of the matrix, failing only the
+            # requests that can't be encoded
+            encoded: List[_PendingPrediction] = []
+            for pending in batch:
+                try:
+                    if pending.row is not None:
+                        matrix[len(encoded)] = pending.row
+                    else:
+                        encoder.encode_row(pending.features, pending.throw_on_missing, out=matrix[len(encoded)])
+                    encoded.append(pending)
+                except Exception as ex:
+                    pending.future.set_exception(ex)
+
+            if len(encoded) == 0:
+                return
+
+            predictions = self.model_container.model.predict(matrix[: len(encoded)])
+            for pending, prediction in zip(encoded, predictions):
+                pending.future.set_result(prediction)
+
+        except Exception as ex:
+            logging.error(f"MicroBatcher {self.model_container.name}: batch of {len(batch)} failed: {ex}")
+            for pending in batch:
+                if not pending.future.done():
+                    pending.future.set_exception(ex)
+
+    def _record(self, batch: List[_PendingPrediction], started_at: float):
+        with self._lock:
+            size = len(batch)
+            self.requests += size
+            self.batches += 1
+            self.batch_size_max = max(self.batch_size_max, size)
+            self.batch_sizes[size] = self.batch_sizes.get(size, 0) + 1
+
+            for pending in batch:
+                delay_ms = (started_at - pending.enqueued_at) * 1000
+                self.queue_delay_total_ms += delay_ms
+                self.queue_delay_max_ms = max(self.queue_delay_max_ms, delay_ms)
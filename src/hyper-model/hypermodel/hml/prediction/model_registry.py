@@ -0,0 +1,184 @@
+import hashlib
+import random
+import threading
+
+from typing import Dict, Optional
+
+
+class ModelRegistry:
+    """
+    The `ModelRegistry` holds several concurrent versions of each model served by an
+    `HmlInferenceApp`, keyed by model name and version (the md5 of the model in its
+    reference file), so that canary or A/B versions can be served from the same process.
+
+    Requests are routed to a version either explicitly (e.g. from a request header), or
+    by splitting traffic between the versions according to their weights.  Versions with
+    a weight of 0 are only served when asked for explicitly (e.g. shadow versions).
+
+    Versions trained against the same distributions share a single `FeatureEncoder`.
+    """
+
+    def __init__(self):
+        # Both are replaced (never modified in place) so either can be read without locking,
+        # though reading both together (see `route`) needs the lock to see them in step
+        self.versions: Dict[str, Dict[str, "ModelContainer"]] = dict()
+        self.weights: Dict[str, Dict[str, float]] = dict()
+        self._lock = threading.Lock()
+
+    def register(self, model_container: "ModelContainer", version: str = None, weight: float = 1.0) -> str:
+        """
+        Add a version of a model to the registry, replacing any existing model with
+        the same name and version
+
+        Args:
+            model_container (ModelContainer): The (loaded) model
+            version (str): The version of the model, defaulting to `model_container.version`
+            weight (float): The share of traffic to route to this version (relative to the
+                weights of the other versions), or 0 to only route to it explicitly
+
+        Returns:
+            The version the model was registered as
+        """
+        version = version or model_container.version
+        if version is None:
+            raise ValueError(f"Parameter: `version` must be supplied for {model_container.name}, as it has no reference")
+        if weight < 0:
+            raise ValueError("Parameter: `weight` must not be negative")
+
+        name = model_container.name
+        with self._lock:
+            self._share_encoder(model_container)
+            self._set(name, version, model_container, weight)
+        return version
+
+    def unregister(self, name: str, version: str):
+        """
+        Remove a version of a model from the registry
+        """
+        with self._lock:
+            self._unregister(name, version)
+
+    def replace(self, current: "ModelContainer", model_container: "ModelContainer") -> Optional[str]:
+        """
+        Swap the version `current` for `model_container` (e.g. after reloading a model),
+        keeping its share of the traffic
+
+        Returns:
+            The version `model_container` was registered as, or None if `current` was not registered
+        """
+        with self._lock:
+            name = current.name
+            for version, registered in self.versions.get(name, dict()).items():
+                if registered is current:
+                    weight = self.weights[name][version]
+                    self._unregister(name, version)
+                    self._share_encoder(model_container)
+                    new_version = model_container.version or version
+                    self._set(name, new_version, model_container, weight)
+                    return new_version
+        return None
+
+    def set_weights(self, name: str, weights: Dict[str, float]):
+        """
+        Set how traffic is split between the versions of a model
+
+        Args:
+            name (str): The name of the model
+            weights (Dict[str, float]): The weight of each version, keyed by version
+        """
+        with self._lock:
+            current = self.weights.get(name, dict())
+            for version in weights:
+                if version not in current:
+                    raise KeyError(f"No version '{version}' of model '{name}' has been registered")
+            self._replace(name, self.versions[name], {**current, **weights})
+
+    def get(self, name: str, version: str) -> Optional["ModelContainer"]:
+        """
+        Get a specific version of a model, or None if it is not registered
+        """
+        return self.versions.get(name, dict()).get(version)
+
+    def route(self, name: str, routing_key: str = None) -> Optional["ModelContainer"]:
+        """
+        Pick a version of a model according to the weights of its versions
+
+        Args:
+            name (str): The name of the model
+            routing_key (str): If given (e.g. a user id), the same key is always routed
+                to the same version (while the weights are unchanged)
+
+        Returns:
+            The chosen version of the model, or None if no version has a weight
+        """
+        with self._lock:
+            versions = self.versions.get(name)
+            weights = self.weights.get(name)
+        if not versions or not weights:
+            return None
+
+        total = sum(weights.values())
+        if total <= 0:
+            return None
+
+        if routing_key is None:
+            point = random.random() * total
+        else:
+            digest = hashlib.md5(str(routing_key).encode("utf-8")).hexdigest()
+            point = int(digest[:8], 16) / 0x100000000 * total
+
+        chosen = None
+        for version, weight in sorted(weights.items()):
+            if weight <= 0:
+                continue
+            chosen = version
+            point -= weight
+            if point < 0:
+                break
+        return versions.get(chosen)
+
+    def list_versions(self, name: str) -> Dict[str, float]:
+        """
+        Get the versions of a model that are registered, and their weights
+        """
+        return dict(self.weights.get(name, dict()))
+
+    def _unregister(self, name: str, version: str):
+        versions = dict(self.versions.get(name, dict()))
+        weights = dict(self.weights.get(name, dict()))
+        versions.pop(version, None)
+        weights.pop(version, None)
+        self._replace(name, versions, weights)
+
+    def _set(self, name: str, version: str, model_container: "ModelContainer", weight: float):
+        versions = dict(self.versions.get(name, dict()))
+        weights = dict(self.weights.get(name, dict()))
+        versions[version] = model_container
+        weights[version] = weight
+        self._replace(name, versions, weights)
+
+    def _replace(self, name: str, versions: Dict[str, "ModelContainer"], weights: Dict[str, float]):
+        self.versions = {**self.versions, name: versions}
+        self.weights = {**self.weights, name: weights}
+
+    def _share_encoder(self, model_container: "ModelContainer"):
+        """
+        Point `model_container` at the encoder (and distributions) of an existing version
+        of the same model if they were built from the same distributions
+        """
+        if model_container.feature_uniques is None:
+            return
+
+        encoder = model_container.get_encoder()
+        for existing in self.versions.get(model_container.name, dict()).values():
+            if existing is model_container or existing.feature_uniques is None:
+                continue
+            existing_encoder = existing.get_encoder()
+            if existing_encoder is encoder or existing_encoder.to_dict() != encoder.to_dict():
+                continue
+
+            model_container.feature_encoder = existing_encoder
+            model_container.feature_uniques = existing_encoder.feature_uniques
+            if getattr(existing, "feature_summaries", None) == getattr(model_container, "feature_summaries", None):
+                model_container.feature_summaries = existing.feature_summaries
+            return
@@ -0,0 +1,104 @@
+import json
+import logging
+import os
+import threading
+
+from typing import Dict, List, Optional, Tuple
+
+
+class ModelReloader:
+    """
+    The `ModelReloader` watches the reference file (see `ModelContainer.dump_reference`)
+    of every loaded model in an `HmlInferenceApp`, and when a reference changes, has the
+    app load the new version in the background and swap it in (see `HmlInferenceApp.reload_model`).
+    """
+
+    def __init__(self, inference_app: "HmlInferenceApp", poll_seconds: float = 30.0):
+        """
+        Create a new `ModelReloader`
+
+        Args:
+            inference_app (HmlInferenceApp): The app whose models to reload
+            poll_seconds (float): How often to check the reference files for changes
+        """
+        self.inference_app = inference_app
+        self.poll_seconds = poll_seconds
+
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        # The (mtime, size) of each reference file when last checked, keyed by path
+        self._file_stats: Dict[str, Tuple[float, int]] = dict()
+
+    def start(self):
+        """
+        Start checking for new model versions in a background thread
+
+        Returns:
+            A reference to self
+        """
+        if self._thread is None:
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name="model-reloader", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop the background thread
+        """
+        thread = self._thread
+        self._thread = None
+        if thread is not None:
+            self._stop_event.set()
+            thread.join()
+
+    def check(self) -> List[str]:
+        """
+        Check the reference file of every loaded model once, reloading any which have changed
+
+        Returns:
+            The names of the models which were reloaded
+        """
+        reloaded = []
+        for name, model_container in list(self.inference_app.models.items()):
+            reference_file = model_container.reference_file
+            if reference_file is None or not self._has_file_changed(reference_file):
+                continue
+
+            try:
+                with open(reference_file) as f:
+                    reference = json.load(f)
+            except Exception as ex:
+                # Most likely caught part way through being written, so try again next time
+                logging.warning(f"ModelReloader: unable to read {reference_file}: {ex}")
+                self._file_stats.pop(reference_file, None)
+                continue
+
+            if reference == model_container.reference:
+                continue
+            if self.inference_app.reload_model(name, reference_file):
+                reloaded.append(name)
+            else:
+                # e.g. the artifacts it refers to haven't finished uploading, so try again next time
+                self._file_stats.pop(reference_file, None)
+
+        return reloaded
+
+    def _has_file_changed(self, path: str) -> bool:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return False
+
+        current = (stat.st_mtime, stat.st_size)
+        previous = self._file_stats.get(path)
+        self._file_stats[path] = current
+        return previous != current
+
+    def _run(self):
+        logging.info(f"ModelReloader: watching model references every {self.poll_seconds}s")
+        while not self._stop_event.wait(self.poll_seconds):
+            try:
+                self.check()
+            except Exception:
+                logging.exception("ModelReloader: check failed")
@@ -0,0 +1,135 @@
+import hashlib
+import threading
+import time
+
+from collections import OrderedDict
+from typing import Dict, Any, Tuple
+
+import numpy
+
+
+class PredictionCache:
+    """
+    The `PredictionCache` remembers recent predictions, keyed by a hash of the encoded
+    feature vector and the model (version) that made them, so that repeated requests
+    for the same features skip `model.predict`.  The cache holds at most `max_entries`
+    predictions, evicting the least recently used first, and each prediction expires
+    `ttl_seconds` after it was made.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 300.0):
+        """
+        Create a new `PredictionCache`
+
+        Args:
+            max_entries (int): The maximum number of predictions to keep
+            ttl_seconds (float): How long a prediction may be served from the cache
+        """
+        if max_entries < 1:
+            raise ValueError("Parameter: `max_entries` must be at least 1")
+
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        # (model key, feature hash) -> (expires at, prediction), least recently used first
+        self._entries: "OrderedDict[Tuple[str, bytes], Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def model_key(model_container: "ModelContainer") -> str:
+        """
+        Get the key identifying a specific loaded version of a model
+        """
+        return f"{model_container.name}:{model_container.version}:{id(model_container)}"
+
+    @staticmethod
+    def feature_hash(feature_vector: numpy.ndarray) -> bytes:
+        """
+        Get a canonical hash of an encoded feature vector (see `FeatureEncoder.encode_row`)
+        """
+        vector = numpy.ascontiguousarray(feature_vector, dtype=numpy.float64)
+        return hashlib.blake2b(vector.tobytes(), digest_size=16).digest()
+
+    def get(self, model_container: "ModelContainer", feature_vector: numpy.ndarray) -> Tuple[bool, Any]:
+        """
+        Look up the prediction `model_container` made for `feature_vector`
+
+        Returns:
+            A tuple of whether the prediction was found, and the prediction
+        """
+        key = (self.model_key(model_container), self.feature_hash(feature_vector))
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, prediction = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, prediction
+
+                del self._entries[key]
+                self.expirations += 1
+
+            self.misses += 1
+            return False, None
+
+    def put(self, model_container: "ModelContainer", feature_vector: numpy.ndarray, prediction: Any):
+        """
+        Remember the prediction `model_container` made for `feature_vector`
+        """
+        key = (self.model_key(model_container), self.feature_hash(feature_vector))
+        expires_at = time.monotonic() + self.ttl_seconds
+
+        with self._lock:
+            self._entries[key] = (expires_at, prediction)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, model_container: "ModelContainer") -> int:
+        """
+        Forget every prediction made by `model_container` (e.g. once it has been replaced)
+
+        Returns:
+            The number of predictions removed
+        """
+        model_key = self.model_key(model_container)
+        with self._lock:
+            keys = [key for key in self._entries if key[0] == model_key]
+            for key in keys:
+                del self._entries[key]
+        return len(keys)
+
+    def clear(self):
+        """
+        Forget every prediction
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Get metrics about how effective the cache has been
+
+        Returns:
+            A dictionary of hit, miss and eviction counts, the hit rate and current size
+        """
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / requests if requests > 0 else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+            }
@@ -0,0 +1,199 @@
+import gc
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+
+from typing import Dict, Callable, Optional
+from waitress import serve, wasyncore
+from waitress.server import create_server
+
+
+class PreforkServer:
+    """
+    The `PreforkServer` serves a WSGI app from several worker processes forked
+    from the current process, which all accept connections from the same listening
+    socket.  Everything loaded before `start` (e.g. the models of an `HmlInferenceApp`)
+    is shared between the workers copy-on-write, so each model is only held in memory
+    once while predictions run on as many cores as there are workers.
+    """
+
+    def __init__(
+        self,
+        app,
+        port: int,
+        workers: int,
+        threads: int = 4,
+        host: str = "0.0.0.0",
+        after_fork: Callable[[], None] = None,
+        before_fork: Callable[[], None] = None,
+    ):
+        """
+        Create a new `PreforkServer`
+
+        Args:
+            app: The WSGI app to serve (e.g. a Flask app)
+            port (int): The port to listen on
+            workers (int): The number of worker processes to fork
+            threads (int): The number of threads in each worker
+            host (str): The interface to listen on
+            after_fork (Callable): Called in each worker once forked, before serving,
+                to reset any state which does not survive a fork (e.g. threads)
+            before_fork (Callable): Called once the socket is bound, before forking the
+                workers (e.g. to load the models), while the app is served from this
+                process, so that requests (e.g. health checks) are answered meanwhile
+        """
+        if workers < 1:
+            raise ValueError("Parameter: `workers` must be at least 1")
+
+        self.app = app
+        self.port = port
+        self.workers = workers
+        self.threads = threads
+        self.host = host
+        self.after_fork = after_fork
+        self.before_fork = before_fork
+
+        self.socket: Optional[socket.socket] = None
+        self.pids: Dict[int, int] = dict()
+        self._stopping = False
+
+    def start(self):
+        """
+        Bind the listening socket and fork the workers, returning in the parent
+
+        Returns:
+            A reference to self
+        """
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.socket.bind((self.host, self.port))
+        self.socket.listen(1024)
+        self.port = self.socket.getsockname()[1]
+
+        if self.before_fork is not None:
+            self._serve_during(self.before_fork)
+
+        # Move everything loaded so far out of the reach of the garbage collector, so
+        # that collections in the workers don't write to (and so copy) the shared pages
+        gc.collect()
+        if hasattr(gc, "freeze"):
+            gc.freeze()
+
+        for index in range(self.workers):
+            self._spawn(index)
+
+        logging.info(f"PreforkServer: {self.workers} workers listening on {self.host}:{self.port}")
+        return self
+
+    def serve_forever(self):
+        """
+        Start the workers (if not already started) and supervise them, replacing
+        any worker that dies, until the process receives SIGTERM or SIGINT.
+        """
+        if self.socket is None:
+            self.start()
+
+        def _handle_signal(signum, frame):
+            self._stopping = True
+
+        signal.signal(signal.SIGTERM, _handle_signal)
+        signal.signal(signal.SIGINT, _handle_signal)
+
+        while not self._stopping:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                pid = 0
+
+            if pid == 0:
+                time.sleep(0.5)
+                continue
+
+            index = self.pids.pop(pid, None)
+            if index is not None and not self._stopping:
+                logging.warning(f"PreforkServer: worker {index} (pid {pid}) exited with status {status}, restarting")
+                self._spawn(index)
+
+        self.stop()
+
+    def stop(self, timeout: float = 10.0):
+        """
+        Terminate the workers, waiting up to `timeout` seconds before killing them
+        """
+        self._stopping = True
+        for pid in list(self.pids):
+            self._signal(pid, signal.SIGTERM)
+
+        deadline = time.monotonic() + timeout
+        while self.pids and time.monotonic() < deadline:
+            for pid in list(self.pids):
+                try:
+                    if os.waitpid(pid, os.WNOHANG)[0] != 0:
+                        self.pids.pop(pid)
+                except ChildProcessError:
+                    self.pids.pop(pid)
+            time.sleep(0.05)
+
+        for pid in list(self.pids):
+            self._signal(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+            self.pids.pop(pid)
+
+        if self.socket is not None:
+            self.socket.close()
+            self.socket = None
+
+        if hasattr(gc, "unfreeze"):
+            gc.unfreeze()
+
+    def _serve_during(self, func: Callable[[], None]):
+        """
+        Serve the app from this process while `func` runs, on a duplicate of the listening
+        socket, stopping (and joining every thread) before returning, so that it is safe to fork
+        """
+        socket_map = dict()
+        server = create_server(self.app, map=socket_map, sockets=[self.socket.dup()], threads=self.threads)
+        thread = threading.Thread(target=server.run, name="prefork-before-fork", daemon=True)
+        thread.start()
+        logging.info(f"PreforkServer: serving from the parent on {self.host}:{self.port} until the workers are forked")
+
+        try:
+            func()
+        finally:
+            def stop():
+                # Run on the server's own thread, as the socket map isn't safe to change from any other
+                server.task_dispatcher.shutdown()
+                wasyncore.close_all(socket_map)
+
+            server.trigger.pull_trigger(stop)
+            thread.join()
+
+    def _spawn(self, index: int):
+        pid = os.fork()
+        if pid > 0:
+            self.pids[pid] = index
+            return
+
+        # In the worker: serve until terminated, never returning to the parent's code
+        exit_code = 0
+        try:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            if self.after_fork is not None:
+                self.after_fork()
+            serve(self.app, sockets=[self.socket], threads=self.threads)
+        except BaseException:
+            logging.exception(f"PreforkServer: worker {index} failed")
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+
+    @staticmethod
+    def _signal(pid: int, signum: int):
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            pass
@@ -0,0 +1,239 @@
+import logging
+import json
+import msgpack
+import numpy
+import pandas as pd
+
+from typing import Dict, List, Any, Iterator, Callable, Optional
+from flask import Flask, request, jsonify, Response, stream_with_context
+
+from hypermodel.hml.prediction.metrics import InferenceMetrics
+from hypermodel.hml.prediction.routes.routing import request_routing, version_headers
+
+
+NDJSON_CONTENT_TYPES = ["application/x-ndjson", "application/ndjson", "application/jsonlines"]
+MSGPACK_CONTENT_TYPES = ["application/msgpack", "application/x-msgpack", "application/vnd.msgpack"]
+
+
+def bind_batch_routes(app: Flask, inference_app: "HmlInferenceApp", chunk_rows: int = 10000):
+    """
+    Binds a new route to the Flask App for making predictions for many rows
+    at once.  `POST /predict/batch` accepts either JSON, or newline delimited JSON
+    (one feature dictionary per line, with a Content-Type of `application/x-ndjson`,
+    streamed back as one prediction per line).  Rows are encoded and predicted in
+    vectorized chunks of `chunk_rows` rows.  Other than for NDJSON (where an error
+    part way through is reported as a final line), every row is predicted before
+    responding, so that any bad input fails the request with a 400.
+
+    Clients sending a lot of numeric features can instead send MessagePack (with a
+    Content-Type of `application/msgpack`), which avoids the cost of JSON on both
+    sides.  Either way, the body is a map of features (predicting a single row, which
+    is answered with a single prediction), an array of feature maps, or a map of
+    feature name to an array of values (one per row), which is answered with an
+    array of predictions.
+
+    The model to use is given by the `model` query parameter, which may be omitted
+    if only one model has been registered.  Passing `throw_on_missing=true` will
+    fail the request if a categorical value has not been seen before.  A specific
+    version of the model can be requested with the `X-Model-Version` header, or
+    routed to consistently with the `X-Routing-Key` header (see `request_routing`),
+    and the version used is returned in the `X-Model-Version` header.
+
+    Args:
+        app (Flask): The app to bind the new routes
+        inference_app (HmlInferenceApp): The app used to look up models and predict
+        chunk_rows (int): The number of rows to encode and predict at a time
+
+    Returns:
+        Nothing
+    """
+
+    @app.route("/predict/batch", methods=["POST"])
+    def predict_batch():
+        logging.info("api: /predict/batch")
+
+        name = request.args.get("model")
+        if name is None:
+            if len(inference_app.models) != 1:
+                return jsonify({"success": False, "error": "Parameter: `model` must be supplied"}), 400
+            name = next(iter(inference_app.models))
+
+        try:
+            model = inference_app.select_model(name, **request_routing(request.headers))
+        except KeyError as ex:
+            return jsonify({"success": False, "error": ex.args[0]}), 404
+
+        metrics = inference_app.metrics
+        headers = version_headers(model)
+        throw_on_missing = request.args.get("throw_on_missing", "false").lower() == "true"
+
+        if request.mimetype in MSGPACK_CONTENT_TYPES:
+            return _predict_msgpack(inference_app, model, request.get_data(), headers, throw_on_missing, chunk_rows)
+
+        if request.mimetype in NDJSON_CONTENT_TYPES:
+            chunks = _read_ndjson_chunks(request.stream, chunk_rows)
+            body = _stream_ndjson(model, metrics, chunks, throw_on_missing)
+            return Response(stream_with_context(body), mimetype="application/x-ndjson", headers=headers)
+
+        with metrics.time_stage("decode", model.name):
+            payload = request.get_json(force=True, silent=True)
+
+        error = _payload_error(payload)
+        if error is not None:
+            return jsonify({"success": False, "error": error}), 400
+        if isinstance(payload, dict) and not _is_columnar(payload):
+            return _predict_row(inference_app, model, payload, headers, throw_on_missing, json.dumps, "application/json")
+
+        try:
+            predictions = _predict_payload(model, metrics, payload, throw_on_missing, chunk_rows)
+        except Exception as ex:
+            return jsonify({"success": False, "error": str(ex)}), 400
+
+        with metrics.time_stage("serialize", model.name):
+            body = json.dumps(predictions)
+        return Response(body, mimetype="application/json", headers=headers)
+
+
+def _predict_msgpack(
+    inference_app: "HmlInferenceApp", model: "ModelContainer", data: bytes, headers: Dict[str, str], throw_on_missing: bool, chunk_rows: int
+) -> Response:
+    metrics = inference_app.metrics
+    with metrics.time_stage("decode", model.name):
+        try:
+            payload = msgpack.unpackb(data, raw=False)
+        except Exception:
+            payload = None
+
+    error = _payload_error(payload)
+    if error is not None:
+        return jsonify({"success": False, "error": error}), 400
+    if isinstance(payload, dict) and not _is_columnar(payload):
+        return _predict_row(inference_app, model, payload, headers, throw_on_missing, msgpack.packb, "application/msgpack")
+
+    try:
+        predictions = _predict_payload(model, metrics, payload, throw_on_missing, chunk_rows)
+    except Exception as ex:
+        return jsonify({"success": False, "error": str(ex)}), 400
+
+    with metrics.time_stage("serialize", model.name):
+        body = msgpack.packb(predictions)
+    return Response(body, mimetype="application/msgpack", headers=headers)
+
+
+def _predict_row(
+    inference_app: "HmlInferenceApp",
+    model: "ModelContainer",
+    features: Dict[str, Any],
+    headers: Dict[str, str],
+    throw_on_missing: bool,
+    serialize: Callable[[Any], Any],
+    mimetype: str,
+) -> Response:
+    # A single row is predicted like any other request (so micro-batched and cached when enabled)
+    try:
+        prediction = inference_app.predict_with(model, features, throw_on_missing=throw_on_missing)
+    except Exception as ex:
+        return jsonify({"success": False, "error": str(ex)}), 400
+    with inference_app.metrics.time_stage("serialize", model.name):
+        body = serialize(numpy.asarray(prediction).tolist())
+    return Response(body, mimetype=mimetype, headers=headers)
+
+
+def _payload_error(payload: Any) -> Optional[str]:
+    """
+    Check the shape of a decoded (JSON or MessagePack) body, which must be a map of feature
+    values, an array of feature maps, or a map of equal length arrays (one per feature)
+
+    Returns:
+        What is wrong with the body, or None if it can be predicted
+    """
+    if isinstance(payload, list):
+        if not all(isinstance(row, dict) for row in payload):
+            return "Expected an array of feature maps, one per row"
+        return None
+
+    if not isinstance(payload, dict):
+        return "Expected a map of features, an array of feature maps, or a map of feature columns"
+    if len(payload) == 0:
+        return "Expected at least one feature"
+
+    columns = [v for v in payload.values() if isinstance(v, list)]
+    if len(columns) == 0:
+        return None
+    if len(columns) != len(payload):
+        return "Expected either a value for every feature, or an array of values for every feature"
+    if len(set(len(c) for c in columns)) > 1:
+        return "Expected the array of values of every feature to be the same length"
+    return None
+
+
+def _is_columnar(payload: Dict[str, Any]) -> bool:
+    # Feature values are scalars, so a map of arrays holds a column of values for each feature
+    return len(payload) > 0 and all(isinstance(v, list) for v in payload.values())
+
+
+def _predict_payload(model: "ModelContainer", metrics: InferenceMetrics, payload: Any, throw_on_missing: bool, chunk_rows: int) -> List[Any]:
+    # The payload has already been checked by `_payload_error`
+    if isinstance(payload, list):
+        chunks = [payload[i : i + chunk_rows] for i in range(0, len(payload), chunk_rows)]
+        return _predict_chunks(model, metrics, chunks, throw_on_missing, _predict_chunk)
+
+    with metrics.time_stage("decode", model.name):
+        data_frame = pd.DataFrame(payload, columns=model.features_all)
+    frames = [data_frame.iloc[i : i + chunk_rows] for i in range(0, len(data_frame), chunk_rows)]
+    return _predict_chunks(model, metrics, frames, throw_on_missing, _predict_frame)
+
+
+def _predict_chunks(model: "ModelContainer", metrics: InferenceMetrics, chunks: List[Any], throw_on_missing: bool, predict: Callable) -> List[Any]:
+    predictions: List[Any] = []
+    for chunk in chunks:
+        predictions.extend(predict(model, metrics, chunk, throw_on_missing))
+    return predictions
+
+
+def _predict_chunk(model: "ModelContainer", metrics: InferenceMetrics, records: List[Dict[str, Any]], throw_on_missing: bool) -> List[Any]:
+    with metrics.time_stage("decode", model.name):
+        # Features missing from every record are still needed as (null) columns
+        data_frame = pd.DataFrame(records, columns=model.features_all)
+
+    return _predict_frame(model, metrics, data_frame, throw_on_missing)
+
+
+def _predict_frame(model: "ModelContainer", metrics: InferenceMetrics, data_frame: pd.DataFrame, throw_on_missing: bool) -> List[Any]:
+    with metrics.time_stage("encode", model.name):
+        feature_matrix = model.get_encoder().encode_matrix(data_frame, throw_on_missing=throw_on_missing)
+
+    with metrics.time_stage("predict", model.name):
+        return numpy.asarray(model.model.predict(feature_matrix)).tolist()
+
+
+def _read_ndjson_chunks(stream, chunk_rows: int) -> Iterator[List[Dict[str, Any]]]:
+    chunk: List[Dict[str, Any]] = []
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        chunk.append(json.loads(line))
+        if len(chunk) >= chunk_rows:
+            yield chunk
+            chunk = []
+    if len(chunk) > 0:
+        yield chunk
+
+
+def _stream_ndjson(model: "ModelContainer", metrics: InferenceMetrics, chunks: Iterator[List[Dict[str, Any]]], throw_on_missing: bool):
+    try:
+        while True:
+            with metrics.time_stage("decode", model.name):
+                chunk = next(chunks, None)
+            if chunk is None:
+                break
+
+            predictions = _predict_chunk(model, metrics, chunk, throw_on_missing)
+            with metrics.time_stage("serialize", model.name):
+                body = "".join(json.dumps(p) + "\n" for p in predictions)
+            yield body
+    except Exception as ex:
+        # The response has already started, so the best we can do is say so in-band
+        logging.error(f"api: /predict/batch failed: {ex}")
+        yield json.dumps({"success": False, "error": str(ex)}) + "\n"
@@ -1,16 +1,24 @@
 
 import logging
 
+from typing import Callable
 from flask import Flask
 
 
-def bind_health_routes(app: Flask):
+def bind_health_routes(app: Flask, is_ready: Callable[[], bool] = None, is_alive: Callable[[], bool] = None):
     """
     Binds new routes to the Flask App providing functionality about
-    the health of the application.
+    the health of the application.  `/healthz` reports that the app is
+    alive (unless `is_alive` returns False, e.g. once loading the models
+    has failed), while `/readyz` only reports success once `is_ready`
+    returns True (e.g. once the models have been loaded and warmed up).
 
     Args:
         app (Flask): The app to bind the new routes
+        is_ready (Callable[[], bool]): Whether the app is ready to serve
+            requests, with the app always ready if not given
+        is_alive (Callable[[], bool]): Whether the app is alive, with the app
+            always alive if not given
 
     Returns:
         Nothing
@@ -18,9 +26,20 @@ def bind_health_routes(app: Flask):
 
     @app.route('/healthz')
     def health():
+        if is_alive is not None and not is_alive():
+            logging.info("api: /healthz (not alive)")
+            return "I am not healthy", 500
         logging.info("api: /healthz")
         return "I am healthy!"
 
+    @app.route('/readyz')
+    def ready():
+        if is_ready is not None and not is_ready():
+            logging.info("api: /readyz (not ready)")
+            return "I am not ready yet", 503
+        logging.info("api: /readyz")
+        return "I am ready!"
+
     @app.route('/testing')
     def testing():
         logging.info("api: /testing")
@@ -0,0 +1,50 @@
+import logging
+import time
+
+from flask import Flask, Response, request, g
+
+from hypermodel.hml.prediction.metrics import InferenceMetrics
+
+
+def bind_metrics_routes(app: Flask, metrics: InferenceMetrics):
+    """
+    Binds a new route to the Flask App exposing the `metrics` of the application
+    at `/metrics` in the Prometheus text exposition format, and instruments every
+    request to record its latency (by route) and the number of requests in flight.
+
+    Args:
+        app (Flask): The app to bind the new routes
+        metrics (InferenceMetrics): The metrics to record into and expose
+
+    Returns:
+        Nothing
+    """
+
+    @app.before_request
+    def start_request_timer():
+        g.hml_request_started_at = time.perf_counter()
+        metrics.requests_in_flight.inc()
+
+    @app.after_request
+    def record_request(response):
+        started_at = g.pop("hml_request_started_at", None)
+        if started_at is not None:
+            # Label by the route's rule rather than its path, to bound the number of series
+            route = request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+            method, status = request.method, response.status_code
+
+            # Recorded once the response has been sent, which includes streaming its body
+            def observe():
+                metrics.observe_request(route, method, status, time.perf_counter() - started_at)
+
+            response.call_on_close(observe)
+        return response
+
+    @app.teardown_request
+    def end_request(exception=None):
+        metrics.requests_in_flight.dec()
+
+    @app.route("/metrics")
+    def render_metrics():
+        logging.debug("api: /metrics")
+        return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
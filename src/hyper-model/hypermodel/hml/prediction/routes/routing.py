@@ -0,0 +1,41 @@
+from typing import Dict, Mapping, Optional
+
+
+MODEL_VERSION_HEADER = "X-Model-Version"
+ROUTING_KEY_HEADER = "X-Routing-Key"
+
+
+def request_routing(headers: Mapping[str, str]) -> Dict[str, Optional[str]]:
+    """
+    Get the version of a model a request asks for with the `X-Model-Version` header,
+    and the key it is routed by with the `X-Routing-Key` header, as the keyword
+    arguments of `HmlInferenceApp.select_model` (or `predict` / `predict_async`).
+
+    Args:
+        headers (Mapping[str, str]): The headers of the request, either `flask.request.headers`
+            or the (lower cased) `AsgiRequest.headers`
+
+    Returns:
+        A dictionary of the `version` and `routing_key`, each None if not given
+    """
+
+    def _get(name: str) -> Optional[str]:
+        value = headers.get(name)
+        return value if value is not None else headers.get(name.lower())
+
+    return {"version": _get(MODEL_VERSION_HEADER), "routing_key": _get(ROUTING_KEY_HEADER)}
+
+
+def version_headers(model_container: "ModelContainer") -> Dict[str, str]:
+    """
+    Get the headers telling a client which version of a model served its request
+
+    Args:
+        model_container (ModelContainer): The model which served the request
+
+    Returns:
+        The `X-Model-Version` header, if the model has a version
+    """
+    if model_container.version is None:
+        return dict()
+    return {MODEL_VERSION_HEADER: model_container.version}
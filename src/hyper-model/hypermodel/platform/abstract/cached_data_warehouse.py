@@ -0,0 +1,311 @@
+import hashlib
+import importlib.util
+import json
+import logging
+import os
+import re
+import uuid
+
+import pandas as pd
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+# The file extension, writer and reader for each format results can be cached in
+FORMATS: Dict[str, Tuple[str, Callable[[pd.DataFrame, str], Any], Callable[[str], pd.DataFrame]]] = {
+    "parquet": (".parquet", lambda frame, path: frame.to_parquet(path), pd.read_parquet),
+    "pickle": (".pkl", lambda frame, path: frame.to_pickle(path), pd.read_pickle),
+}
+
+# String literals and quoted identifiers (kept exactly), comments, and runs of whitespace
+_SQL_TOKENS = re.compile(
+    r"""('(?:[^'\\]|\\.|'')*'|"(?:[^"\\]|\\.|"")*"|`[^`]*`)|(--[^\n]*|/\*.*?\*/)|(\s+)""", re.DOTALL
+)
+_SQL_LITERALS = re.compile(r"""'(?:[^'\\]|\\.|'')*'""")
+_SQL_REFERENCE = r"""(`[^`]+`|"[^"]+"|\[[^\]]+\]|[\w.\-]+\b)(?!\s*\()"""
+_SQL_TABLES = re.compile(r"\b(?:from|join)\s+" + _SQL_REFERENCE, re.IGNORECASE)
+# Further tables of a comma separated FROM list, after an optional alias of the previous one
+_SQL_KEYWORDS = r"(?:where|group|order|limit|having|window|qualify|union|on|using|join|inner|outer|left|right|full|cross)"
+_SQL_MORE_TABLES = re.compile(r"\s*(?:(?:as\s+)?(?!" + _SQL_KEYWORDS + r"\b)\w+)?\s*,\s*" + _SQL_REFERENCE, re.IGNORECASE)
+_SQL_CTES = re.compile(r"""(?:\bwith(?:\s+recursive)?|,)\s+(\w+)\s+as\s*\(""", re.IGNORECASE)
+# Functions (and SQLite's 'now' literal) whose results differ each time a query is run
+_SQL_VOLATILE = re.compile(
+    r"\b(?:current_(?:date|time|timestamp|datetime|user|role)|localtime|localtimestamp|session_user|sysdate)\b"
+    r"|\b(?:now|rand|random|generate_uuid|uuid|getdate)\s*\(",
+    re.IGNORECASE,
+)
+_SQL_NOW = re.compile(r"'now'", re.IGNORECASE)
+
+
+class CachedDataWarehouse:
+    """
+    The `CachedDataWarehouse` wraps a data warehouse (such as the BigQuery `DataWarehouse`
+    or the `SqliteDataWarehouse`), caching the results of `dataframe_from_query` as columnar
+    files on local disk, so that extracts which are run again and again (e.g. by each run
+    of a pipeline) are only queried while the tables they read from change.
+
+    Results are keyed by the normalized SQL of the query along with the version (see
+    `DataWarehouseBase.table_version`) of each table it reads from.  Queries reading from
+    a table whose version is unknown (such as a view), or calling a volatile function
+    (such as `CURRENT_DATE` or `RAND()`), are never cached.  The cache is
+    bounded in size, evicting the least recently used results first, and may safely be
+    shared by several processes.  Every other method is passed through to the warehouse.
+    """
+
+    def __init__(self, warehouse, path: str, max_bytes: int, format: str = "parquet"):
+        """
+        Create a new `CachedDataWarehouse`
+
+        Args:
+            warehouse: The warehouse to run queries with
+            path (str): The directory to store cached results in
+            max_bytes (int): The total size the cache is allowed to grow to
+            format (str): The format to store results in, "parquet" (which needs `pyarrow`
+                or `fastparquet`) or "pickle"
+        """
+        if format not in FORMATS:
+            raise ValueError(f"Parameter: `format` must be one of {list(FORMATS.keys())}, not '{format}'")
+        if format == "parquet" and not any(importlib.util.find_spec(m) for m in ["pyarrow", "fastparquet"]):
+            raise ImportError("Caching query results as parquet requires `pyarrow` (or `fastparquet`) to be installed")
+
+        self.warehouse = warehouse
+        self.path = path
+        self.max_bytes = max_bytes
+        self.format = format
+
+        if not os.path.exists(path):
+            os.makedirs(path, exist_ok=True)
+
+    def dataframe_from_query(self, query: str) -> pd.DataFrame:
+        """
+        Get the results of `query`, from the cache if the tables it reads from haven't changed
+        since it was cached, or else from the warehouse (after which they are cached).
+
+        Args:
+            query (str): The query to run
+
+        Returns:
+            The query's results
+        """
+        key = self.cache_key(query)
+        if key is None:
+            return self.warehouse.dataframe_from_query(query)
+
+        frame = self.get(key)
+        if frame is not None:
+            logging.info(f"CachedDataWarehouse.dataframe_from_query -> {key} found in cache ({len(frame)} rows)")
+            return frame
+
+        frame = self.warehouse.dataframe_from_query(query)
+        self.put(key, frame)
+        return frame
+
+    def cache_key(self, query: str) -> Optional[str]:
+        """
+        Get the key the results of `query` are cached under
+
+        Args:
+            query (str): The query
+
+        Returns:
+            The key, or None if the results can't be cached (as the version of a table
+            it reads from is unknown, or the query is volatile)
+        """
+        table_version = getattr(self.warehouse, "table_version", None)
+        tables = referenced_tables(query)
+        if table_version is None or len(tables) == 0:
+            return None
+        if is_volatile(query):
+            logging.info("CachedDataWarehouse: the query calls a volatile function, not caching")
+            return None
+
+        versions = []
+        for dataset, table in sorted(set(tables), key=str):
+            version = table_version(dataset, table)
+            if version is None:
+                logging.info(f"CachedDataWarehouse: the version of {dataset}.{table} is unknown, not caching")
+                return None
+            versions.append([dataset, table, version])
+
+        identity = json.dumps({"sql": normalize_sql(query), "tables": versions, "format": self.format})
+        return hashlib.sha256(identity.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        """
+        Get the results cached under `key`, marking them as recently used
+
+        Args:
+            key (str): The key of the results
+
+        Returns:
+            The cached results, or None if they are not cached
+        """
+        _, _, read = FORMATS[self.format]
+        entry_path = self._entry_path(key)
+        try:
+            os.utime(entry_path, None)
+            return read(entry_path)
+        except FileNotFoundError:
+            return None
+        except Exception as ex:
+            logging.warning(f"CachedDataWarehouse: unable to read {entry_path}, ignoring it: {ex}")
+            return None
+
+    def put(self, key: str, frame: pd.DataFrame) -> Optional[str]:
+        """
+        Cache `frame` under `key`
+
+        Args:
+            key (str): The key of the results
+            frame (pd.DataFrame): The results
+
+        Returns:
+            The path to the cached results, or None if they could not be written
+        """
+        _, write, _ = FORMATS[self.format]
+        entry_path = self._entry_path(key)
+        tmp_path = f"{entry_path}.{uuid.uuid4().hex}.tmp"
+        try:
+            write(frame, tmp_path)
+            os.replace(tmp_path, entry_path)
+        except Exception as ex:
+            # e.g. parquet requires column names to be strings
+            logging.warning(f"CachedDataWarehouse: unable to cache results as {self.format}, not caching: {ex}")
+            return None
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        self.evict(keep=entry_path)
+        return entry_path
+
+    def evict(self, keep: str = None):
+        """
+        Remove the least recently used results until the cache fits within `max_bytes`
+
+        Args:
+            keep (str): The path of results which should never be evicted (e.g. those just added)
+        """
+        entries = self._entries()
+        total = sum(size for _, _, size in entries)
+
+        for mtime, entry_path, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if entry_path == keep:
+                continue
+            try:
+                os.remove(entry_path)
+                logging.info(f"CachedDataWarehouse: evicted {entry_path}")
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        """
+        Remove every cached result
+        """
+        for _, entry_path, _ in self._entries():
+            try:
+                os.remove(entry_path)
+            except FileNotFoundError:
+                pass
+
+    def size(self) -> int:
+        """
+        Get the total size of all the cached results, in bytes
+        """
+        return sum(size for _, _, size in self._entries())
+
+    def __getattr__(self, name: str):
+        # Only called for attributes not found on the cache, so `warehouse` is missing while unpickling
+        if name == "warehouse":
+            raise AttributeError(name)
+        return getattr(self.warehouse, name)
+
+    def _entry_path(self, key: str) -> str:
+        extension, _, _ = FORMATS[self.format]
+        return os.path.join(self.path, f"{key}{extension}")
+
+    def _entries(self) -> List[Tuple[float, str, int]]:
+        entries = []
+        for name in os.listdir(self.path):
+            entry_path = os.path.join(self.path, name)
+            if name.endswith(".tmp"):
+                continue
+            try:
+                stat = os.stat(entry_path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, entry_path, stat.st_size))
+        return entries
+
+
+def normalize_sql(query: str) -> str:
+    """
+    Normalize `query`, removing comments, collapsing whitespace and dropping any trailing
+    semi-colon, so that queries differing only in formatting are treated as the same.
+    Literals and identifiers are left as they are, as they may be case sensitive.
+
+    Args:
+        query (str): The query to normalize
+
+    Returns:
+        The normalized query
+    """
+
+    def replace(match) -> str:
+        literal, _, _ = match.groups()
+        return literal if literal is not None else " "
+
+    # Comments become whitespace, which the second pass collapses along with its neighbours
+    normalized = _SQL_TOKENS.sub(replace, _SQL_TOKENS.sub(replace, query))
+    return normalized.strip().rstrip(";").strip()
+
+
+def referenced_tables(query: str) -> List[Tuple[Optional[str], str]]:
+    """
+    Find the tables `query` reads from (those following a FROM or JOIN), excluding
+    those defined by the query itself as common table expressions.
+
+    Args:
+        query (str): The query to search
+
+    Returns:
+        A list of the (dataset, table) of each table, where the dataset is everything
+        before the final "." of a qualified name (e.g. "project.dataset") and otherwise None
+    """
+    sql = _SQL_LITERALS.sub("''", normalize_sql(query))
+    ctes = {name.lower() for name in _SQL_CTES.findall(sql)}
+
+    references = []
+    for match in _SQL_TABLES.finditer(sql):
+        references.append(match.group(1))
+        more = _SQL_MORE_TABLES.match(sql, match.end())
+        while more is not None:
+            references.append(more.group(1))
+            more = _SQL_MORE_TABLES.match(sql, more.end())
+
+    tables = []
+    for reference in references:
+        name = reference.strip('`"[]')
+        if name.lower() in ctes:
+            continue
+        dataset, _, table = name.rpartition(".")
+        tables.append((dataset or None, table))
+    return tables
+
+
+def is_volatile(query: str) -> bool:
+    """
+    Check whether `query` calls a function whose results differ each time it is run
+    (such as `CURRENT_TIMESTAMP`, `NOW()` or `RAND()`), so its results can't be cached.
+
+    Args:
+        query (str): The query to check
+
+    Returns:
+        True if the query is volatile
+    """
+    sql = normalize_sql(query)
+    return _SQL_NOW.search(sql) is not None or _SQL_VOLATILE.search(_SQL_LITERALS.sub("''", sql)) is not None
@@ -1,10 +1,27 @@
+import logging
+import pandas as pd
 
 from abc import ABC, abstractmethod
-import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+
+class TransferResult(NamedTuple):
+    """
+    The outcome of transferring a single file as part of `upload_many` / `download_many`
+    """
+
+    bucket_path: str
+    local_path: str
+    success: bool
+    error: Optional[Exception] = None
 
 
 class DataLakeBase(ABC):  # extends Abstract Base class
 
+    # The most transfers `upload_many` / `download_many` run at once
+    MAX_TRANSFER_WORKERS = 8
+
     @abstractmethod
     def upload(self, bucket_name: str, bucket_path: str, local_path: str) -> str:
         pass
@@ -14,7 +31,7 @@ class DataLakeBase(ABC):  # extends Abstract Base class
         pass
 
     @abstractmethod
-    def upload_dataframe(self, bucket_name: str, bucket_path: str, dataframe: pd.DataFrame) -> str:
+    def upload_dataframe(self, bucket_name: str, bucket_path: str, dataframe: pd.DataFrame, compress: bool = False) -> str:
         pass
 
     @abstractmethod
@@ -28,3 +45,62 @@ class DataLakeBase(ABC):  # extends Abstract Base class
     @abstractmethod
     def download_csv(self, bucket_name: str, bucket_path: str) -> pd.DataFrame:
         pass
+
+    def upload_many(self, bucket_name: str, transfers: List[Tuple[str, str]], max_workers: int = None) -> List[TransferResult]:
+        """
+        Upload several files concurrently (see `upload`)
+
+        Args:
+            bucket_name (str): The bucket to upload to
+            transfers (List[Tuple[str, str]]): The (bucket_path, local_path) of each file to upload
+            max_workers (int): The most uploads to run at once
+
+        Returns:
+            A `TransferResult` for each file, in the same order as `transfers`
+        """
+        def upload(bucket_path: str, local_path: str):
+            self.upload(bucket_name, bucket_path, local_path)
+
+        return self._transfer_many("upload", upload, transfers, max_workers)
+
+    def download_many(self, bucket_name: str, transfers: List[Tuple[str, str]], max_workers: int = None) -> List[TransferResult]:
+        """
+        Download several files concurrently (see `download`)
+
+        Args:
+            bucket_name (str): The bucket to download from
+            transfers (List[Tuple[str, str]]): The (bucket_path, destination_local_path) of each file to download
+            max_workers (int): The most downloads to run at once
+
+        Returns:
+            A `TransferResult` for each file, in the same order as `transfers`
+        """
+        def download(bucket_path: str, local_path: str):
+            self.download(bucket_name, bucket_path, local_path)
+
+        return self._transfer_many("download", download, transfers, max_workers)
+
+    def _transfer_many(
+        self, name: str, transfer: Callable[[str, str], None], transfers: List[Tuple[str, str]], max_workers: int = None
+    ) -> List[TransferResult]:
+        """
+        Call `transfer` for each (bucket_path, local_path) on a bounded thread pool, recording
+        whether each succeeded rather than stopping at the first failure
+        """
+        def run(bucket_path: str, local_path: str) -> TransferResult:
+            try:
+                transfer(bucket_path, local_path)
+                return TransferResult(bucket_path, local_path, True)
+            except Exception as ex:
+                logging.error(f"DataLake: {name} of {bucket_path} <-> {local_path} failed: {ex}")
+                return TransferResult(bucket_path, local_path, False, ex)
+
+        if len(transfers) == 0:
+            return []
+        if len(transfers) == 1:
+            return [run(*transfers[0])]
+
+        workers = min(max_workers or self.MAX_TRANSFER_WORKERS, len(transfers))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"lake-{name}") as executor:
+            futures = [executor.submit(run, bucket_path, local_path) for bucket_path, local_path in transfers]
+            return [f.result() for f in futures]
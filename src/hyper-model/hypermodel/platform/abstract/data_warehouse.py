@@ -1,6 +1,6 @@
 import pandas as pd
 from abc import ABC, abstractmethod
-from typing import List
+from typing import List, Iterator, Optional
 
 from hypermodel.model.table_schema import SqlTable, SqlColumn
 
@@ -27,6 +27,29 @@ class DataWarehouseBase(ABC):  # extends Abstract Base class
     def dataframe_from_query(self, query: str) -> pd.DataFrame:
         pass
 
+    @abstractmethod
+    def iter_dataframes(self, query: str, chunk_rows: int = 100000) -> Iterator[pd.DataFrame]:
+        """
+        Run a query, yielding its results as DataFrames of at most `chunk_rows` rows
+        each, so that results larger than memory can be processed a chunk at a time
+        """
+        pass
+
+    @abstractmethod
+    def iter_dataframes_from_table(self, dataset: str, table: str, chunk_rows: int = 100000) -> Iterator[pd.DataFrame]:
+        """
+        Read a table, yielding it as DataFrames of at most `chunk_rows` rows each
+        """
+        pass
+
+    def table_version(self, dataset: str, table: str) -> Optional[str]:
+        """
+        Get an identifier for the current contents of a table, which changes whenever the
+        table is modified, so that cached query results (see `CachedDataWarehouse`) can be
+        invalidated.  Returns None when this isn't known, so that they never are cached.
+        """
+        return None
+
     @abstractmethod
     def dry_run(self, query: str) -> List[SqlColumn]:
         pass
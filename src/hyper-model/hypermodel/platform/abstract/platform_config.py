@@ -1,5 +1,6 @@
 import os
 import logging
+import tempfile
 from typing import List, Set, Dict, Tuple, Optional
 
 
@@ -10,12 +11,28 @@ class PlatformConfig:
 
     @property
     def temp_path(self) -> str:
-        
-        temp_path = self.get_env("HML_TMP", None)
-        if temp_path is not None:
-            return temp_path
-        if temp_path is None:
-            return self.get_env("TEMP_PATH", "/tmp")
+        # `HML_TMP` is only set for pipeline ops (see `HmlContainerOp`), not inference deployments
+        if "HML_TMP" in os.environ:
+            return self.get_env("HML_TMP")
+        return self.get_env("TEMP_PATH", tempfile.gettempdir())
+
+    @property
+    def artifact_cache_path(self) -> str:
+        return self.get_env("HML_ARTIFACT_CACHE", os.path.join(self.temp_path, "hml-artifact-cache"))
+
+    @property
+    def artifact_cache_max_bytes(self) -> int:
+        # Setting the size to 0 disables the cache
+        return int(self.get_env("HML_ARTIFACT_CACHE_MB", "4096")) * 1024 * 1024
+
+    @property
+    def query_cache_path(self) -> str:
+        return self.get_env("HML_QUERY_CACHE", os.path.join(self.temp_path, "hml-query-cache"))
+
+    @property
+    def query_cache_max_bytes(self) -> int:
+        # Query results are only cached once a size is set (see `CachedDataWarehouse`)
+        return int(self.get_env("HML_QUERY_CACHE_MB", "0")) * 1024 * 1024
             
 
 
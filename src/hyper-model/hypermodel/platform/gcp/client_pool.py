@@ -0,0 +1,111 @@
+import logging
+import os
+import threading
+
+from typing import Dict, Optional
+from google.cloud import storage
+from google.cloud import bigquery
+from hypermodel.platform.gcp.config import GooglePlatformConfig
+
+
+class GoogleClientPool:
+    """
+    The `GoogleClientPool` holds a single Cloud Storage and BigQuery client for the
+    process, along with a handle to each bucket used, so that each call to the `DataLake`
+    or `DataWarehouse` doesn't pay for authenticating and connecting again.  Clients are
+    created lazily (and only once, even when first used from several threads), and are
+    created again in a forked child process, as their connections can't be shared.
+    """
+
+    def __init__(self, config: GooglePlatformConfig):
+        self.config = config
+
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._storage_client: Optional[storage.Client] = None
+        self._bigquery_client: Optional[bigquery.Client] = None
+        self._bigquery_storage_client = None
+        self._buckets: Dict[str, storage.Bucket] = dict()
+
+    def storage_client(self) -> storage.Client:
+        """
+        Get the Cloud Storage client, creating it on first use
+        """
+        self._check_pid()
+        client = self._storage_client
+        if client is None:
+            with self._lock:
+                if self._storage_client is None:
+                    logging.info("GoogleClientPool: creating storage client")
+                    self._storage_client = storage.Client()
+                client = self._storage_client
+        return client
+
+    def bigquery_client(self) -> bigquery.Client:
+        """
+        Get the BigQuery client, creating it on first use
+        """
+        self._check_pid()
+        client = self._bigquery_client
+        if client is None:
+            with self._lock:
+                if self._bigquery_client is None:
+                    logging.info("GoogleClientPool: creating bigquery client")
+                    self._bigquery_client = bigquery.Client(project=self.config.gcp_project)
+                client = self._bigquery_client
+        return client
+
+    def bigquery_storage_client(self):
+        """
+        Get the BigQuery Storage Read API client (a `bigquery_storage.BigQueryReadClient`),
+        creating it on first use.  This needs the optional `google-cloud-bigquery-storage`
+        (and `pyarrow`) packages.
+        """
+        self._check_pid()
+        client = self._bigquery_storage_client
+        if client is None:
+            with self._lock:
+                if self._bigquery_storage_client is None:
+                    from google.cloud import bigquery_storage
+
+                    logging.info("GoogleClientPool: creating bigquery storage client")
+                    self._bigquery_storage_client = bigquery_storage.BigQueryReadClient()
+                client = self._bigquery_storage_client
+        return client
+
+    def bucket(self, bucket_name: str) -> storage.Bucket:
+        """
+        Get a handle to the named bucket.  Unlike `storage.Client.get_bucket`, this doesn't
+        fetch the bucket's metadata, saving a round trip, as only its name is needed to
+        read and write blobs.
+
+        Args:
+            bucket_name (str): The name of the bucket
+
+        Returns:
+            The `storage.Bucket`
+        """
+        client = self.storage_client()
+        bucket = self._buckets.get(bucket_name)
+        if bucket is None:
+            bucket = client.bucket(bucket_name)
+            with self._lock:
+                bucket = self._buckets.setdefault(bucket_name, bucket)
+        return bucket
+
+    def reset(self):
+        """
+        Forget every client and bucket, so that they are created again on next use
+        """
+        with self._lock:
+            self._storage_client = None
+            self._bigquery_client = None
+            self._bigquery_storage_client = None
+            self._buckets = dict()
+
+    def _check_pid(self):
+        # Connections (and the lock) are not safe to share with a forked child
+        if self._pid != os.getpid():
+            self._lock = threading.Lock()
+            self._pid = os.getpid()
+            self.reset()
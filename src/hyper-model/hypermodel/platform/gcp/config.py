@@ -13,6 +13,7 @@ class GooglePlatformConfig(PlatformConfig):
 
     warehouse_dataset: str
     warehouse_location: str
+    warehouse_storage_api: bool
 
     k8s_cluster: str
     k8s_namespace: str
@@ -29,6 +30,8 @@ class GooglePlatformConfig(PlatformConfig):
 
         self.warehouse_dataset = self.get_env('WAREHOUSE_DATASET', "hyper_model")
         self.warehouse_location = self.get_env("WAREHOUSE_LOCATION", "australia-southeast1")
+        # Read whole tables through the BigQuery Storage Read API (see `DataWarehouse.read_table`)
+        self.warehouse_storage_api = self.get_env("WAREHOUSE_STORAGE_API", "false").lower() == "true"
 
         self.k8s_namespace = self.get_env('K8S_NAMESPACE')
         self.k8s_cluster = self.get_env('K8S_CLUSTER')
@@ -5,19 +5,20 @@ import os
 import uuid
 from google.cloud import storage
 from hypermodel.platform.gcp.config import GooglePlatformConfig
+from hypermodel.platform.gcp.client_pool import GoogleClientPool
 from hypermodel.platform.abstract.data_lake import DataLakeBase
+from hypermodel.utilities.csv_stream import write_csv_stream
 
 
 class DataLake(DataLakeBase):
     confg: GooglePlatformConfig
 
-    def __init__(self, config: GooglePlatformConfig):
+    def __init__(self, config: GooglePlatformConfig, clients: GoogleClientPool = None):
         self.config = config
+        self.clients = clients or GoogleClientPool(config)
 
     def upload(self, bucket_name: str, bucket_path: str, local_path: str) -> str:
-        storage_client = storage.Client()
-
-        bucket = storage_client.get_bucket(bucket_name)
+        bucket = self.clients.bucket(bucket_name)
 
         file_name = os.path.basename(local_path)
         full_path = f"{self.config.lake_path}/{bucket_path}"
@@ -30,9 +31,7 @@ class DataLake(DataLakeBase):
         return bucket_path
 
     def upload_string(self, bucket_name: str, bucket_path: str, string: str) -> str:
-        storage_client = storage.Client()
-
-        bucket = storage_client.get_bucket(bucket_name)
+        bucket = self.clients.bucket(bucket_name)
 
         full_path = f"{self.config.lake_path}/{bucket_path}"
 
@@ -43,39 +42,53 @@ class DataLake(DataLakeBase):
 
         return bucket_path
 
-    def upload_dataframe(self, bucket_name: str, bucket_path: str, dataframe: pd.DataFrame, sep:str="\t") -> str:
+    def upload_dataframe(self, bucket_name: str, bucket_path: str, dataframe: pd.DataFrame, sep:str="\t", compress: bool = False) -> str:
+        """
+        Upload `dataframe` as CSV, serialized a chunk of rows at a time straight into a
+        resumable upload, so no scratch disk (or memory) as large as the frame is needed.
 
-        filename = uuid.uuid4()
-        tmp_path = os.path.join("/tmp/", f"{filename}.csv")
+        Args:
+            bucket_name (str): The bucket to upload to
+            bucket_path (str): The path to upload to, within the lake
+            dataframe (pd.DataFrame): The frame to upload
+            sep (str): The field delimiter
+            compress (bool): Gzip the CSV, storing it with a `Content-Encoding` of gzip (so
+                it is still decompressed when downloaded, e.g. by `download_csv`)
 
-        df = dataframe.to_csv(tmp_path, sep=sep)
-        self.upload(bucket_name, bucket_path, tmp_path)
+        Returns:
+            The path the frame was uploaded to
+        """
+        bucket = self.clients.bucket(bucket_name)
 
-        os.remove(tmp_path)
+        full_path = f"{self.config.lake_path}/{bucket_path}"
+
+        blob = bucket.blob(full_path, chunk_size=self.config.CHUNK_SIZE)
+        if compress:
+            blob.content_encoding = "gzip"
+
+        logging.info(f"DataLake (GCP): Streaming dataframe -> gs://{bucket_name}/{full_path} ...")
+        with blob.open("wb", ignore_flush=True, content_type="text/csv") as stream:
+            write_csv_stream(dataframe, stream, sep=sep, compress=compress)
 
         return bucket_path
 
     def download(self, bucket_name: str, bucket_path: str, destination_local_path: str) -> bool:
-        storage_client = storage.Client()
-
         if bucket_name is None:
             bucket_name = self.config.lake_bucket
 
         logging.info(f"DataLake (GCP): Downloading gs://{bucket_name}/{bucket_path} -> {destination_local_path}")
 
         full_path = f"{self.config.lake_path}/{bucket_path}"
-        bucket = storage_client.get_bucket(bucket_name)
+        bucket = self.clients.bucket(bucket_name)
         blob = bucket.blob(full_path, chunk_size=self.config.CHUNK_SIZE)
         blob.download_to_filename(destination_local_path)
         return True
 
     def download_string(self, bucket_name: str, bucket_path: str) -> str:
-        storage_client = storage.Client()
-
         logging.info(f"DataLake (GCP): Downloading gs://{bucket_name}/{bucket_path} -> string")
 
         full_path = f"{self.config.lake_path}/{bucket_path}"
-        bucket = storage_client.get_bucket(bucket_name)
+        bucket = self.clients.bucket(bucket_name)
         blob = bucket.blob(full_path, chunk_size=self.config.CHUNK_SIZE)
 
         try:
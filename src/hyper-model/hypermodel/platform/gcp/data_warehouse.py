@@ -2,25 +2,29 @@ import pandas as pd
 import logging
 import tqdm
 
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Iterator, Optional
+from google.api_core.exceptions import NotFound
 from google.cloud import storage
 from google.cloud import bigquery
 from google.cloud.bigquery.table import Table, TableReference
 from google.cloud.bigquery.dataset import Dataset, DatasetReference
 from google.cloud.bigquery.job import LoadJobConfig, ExtractJobConfig, QueryJobConfig, CreateDisposition, WriteDisposition
 from google.cloud.bigquery.schema import SchemaField
-# from google.cloud import bigquery_storage_v1beta1
 from hypermodel.platform.gcp.config import GooglePlatformConfig
+from hypermodel.platform.gcp.client_pool import GoogleClientPool
 from hypermodel.model.table_schema import SqlTable, SqlColumn
 
 from hypermodel.platform.abstract.data_warehouse import DataWarehouseBase
+from hypermodel.utilities.cpu import get_cpu_limit
 
 
 class DataWarehouse(DataWarehouseBase):
     config: GooglePlatformConfig
 
-    def __init__(self, config: GooglePlatformConfig):
+    def __init__(self, config: GooglePlatformConfig, clients: GoogleClientPool = None):
         self.config = config
+        self.clients = clients or GoogleClientPool(config)
 
     def import_csv(self, bucket_name: str, bucket_path: str, dataset: str, table: str, sep:str ="\t") -> bool:
         logging.info(f"DataWarehouse.import_csv {bucket_path} to {dataset}.{table} ...")
@@ -85,6 +89,9 @@ class DataWarehouse(DataWarehouseBase):
             raise
 
     def dataframe_from_table(self, dataset: str, table: str) -> pd.DataFrame:
+        if self.config.warehouse_storage_api:
+            return self.read_table(dataset, table)
+
         logging.info(f"DataWarehouse.dataframe_from_table -> {dataset}.{table}")
         client = self._get_client()
 
@@ -93,10 +100,7 @@ class DataWarehouse(DataWarehouseBase):
         logging.info(f"DataWarehouse.dataframe_from_table -> Got table: {bq_table.full_table_id}: ({bq_table.num_rows} rows, {mb} mb)")
 
         query_job = client.list_rows(bq_table.reference)
-        # bq_storage_client = bigquery_storage_v1beta1.BigQueryStorageClient()
-
         try:
-            # frame = query_job.to_dataframe(bqstorage_client=bq_storage_client, progress_bar_type='tqdm')
             frame = query_job.to_dataframe(progress_bar_type='tqdm')
             logging.info(f"DataWarehouse.dataframe_from_table -> {dataset}.{table} ({query_job.total_rows} rows)")
             return frame
@@ -110,10 +114,12 @@ class DataWarehouse(DataWarehouseBase):
         client = self._get_client()
 
         query_job = client.query(query)
-        # bq_storage_client = bigquery_storage_v1beta1.BigQueryStorageClient()
         try:
-            # frame = query_job.to_dataframe(bqstorage_client=bq_storage_client, progress_bar_type='tqdm')
-            frame = query_job.to_dataframe(progress_bar_type='tqdm')
+            if self.config.warehouse_storage_api:
+                # Read the query's results through the Storage Read API too
+                frame = query_job.to_dataframe(bqstorage_client=self.clients.bigquery_storage_client(), progress_bar_type='tqdm')
+            else:
+                frame = query_job.to_dataframe(progress_bar_type='tqdm')
             mb = int(query_job.total_bytes_processed / (1024*1024))
             logging.info(f"DataWarehouse.dataframe_from_query -> {query_job.state} (processed {mb}mb)")
             return frame
@@ -123,6 +129,141 @@ class DataWarehouse(DataWarehouseBase):
             logging.error(f"DataWarehouse.dataframe_from_query -> Exception: \n\t{message}")
             raise
 
+    def iter_dataframes(self, query: str, chunk_rows: int = 100000) -> Iterator[pd.DataFrame]:
+        """
+        Run a query, yielding its results a page at a time as DataFrames of at most
+        `chunk_rows` rows each (BigQuery may return smaller pages), so that only one
+        page is held in memory at once
+
+        Args:
+            query (str): The query to run
+            chunk_rows (int): The most rows to fetch in each page
+
+        Returns:
+            An iterator of DataFrames
+        """
+        logging.info(f"DataWarehouse.iter_dataframes")
+        client = self._get_client()
+
+        query_job = client.query(query)
+        rows = query_job.result(page_size=chunk_rows)
+        for frame in rows.to_dataframe_iterable():
+            yield frame
+
+        mb = int((query_job.total_bytes_processed or 0) / (1024*1024))
+        logging.info(f"DataWarehouse.iter_dataframes -> {query_job.state} (processed {mb}mb)")
+
+    def iter_dataframes_from_table(self, dataset: str, table: str, chunk_rows: int = 100000) -> Iterator[pd.DataFrame]:
+        """
+        Read a table a page at a time, yielding DataFrames of at most `chunk_rows` rows each
+
+        Args:
+            dataset (str): The dataset of the table
+            table (str): The name of the table
+            chunk_rows (int): The most rows to fetch in each page
+
+        Returns:
+            An iterator of DataFrames
+        """
+        logging.info(f"DataWarehouse.iter_dataframes_from_table -> {dataset}.{table}")
+        client = self._get_client()
+
+        rows = client.list_rows(f"{self.config.gcp_project}.{dataset}.{table}", page_size=chunk_rows)
+        for frame in rows.to_dataframe_iterable():
+            yield frame
+
+    def read_table(self, dataset: str, table: str, columns: List[str] = None, row_filter: str = None, max_streams: int = None) -> pd.DataFrame:
+        """
+        Read a table into a DataFrame through the BigQuery Storage Read API, which streams
+        the table as Arrow record batches over several streams in parallel, rather than
+        paging rows through the REST API.  Only the `columns` asked for are read, and rows
+        can be filtered by BigQuery before they are sent.  This needs the optional
+        `google-cloud-bigquery-storage` (and `pyarrow`) packages.
+
+        Args:
+            dataset (str): The dataset of the table
+            table (str): The name of the table
+            columns (List[str]): The columns to read, defaulting to every column
+            row_filter (str): A SQL predicate rows must match (e.g. "age > 18")
+            max_streams (int): The most streams to read in parallel, defaulting to
+                the number of CPUs available (see `get_cpu_limit`)
+
+        Returns:
+            A DataFrame of the rows read
+        """
+        import pyarrow
+
+        logging.info(f"DataWarehouse.read_table -> {dataset}.{table}")
+        client = self.clients.bigquery_storage_client()
+        project = self.config.gcp_project
+
+        read_options = dict()
+        if columns is not None:
+            read_options["selected_fields"] = columns
+        if row_filter is not None:
+            read_options["row_restriction"] = row_filter
+
+        session = client.create_read_session(request={
+            "parent": f"projects/{project}",
+            "read_session": {
+                "table": f"projects/{project}/datasets/{dataset}/tables/{table}",
+                "data_format": "ARROW",
+                "read_options": read_options,
+            },
+            "max_stream_count": max_streams or get_cpu_limit(),
+        })
+
+        def read_stream(stream) -> pyarrow.Table:
+            return client.read_rows(stream.name).to_arrow(session)
+
+        streams = list(session.streams)
+        if len(streams) == 0:
+            # Nothing matched, so no streams were needed
+            return pd.DataFrame(columns=columns or [])
+
+        with ThreadPoolExecutor(max_workers=len(streams), thread_name_prefix="bq-read") as executor:
+            tables = list(executor.map(read_stream, streams))
+
+        # Concatenating Arrow tables only gathers their record batches, so the rows are
+        # only copied once, into the DataFrame, rather than once per stream and again to concat
+        arrow_table = pyarrow.concat_tables(tables)
+        del tables
+        if columns is not None:
+            # Columns are read in the order of the table, rather than the order asked for
+            arrow_table = arrow_table.select(columns)
+        frame = arrow_table.to_pandas()
+
+        logging.info(f"DataWarehouse.read_table -> {dataset}.{table} ({len(frame)} rows from {len(streams)} streams)")
+        return frame
+
+    def table_version(self, dataset: str, table: str) -> Optional[str]:
+        """
+        Get an identifier for the current contents of a table, from the time it was last
+        modified and its size.
+
+        Args:
+            dataset (str): The dataset (or "project.dataset") of the table
+            table (str): The name of the table
+
+        Returns:
+            The identifier, or None if it isn't known (e.g. for views, which change when
+            the tables they read from do)
+        """
+        if dataset is None:
+            # Queries aren't run with a default dataset, so this isn't a table
+            return None
+
+        client = self._get_client()
+        try:
+            bq_table: Table = client.get_table(f"{dataset}.{table}")
+        except NotFound:
+            return None
+
+        # Rows in the streaming buffer aren't reflected in the modified time
+        if bq_table.table_type != "TABLE" or bq_table.streaming_buffer is not None or bq_table.modified is None:
+            return None
+        return f"{bq_table.modified.isoformat()}/{bq_table.num_rows}/{bq_table.num_bytes}"
+
     def dry_run(self, query: str) -> List[SqlColumn]:
         client = self._get_client()
 
@@ -143,7 +284,7 @@ class DataWarehouse(DataWarehouseBase):
         return tbl
 
     def _get_client(self) -> bigquery.Client:
-        return bigquery.Client(project=self.config.gcp_project)
+        return self.clients.bigquery_client()
 
     @staticmethod
     def _translate_columns(bq_columns: List[SchemaField]) -> List[SqlColumn]:
@@ -2,10 +2,12 @@ import gitlab
 import logging
 from typing import Dict, List
 from hypermodel.platform.gcp.config import GooglePlatformConfig
+from hypermodel.platform.gcp.client_pool import GoogleClientPool
 from hypermodel.platform.gcp.data_lake import DataLake
 from hypermodel.platform.gcp.data_warehouse import DataWarehouse
 from hypermodel.platform.gitlab.git_host import GitLabHost
 from hypermodel.platform.abstract.services import PlatformServicesBase
+from hypermodel.platform.abstract.cached_data_warehouse import CachedDataWarehouse
 
 
 class GooglePlatformServices(PlatformServicesBase):
@@ -17,6 +19,9 @@ class GooglePlatformServices(PlatformServicesBase):
         config (GooglePlatformConfig): An object containing configuration information
         lake (DataLake): A reference to DataLake functionality, implemented through Google Cloud Storage
         warehouse (DataWarehouse): A reference to DataWarehouse functionality implemented through BigQuery
+        clients (GoogleClientPool): The Cloud Storage and BigQuery clients shared by the lake and warehouse
+
+    Query results from the warehouse are cached (see `CachedDataWarehouse`) when `HML_QUERY_CACHE_MB` is set.
     """
 
     def __init__(self):
@@ -28,14 +33,21 @@ class GooglePlatformServices(PlatformServicesBase):
         logging.info("GooglePlatformServices.initialize()")
 
         self._config: GooglePlatformConfig = GooglePlatformConfig()
-        self._lake: DataLake = DataLake(self.config)
-        self._warehouse: DataWarehouse = DataWarehouse(self.config)
+        self._clients: GoogleClientPool = GoogleClientPool(self.config)
+        self._lake: DataLake = DataLake(self.config, self.clients)
+        self._warehouse: DataWarehouse = DataWarehouse(self.config, self.clients)
+        if self.config.query_cache_max_bytes > 0:
+            self._warehouse = CachedDataWarehouse(self._warehouse, self.config.query_cache_path, self.config.query_cache_max_bytes)
         self._git: GitLabHost = GitLabHost(self.config)
 
     @property
     def config(self) -> GooglePlatformConfig:
         return self._config
 
+    @property
+    def clients(self) -> GoogleClientPool:
+        return self._clients
+
     @property
     def lake(self) -> DataLake:
         return self._lake
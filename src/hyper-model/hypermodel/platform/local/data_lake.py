@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from hypermodel.platform.abstract.data_lake import DataLakeBase
+from hypermodel.platform.abstract.data_lake import DataLakeBase, TransferResult
 from hypermodel.platform.local.config import LocalConfig
 from hypermodel.platform.local.data_warehouse import SqliteDataWarehouse
 from hypermodel.platform.local.config import LocalConfig
@@ -7,6 +7,9 @@ import sqlite3
 import csv
 from hypermodel.tests.utilities.sqlite_utility import get_column_names
 from shutil import copyfile
+from hypermodel.utilities.csv_stream import write_csv_stream
+import pandas as pd
+from typing import List, Tuple
 import os 
 
 
@@ -54,6 +57,42 @@ class LocalDataLake(DataLakeBase):
         copyfile(from_file,to_file)
         return True
 
+    def upload_dataframe(self, bucket_name: str, bucket_path: str, dataframe: pd.DataFrame, sep: str = "\t", compress: bool = False) -> str:
+        """
+        Write `dataframe` as CSV to `bucket_path` (the path of the file in the lake) a
+        chunk of rows at a time, optionally gzipped (see `write_csv_stream`)
+        """
+        folder = os.path.dirname(bucket_path)
+        if folder != "" and not os.path.exists(folder):
+            os.makedirs(folder, exist_ok=True)
+
+        with open(bucket_path, "wb") as stream:
+            write_csv_stream(dataframe, stream, sep=sep, compress=compress)
+        return bucket_path
+
+    def upload_many(self, bucket_name: str, transfers: List[Tuple[str, str]], max_workers: int = None) -> List[TransferResult]:
+        """
+        Copy several files into the lake concurrently, where each bucket_path is the
+        path of the file in the lake (see `DataLakeBase.upload_many`)
+        """
+        def upload(bucket_path: str, local_path: str):
+            folder = os.path.dirname(bucket_path)
+            if folder != "" and not os.path.exists(folder):
+                os.makedirs(folder, exist_ok=True)
+            copyfile(local_path, bucket_path)
+
+        return self._transfer_many("upload", upload, transfers, max_workers)
+
+    def download_many(self, bucket_name: str, transfers: List[Tuple[str, str]], max_workers: int = None) -> List[TransferResult]:
+        """
+        Copy several files out of the lake concurrently, where each bucket_path is the
+        path of the file in the lake (see `DataLakeBase.download_many`)
+        """
+        def download(bucket_path: str, local_path: str):
+            self.download(bucket_path, local_path)
+
+        return self._transfer_many("download", download, transfers, max_workers)
+
 
 
 
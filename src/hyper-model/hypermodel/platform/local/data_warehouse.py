@@ -1,10 +1,12 @@
+import os
 import pandas as pd
 import numpy as np
 from abc import ABC, abstractmethod
-from typing import List
+from typing import Iterable, List, Iterator, Optional
 import logging
 from hypermodel.model.table_schema import SqlTable, SqlColumn
 from hypermodel.platform.local.config import LocalConfig
+from hypermodel.platform.local.sqlite_pool import SqliteConnectionPool
 import sqlite3
 import logging
 
@@ -12,9 +14,12 @@ import logging
 class SqliteDataWarehouse(ABC):
 
     config: LocalConfig
+    pool: SqliteConnectionPool
 
-    def __init__(self, config: LocalConfig):
+    def __init__(self, config: LocalConfig, pool: SqliteConnectionPool = None):
         self.config = config
+        # Connections are kept open (per database) and shared by every method
+        self.pool = pool if pool is not None else SqliteConnectionPool()
 
 
     # The following is the rough mapping between the GCP implementation
@@ -23,7 +28,7 @@ class SqliteDataWarehouse(ABC):
     # bucket_path   <------->       csvLocation
     # dataset       <------->       dbLocation
     # table         <------->       tableName
-    def import_csv(self, csvLocation: str, dbLocation: str, tableName: str) -> bool:
+    def import_csv(self, csvLocation: str, dbLocation: str, tableName: str, bulk: bool = False, chunk_rows: int = 100000) -> bool:
         """
             Returns True if successful otherwise returns False.
             Takes a csv file from a local folder from location "csvLocation" 
@@ -31,14 +36,20 @@ class SqliteDataWarehouse(ABC):
             Looks for the table names in "tableName" and puts 
             all the csv values in the table.
             Note: The table contents, if exist are overwritten. 
+
+            With "bulk" the csv is streamed into the table "chunk_rows" rows at
+            a time (see `_bulk_import_csv`) rather than read into memory whole.
         """
        
        
         logging.info(f"SqliteDataWarehouse.import_csv  Entered!")
 
         logging.info(f"SqliteDataWarehouse.import_csv the  db location is { dbLocation}  the csv is {csvLocation}   and the table is {tableName}")
-        # get reference to DB
-        connection = sqlite3.connect(dbLocation)
+        if bulk:
+            rows = self._bulk_import_csv(csvLocation, dbLocation, tableName, chunk_rows)
+            logging.info(f"SqliteDataWarehouse.import_csv  loaded {rows} rows into table {tableName} in database {dbLocation}  ")
+            return True
+
         # make df of csv files
         dataFrame = pd.read_csv(csvLocation)
 
@@ -47,70 +58,176 @@ class SqliteDataWarehouse(ABC):
         # in case want to overrite the existing table make if_exists="replace"       
         # we made a design decision to replace as these tables are meant to exist for 
         # a cycle of execution
-        dataFrame.to_sql(tableName,connection,if_exists="replace")
+        self._replace_table(dbLocation, tableName, [dataFrame])
         logging.info(f"SqliteDataWarehouse.import_csv  put csv into table {tableName} in database {dbLocation}  ")
-        connection.close()
         return True
 
-    def select_into(self, query: str, output_dataset: str, output_table: str) -> bool:
-        logging.info(f"SqliteDataWarehouse.select_into Entered!")
+    def _bulk_import_csv(self, csvLocation: str, dbLocation: str, tableName: str, chunk_rows: int) -> int:
+        """
+        Replace the table `tableName` with the contents of the csv, parsing it `chunk_rows`
+        rows at a time (see `_replace_table`), so that the whole file is never held in memory.
+        The column types are inferred from the first chunk.
+
+        Args:
+            csvLocation (str): The path to the csv file
+            dbLocation (str): The path to the SQLite database file
+            tableName (str): The name of the table to replace
+            chunk_rows (int): The number of rows to parse and insert at a time
+
+        Returns:
+            The number of rows loaded
+        """
+        if chunk_rows < 1:
+            raise ValueError("Parameter: `chunk_rows` must be at least 1")
+
+        def read_chunks() -> Iterator[pd.DataFrame]:
+            empty = True
+            with pd.read_csv(csvLocation, chunksize=chunk_rows) as reader:
+                for chunk in reader:
+                    empty = False
+                    yield chunk
+            if empty:
+                # Only a header, which still gives the table its columns
+                yield pd.read_csv(csvLocation, nrows=0)
+
+        return self._replace_table(dbLocation, tableName, read_chunks())
+
+    def _replace_table(self, dbLocation: str, tableName: str, frames: Iterable[pd.DataFrame]) -> int:
+        """
+        Replace the table `tableName` with the rows of `frames`, inserting each frame with a
+        single `executemany`, all inside one transaction (so readers never see the table
+        missing or part loaded).  The table is laid out as `DataFrame.to_sql` would (including
+        the "index" column), with the column types inferred from the first frame.
 
-        connection = sqlite3.connect(output_dataset)
-        cur = connection.cursor()
+        `to_sql` itself isn't used, as it commits after creating the table, leaving the
+        pool's autocommit connection to insert each row in a transaction of its own.
 
-        # selectintoQuery="select * into "+output_table+" from ("+query+") tt"
+        Args:
+            dbLocation (str): The path to the SQLite database file
+            tableName (str): The name of the table to replace
+            frames (Iterable[pd.DataFrame]): The rows to load, with at least one frame
 
-        # drop table if it exists
-        try:
-            cur.execute(f"drop table {output_table}")
-        except:
-            logging.info(
-                f"Table {output_table} could not be dropped. It may not exist or there may be an issue with the DB connection."
-            )
+        Returns:
+            The number of rows loaded
+        """
+        table = _quote_identifier(tableName)
+        rows = 0
+        with self.pool.transaction(dbLocation) as connection:
+            insert = None
+            for frame in frames:
+                # Chunks of a csv carry on the index of the previous chunk, so this matches `to_sql`
+                frame = frame.reset_index()
+                if insert is None:
+                    insert = self._create_table(connection, tableName, frame)
+
+                columns = [_sql_values(frame[c]) for c in frame.columns]
+                connection.executemany(insert, zip(*columns))
+                rows += len(frame)
+
+            # Indexing once the rows are loaded is much faster than maintaining the index per insert
+            connection.execute(f"CREATE INDEX {_quote_identifier(f'ix_{tableName}_index')} ON {table} (\"index\")")
+
+        return rows
+
+    @staticmethod
+    def _create_table(connection: sqlite3.Connection, tableName: str, frame: pd.DataFrame) -> str:
+        # Use the same type mapping as `to_sql`, returning the statement to insert a row
+        connection.execute(f"DROP TABLE IF EXISTS {_quote_identifier(tableName)}")
+        connection.execute(pd.io.sql.get_schema(frame, tableName, con=connection))
+
+        names = ", ".join(_quote_identifier(c) for c in frame.columns)
+        params = ", ".join("?" for _ in frame.columns)
+        return f"INSERT INTO {_quote_identifier(tableName)} ({names}) VALUES ({params})"
 
+    def select_into(self, query: str, output_dataset: str, output_table: str) -> bool:
+        logging.info(f"SqliteDataWarehouse.select_into Entered!")
+
+        # selectintoQuery="select * into "+output_table+" from ("+query+") tt"
         selectintoQuery = f"CREATE TABLE {output_table} AS {query}"
 
-        cur.execute(selectintoQuery)
+        # Replace the table in a single transaction, so readers never see it missing
+        with self.pool.transaction(output_dataset) as connection:
+            connection.execute(f"DROP TABLE IF EXISTS {output_table}")
+            connection.execute(selectintoQuery)
 
         logging.info(f"SqliteDataWarehouse.select_into  Exiting")
-        connection.close()
         return True
 
     def dataframe_from_table(self, dbLocation: str, tableName: str) -> pd.DataFrame:
         logging.info(f"SqliteDataWarehouse.dataframe_from_table")
 
-        # get reference to DB
-        connection = sqlite3.connect(dbLocation)
-        retDataFrame = pd.read_sql_query("SELECT * from " + tableName, connection)
-        connection.close()
+        with self.pool.connection(dbLocation) as connection:
+            retDataFrame = pd.read_sql_query("SELECT * from " + tableName, connection)
         return retDataFrame
 
     def dataframe_from_query(self, query: str) -> pd.DataFrame:
         logging.info(f"SqliteDataWarehouse.dataframe_from_query")
         dbLocation = self.config.default_sql_lite_db_file
-        connection = sqlite3.connect(dbLocation)
-        retDataFrame = pd.read_sql_query(query, connection)
-        connection.close()
+        with self.pool.connection(dbLocation) as connection:
+            retDataFrame = pd.read_sql_query(query, connection)
         return retDataFrame
 
+    def iter_dataframes(self, query: str, chunk_rows: int = 100000) -> Iterator[pd.DataFrame]:
+        """
+        Run a query against the default database, yielding its results as DataFrames
+        of at most `chunk_rows` rows each, read from the cursor as they are needed
+        """
+        logging.info(f"SqliteDataWarehouse.iter_dataframes")
+        dbLocation = self.config.default_sql_lite_db_file
+        return self._iter_query(dbLocation, query, chunk_rows)
+
+    def iter_dataframes_from_table(self, dbLocation: str, tableName: str, chunk_rows: int = 100000) -> Iterator[pd.DataFrame]:
+        """
+        Read a table, yielding it as DataFrames of at most `chunk_rows` rows each
+        """
+        logging.info(f"SqliteDataWarehouse.iter_dataframes_from_table")
+        return self._iter_query(dbLocation, "SELECT * from " + tableName, chunk_rows)
+
+    def _iter_query(self, dbLocation: str, query: str, chunk_rows: int) -> Iterator[pd.DataFrame]:
+        # The connection is borrowed until the results have been read (or the iterator is discarded)
+        with self.pool.connection(dbLocation) as connection:
+            for frame in pd.read_sql_query(query, connection, chunksize=chunk_rows):
+                yield frame
+
     def get_table_columns(self, dbLocation: str, query: str) -> List[SqlColumn]:
         dbLocation = self.config.default_sql_lite_db_file
-        connection = sqlite3.connect(dbLocation)
         # confining the query to return minimum rows
         # in order to maintain perfromance
         queryInLower = query.lower()
         if not "limit" in queryInLower:
             query += " LIMIT 1"
 
-        df = pd.read_sql_query(query, connection)
+        with self.pool.connection(dbLocation) as connection:
+            df = pd.read_sql_query(query, connection)
 
         retList = []
         for x in range(len(df.columns)):
             sqlCol = SqlColumn(df.columns[x], df.dtypes[x], True)
             retList.append(sqlCol)
-        connection.close()
         return retList
 
+    def table_version(self, dbLocation: str, tableName: str) -> Optional[str]:
+        """
+        Get an identifier for the current contents of a table.  SQLite doesn't track when
+        each table is modified, so this changes whenever anything in the database (or its
+        write-ahead log) is written.  Returns None if the table doesn't exist, or is a view.
+        """
+        # Queries are run against the default database
+        if dbLocation is None or dbLocation == "main":
+            dbLocation = self.config.default_sql_lite_db_file
+        if not os.path.exists(dbLocation):
+            return None
+
+        with self.pool.connection(dbLocation) as connection:
+            found = connection.execute(
+                "SELECT type FROM sqlite_master WHERE name = ? COLLATE NOCASE", (tableName,)
+            ).fetchone()
+        if found is None or found[0] != "table":
+            return None
+
+        stats = [os.stat(path) for path in [dbLocation, f"{dbLocation}-wal"] if os.path.exists(path)]
+        return "/".join(f"{stat.st_mtime_ns}:{stat.st_size}" for stat in stats)
+
     def dry_run(self, query: str) -> List[SqlColumn]:
         logging.info(f"SqliteDataWarehouse.dry_run")
         dbLocation = self.config.default_sql_lite_db_file
@@ -138,6 +255,15 @@ class SqliteDataWarehouse(ABC):
     #     pass
 
 
+def _quote_identifier(name: str) -> str:
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _sql_values(series: pd.Series) -> list:
+    # Python scalars (which `sqlite3` can bind, unlike numpy's) with None for missing values
+    return series.astype(object).where(series.notna(), None).tolist()
+
+
 def unit_test():
     # add test code here
     # test_import_csv()
@@ -13,6 +13,7 @@ from hypermodel.platform.local.data_lake import LocalDataLake
 from hypermodel.platform.gitlab.git_host import GitHostBase
 from hypermodel.platform.gitlab.git_host import GitLabHost
 from hypermodel.platform.abstract.services import PlatformServicesBase
+from hypermodel.platform.abstract.cached_data_warehouse import CachedDataWarehouse
 
 
 class LocalPlatformServices(PlatformServicesBase):
@@ -39,6 +40,8 @@ class LocalPlatformServices(PlatformServicesBase):
         self._config: LocalConfig = LocalConfig()
         self._lake: LocalDataLake = LocalDataLake(self.config)
         self._warehouse: SqliteDataWarehouse = SqliteDataWarehouse(self.config)
+        if self.config.query_cache_max_bytes > 0:
+            self._warehouse = CachedDataWarehouse(self._warehouse, self.config.query_cache_path, self.config.query_cache_max_bytes)
         self._git: GitLabHost = GitLabHost(self.config)
 
     @property
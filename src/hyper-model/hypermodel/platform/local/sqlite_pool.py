@@ -0,0 +1,173 @@
+import logging
+import os
+import sqlite3
+import threading
+
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Tuple
+
+
+# Applied to every connection as it is opened.  WAL lets readers carry on while a
+# table is being written, and with `synchronous=NORMAL` commits no longer wait for
+# an fsync (a crash may lose the last transactions, but never corrupts the file).
+DEFAULT_PRAGMAS: List[Tuple[str, object]] = [
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("cache_size", -65536),  # Negative sizes are in KiB, so 64MiB of page cache
+    ("mmap_size", 268435456),  # Read up to 256MiB of the database through a memory map
+    ("temp_store", "MEMORY"),
+    ("busy_timeout", 5000),  # Wait up to 5s on another connection's write lock
+]
+
+# The number of idle connections kept open for each database
+DEFAULT_MAX_IDLE = 4
+
+
+class SqliteConnectionPool:
+    """
+    The `SqliteConnectionPool` keeps connections to each SQLite database open between
+    calls to the `SqliteDataWarehouse`, so that each call doesn't pay for opening the
+    file and setting up its pragmas again.  A connection is only ever used by one thread
+    at a time (so the pool is safe to share across the threads of the inference server),
+    and connections are opened again in a forked child process, or when the database
+    file has been deleted or replaced since they were opened.
+
+    Connections are in autocommit mode, with writes made inside an explicit
+    transaction (see `transaction`), rather than relying on the `sqlite3` module's
+    implicit transactions.
+    """
+
+    def __init__(self, max_idle: int = DEFAULT_MAX_IDLE, pragmas: List[Tuple[str, object]] = None):
+        if max_idle < 0:
+            raise ValueError("Parameter: `max_idle` must not be negative")
+
+        self.max_idle = max_idle
+        self.pragmas = DEFAULT_PRAGMAS if pragmas is None else pragmas
+
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._idle: Dict[str, List[Tuple[sqlite3.Connection, tuple]]] = dict()
+
+    @contextmanager
+    def connection(self, db_path: str) -> Iterator[sqlite3.Connection]:
+        """
+        Borrow a connection to the database at `db_path` for the duration of the
+        `with` block, opening one if none are idle.  Any transaction left open by
+        the block is rolled back before the connection is returned to the pool.
+
+        Args:
+            db_path (str): The path to the SQLite database file
+
+        Returns:
+            A context manager yielding the `sqlite3.Connection`
+        """
+        key = self._key(db_path)
+        connection, identity = self._acquire(key)
+        try:
+            yield connection
+        finally:
+            self._release(key, connection, identity)
+
+    @contextmanager
+    def transaction(self, db_path: str) -> Iterator[sqlite3.Connection]:
+        """
+        Borrow a connection to the database at `db_path` (as per `connection`) inside
+        a transaction, which is committed when the `with` block exits, or rolled back
+        if it raises.
+
+        Args:
+            db_path (str): The path to the SQLite database file
+
+        Returns:
+            A context manager yielding the `sqlite3.Connection`
+        """
+        with self.connection(db_path) as connection:
+            # Take the write lock up front, so that readers upgrading to writers can't deadlock
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                if connection.in_transaction:
+                    connection.rollback()
+                raise
+            # Callers may already have committed (though nothing after that is in the transaction)
+            if connection.in_transaction:
+                connection.commit()
+
+    def close(self, db_path: str = None):
+        """
+        Close the idle connections to the database at `db_path`, or to every database
+        if no path is given.  Connections in use are closed when they are returned.
+
+        Args:
+            db_path (str): The path to the SQLite database file
+        """
+        with self._lock:
+            if db_path is None:
+                idle = self._idle
+                self._idle = dict()
+            else:
+                key = self._key(db_path)
+                idle = {key: self._idle.pop(key, [])}
+
+        for connections in idle.values():
+            for connection, _ in connections:
+                connection.close()
+
+    def _acquire(self, key: str) -> Tuple[sqlite3.Connection, tuple]:
+        self._check_pid()
+        identity = self._identity(key)
+        while True:
+            with self._lock:
+                idle = self._idle.get(key)
+                if not idle:
+                    break
+                connection, opened = idle.pop()
+            if opened == identity:
+                return connection, opened
+            # The file was deleted or replaced, so the connection reads a database no one else can see
+            connection.close()
+        connection = self._open(key)
+        # Opening the connection creates the file if it didn't exist
+        return connection, self._identity(key)
+
+    def _release(self, key: str, connection: sqlite3.Connection, identity: tuple):
+        if connection.in_transaction:
+            connection.rollback()
+
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle and self._pid == os.getpid():
+                idle.append((connection, identity))
+                return
+        connection.close()
+
+    def _open(self, key: str) -> sqlite3.Connection:
+        logging.info(f"SqliteConnectionPool: opening connection to {key}")
+        # Connections move between threads as they are borrowed, but are never used by two at once
+        connection = sqlite3.connect(key, isolation_level=None, check_same_thread=False)
+        for name, value in self.pragmas:
+            connection.execute(f"PRAGMA {name}={value}")
+        return connection
+
+    def _check_pid(self):
+        # Connections (and the lock) are not safe to share with a forked child
+        if self._pid != os.getpid():
+            self._lock = threading.Lock()
+            self._pid = os.getpid()
+            self._idle = dict()
+
+    @staticmethod
+    def _identity(key: str) -> tuple:
+        try:
+            stat = os.stat(key)
+        except OSError:
+            return None
+        return (stat.st_dev, stat.st_ino)
+
+    @staticmethod
+    def _key(db_path: str) -> str:
+        # An in-memory database has no path to resolve
+        if db_path == ":memory:":
+            return db_path
+        return os.path.abspath(db_path)
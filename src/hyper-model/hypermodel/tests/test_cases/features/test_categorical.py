@@ -2,6 +2,9 @@ from hypermodel.features import categorical
 from hypermodel.tests.utilities import data_frame_utility
 
 from typing import List, Dict
+import pandas as pd
+import pytest
+import scipy.sparse
 
 def test_get_unique_feature_values()->None:
     dataFrame=data_frame_utility.get_test_dataframe()
@@ -46,3 +49,54 @@ def test_one_hot_encode()->None:
             assert val in [0,1]
 
 
+def test_one_hot_encode_values()->None:
+    dataFrame=pd.DataFrame({
+        "colour":["red","blue",None,"green","red"],
+        "size":["S","M","L","M","S"]
+    })
+    unique_feature_dict={"size":["S","M","L"],"colour":["red","green","blue"]}
+
+    retVal=categorical.one_hot_encode(dataFrame,unique_feature_dict)
+
+    # Columns are ordered by feature, then by the order of the unique values
+    expected_columns=["size:S","size:M","size:L","colour:red","colour:green","colour:blue"]
+    assert list(retVal.columns)==expected_columns
+
+    expected_values=[
+        [1,0,0,1,0,0],
+        [0,1,0,0,0,1],
+        [0,0,1,0,0,0],
+        [0,1,0,0,1,0],
+        [1,0,0,1,0,0],
+    ]
+    assert retVal.values.tolist()==expected_values
+    assert list(retVal.index)==list(dataFrame.index)
+
+
+def test_one_hot_encode_throw_on_missing()->None:
+    dataFrame=pd.DataFrame({"colour":["red","purple"]})
+    unique_feature_dict={"colour":["red","green","blue"]}
+
+    # Unseen values are encoded as all zeros by default
+    retVal=categorical.one_hot_encode(dataFrame,unique_feature_dict)
+    assert retVal.values.tolist()==[[1,0,0],[0,0,0]]
+
+    with pytest.raises(Exception, match="purple"):
+        categorical.one_hot_encode(dataFrame,unique_feature_dict,throw_on_missing=True)
+
+
+def test_one_hot_encode_sparse()->None:
+    dataFrame=pd.DataFrame({
+        "colour":["red","blue",None,"green","red"],
+        "size":["S","M","L","M","S"]
+    })
+    unique_feature_dict={"size":["S","M","L"],"colour":["red","green","blue"]}
+
+    dense=categorical.one_hot_encode(dataFrame,unique_feature_dict)
+    matrix,columns=categorical.one_hot_encode(dataFrame,unique_feature_dict,sparse=True)
+
+    assert isinstance(matrix,scipy.sparse.csr_matrix)
+    assert columns==list(dense.columns)
+    assert (matrix.toarray()==dense.values).all()
+    # Only the "1" values are stored
+    assert matrix.nnz==dense.values.sum()
@@ -0,0 +1,102 @@
+from hypermodel.features import one_hot_encode, FeatureEncoder
+
+import json
+import numpy
+import pandas as pd
+import pytest
+import scipy.sparse
+
+
+def get_test_encoder_dataframe()->pd.DataFrame:
+    return pd.DataFrame({
+        "colour":["red","blue",None,"green","red"],
+        "size":["S","M","L","M","S"],
+        "weight":[1.5,0.0,2.0,3.5,4.0],
+        "count":[0,1,2,3,4],
+    })
+
+
+def get_test_encoder()->FeatureEncoder:
+    unique_feature_dict={"size":["S","M","L"],"colour":["red","green","blue"]}
+    return FeatureEncoder(unique_feature_dict,["weight","count"])
+
+
+def test_columns_and_width()->None:
+    encoder=get_test_encoder()
+    expected_columns=["size:S","size:M","size:L","colour:red","colour:green","colour:blue","weight","count"]
+    assert encoder.columns==expected_columns
+    assert encoder.width==len(expected_columns)
+    assert encoder.categorical_width==6
+
+
+def test_encode_matches_one_hot_encode()->None:
+    dataFrame=get_test_encoder_dataframe()
+    encoder=get_test_encoder()
+
+    expected=one_hot_encode(dataFrame,encoder.feature_uniques)
+    for nf in encoder.features_numeric:
+        expected[nf]=dataFrame[nf]
+
+    actual=encoder.encode(dataFrame)
+    assert list(actual.columns)==list(expected.columns)
+    assert (actual.values==expected.values).all()
+
+    matrix=encoder.encode_matrix(dataFrame)
+    assert (matrix==expected.values).all()
+
+    sparse_matrix=encoder.encode_matrix(dataFrame,sparse=True)
+    assert isinstance(sparse_matrix,scipy.sparse.csr_matrix)
+    assert (sparse_matrix.toarray()==expected.values).all()
+
+
+def test_encode_throw_on_missing()->None:
+    dataFrame=pd.DataFrame({"size":["S","XL"],"colour":["red","red"],"weight":[1.0,2.0],"count":[1,2]})
+    encoder=get_test_encoder()
+    with pytest.raises(Exception, match="XL"):
+        encoder.encode(dataFrame,throw_on_missing=True)
+
+
+def test_to_dict_round_trip()->None:
+    dataFrame=get_test_encoder_dataframe()
+    encoder=get_test_encoder()
+
+    # The serialized encoder must survive being written as JSON
+    serialized=json.loads(json.dumps(encoder.to_dict()))
+    loaded=FeatureEncoder.from_dict(serialized)
+
+    assert loaded.columns==encoder.columns
+    assert loaded.width==encoder.width
+    assert (loaded.encode_matrix(dataFrame)==encoder.encode_matrix(dataFrame)).all()
+
+
+def test_encode_row_matches_encode_matrix()->None:
+    dataFrame=get_test_encoder_dataframe()
+    encoder=get_test_encoder()
+    matrix=encoder.encode_matrix(dataFrame)
+
+    for i,features in enumerate(dataFrame.to_dict(orient="records")):
+        row=encoder.encode_row(features)
+        assert row.shape==(1,encoder.width)
+        assert (row[0]==matrix[i]).all()
+
+
+def test_encode_row_preallocated()->None:
+    encoder=get_test_encoder()
+    out=numpy.ones(encoder.width)
+
+    row=encoder.encode_row({"size":"M","colour":"blue","weight":"2.5"},out=out)
+    # The preallocated vector is reused and fully overwritten
+    assert row.base is out
+    assert out[:encoder.categorical_width].tolist()==[0,1,0,0,0,1]
+    assert out[-2]==2.5
+    # Missing numeric features are NaN
+    assert numpy.isnan(out[-1])
+
+
+def test_encode_row_throw_on_missing()->None:
+    encoder=get_test_encoder()
+    row=encoder.encode_row({"size":"XL","colour":"red","weight":1,"count":1})
+    assert row[0,:encoder.categorical_width].tolist()==[0,0,0,1,0,0]
+
+    with pytest.raises(Exception, match="XL"):
+        encoder.encode_row({"size":"XL","colour":"red","weight":1,"count":1},throw_on_missing=True)
@@ -0,0 +1,160 @@
+import json
+import os
+import shutil
+import tempfile
+import types
+
+import pandas as pd
+
+from hypermodel.hml.artifact_cache import ArtifactCache
+from hypermodel.hml.model_container import ModelContainer
+from hypermodel.utilities.file_hash import file_md5
+from hypermodel.platform.abstract.data_lake import TransferResult
+from hypermodel.platform.abstract.platform_config import PlatformConfig
+
+
+def write_file(path, content):
+    with open(path, "w") as f:
+        f.write(content)
+    return path
+
+
+def test_put_and_restore(tmp_path):
+    source = write_file(str(tmp_path / "source.txt"), "some artifact")
+    md5 = file_md5(source)
+    cache = ArtifactCache(str(tmp_path / "cache"), max_bytes=1024)
+
+    destination = str(tmp_path / "artifact.txt")
+    assert cache.restore(md5, destination) is False
+    assert cache.put(md5, source) is not None
+    assert cache.restore(md5, destination) is True
+    assert file_md5(destination) == md5
+
+
+def test_put_does_not_cache_mismatched_md5(tmp_path):
+    source = write_file(str(tmp_path / "source.txt"), "some artifact")
+    cache = ArtifactCache(str(tmp_path / "cache"), max_bytes=1024)
+
+    assert cache.put("not-the-md5", source) is None
+    assert cache.get("not-the-md5") is None
+
+
+def test_restore_verifies_md5(tmp_path):
+    source = write_file(str(tmp_path / "source.txt"), "some artifact")
+    md5 = file_md5(source)
+    cache = ArtifactCache(str(tmp_path / "cache"), max_bytes=1024)
+    entry_path = cache.put(md5, source)
+
+    # A corrupted entry is removed rather than restored
+    write_file(entry_path, "some artifac")
+    destination = write_file(str(tmp_path / "artifact.txt"), "the old artifact")
+    assert cache.restore(md5, destination) is False
+    assert cache.get(md5) is None
+    with open(destination) as f:
+        assert f.read() == "the old artifact"
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = ArtifactCache(str(tmp_path / "cache"), max_bytes=25)
+    md5s = []
+    for i in range(3):
+        path = write_file(str(tmp_path / f"artifact-{i}.txt"), f"artifact {i}".ljust(10))
+        md5s.append(file_md5(path))
+        cache.put(md5s[-1], path)
+        # Give each entry a distinct last used time
+        os.utime(cache.get(md5s[-1]), (i, i))
+        if i == 1:
+            os.utime(cache.get(md5s[0]), (10, 10))
+
+    # The first artifact was used after the second, so the second is evicted
+    assert cache.get(md5s[0]) is not None
+    assert cache.get(md5s[1]) is None
+    assert cache.get(md5s[2]) is not None
+    assert cache.size() <= 25
+
+
+class FileLake:
+    """
+    A stand in for the data lake, which copies files and counts the downloads
+    """
+
+    def __init__(self):
+        self.downloads = 0
+
+    def download(self, from_path, to_path):
+        self.downloads += 1
+        shutil.copyfile(from_path, to_path)
+
+    def download_many(self, bucket_name, transfers):
+        for from_path, to_path in transfers:
+            self.download(from_path, to_path)
+        return [TransferResult(from_path, to_path, True) for from_path, to_path in transfers]
+
+
+def publish_by_hand(tmp_path, new_container) -> str:
+    lake_path = tmp_path / "lake"
+    lake_path.mkdir()
+
+    container = new_container()
+    container.analyze_distributions(pd.DataFrame({"num_feature1": [1, 2], "cat_feature1": ["a", "b"]}))
+    container.bind_model({"weights": [1, 2, 3]})
+    reference = {}
+    for name, local_path in [("distributions", container.dump_distributions()), ("model", container.dump_model())]:
+        lake_file = str(lake_path / os.path.basename(local_path))
+        shutil.copyfile(local_path, lake_file)
+        reference[name] = {"path": lake_file, "md5": file_md5(local_path)}
+    return write_file(str(tmp_path / "reference.json"), json.dumps(reference))
+
+
+def test_model_container_load_uses_cache(tmp_path):
+    config = types.SimpleNamespace(kfp_artifact_path=str(tmp_path / "artifacts"))
+    services = types.SimpleNamespace(config=config, lake=FileLake())
+
+    def new_container():
+        container = ModelContainer("test", "MyProject", ["num_feature1"], ["cat_feature1"], "target_feature", services)
+        return container.with_artifact_cache(ArtifactCache(str(tmp_path / "cache"), max_bytes=1024 * 1024))
+
+    reference_file = publish_by_hand(tmp_path, new_container)
+
+    first = new_container()
+    first.load(reference_file)
+    assert services.lake.downloads == 2
+
+    loaded = new_container()
+    loaded.load(reference_file)
+    assert services.lake.downloads == 2
+    assert loaded.model == {"weights": [1, 2, 3]}
+    assert loaded.get_training_columns() == first.get_training_columns()
+
+
+class InferenceConfig(PlatformConfig):
+    """
+    The config of an inference deployment, which (unlike a pipeline op) has no `HML_TMP`
+    """
+
+    def __init__(self, kfp_artifact_path):
+        PlatformConfig.__init__(self)
+        self.kfp_artifact_path = kfp_artifact_path
+
+
+def test_model_container_load_without_hml_tmp(tmp_path, monkeypatch):
+    monkeypatch.delenv("HML_TMP", raising=False)
+    monkeypatch.delenv("TEMP_PATH", raising=False)
+    monkeypatch.delenv("HML_ARTIFACT_CACHE", raising=False)
+    monkeypatch.delenv("HML_ARTIFACT_CACHE_MB", raising=False)
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path / "system-tmp"))
+    os.makedirs(tempfile.tempdir)
+
+    services = types.SimpleNamespace(config=InferenceConfig(str(tmp_path / "artifacts")), lake=FileLake())
+
+    def new_container():
+        return ModelContainer("test", "MyProject", ["num_feature1"], ["cat_feature1"], "target_feature", services)
+
+    reference_file = publish_by_hand(tmp_path, new_container)
+
+    # The artifact cache (on by default) falls back to the system temp directory
+    loaded = new_container()
+    loaded.load(reference_file)
+    assert loaded.model == {"weights": [1, 2, 3]}
+    assert loaded.get_artifact_cache().path == os.path.join(tempfile.tempdir, "hml-artifact-cache")
+    assert loaded.get_artifact_cache().size() > 0
@@ -0,0 +1,823 @@
+import shutil
+import threading
+import urllib.error
+import types
+import os
+import urllib.request
+import asyncio
+import click
+import json
+import msgpack
+import pandas as pd
+import pytest
+import flask
+
+from hypermodel.hml.hml_inference_app import HmlInferenceApp
+from hypermodel.hml.model_container import ModelContainer
+from hypermodel.hml.prediction.routes.batch import bind_batch_routes
+from hypermodel.hml.prediction.routes.routing import request_routing, version_headers
+from hypermodel.utilities.file_hash import file_md5
+from hypermodel.platform.abstract.data_lake import TransferResult
+
+
+class SumModel:
+    """
+    A stand in for a real model, which predicts the sum of each row
+    """
+
+    def predict(self, matrix):
+        return matrix.sum(axis=1)
+
+
+def get_instance_of_HmlInferenceApp()->HmlInferenceApp:
+    @click.group()
+    def cli_root():
+        pass
+
+    return HmlInferenceApp(
+        name="test",
+        services=object(),
+        cli=cli_root,
+        image_url="Some URL",
+        package_entrypoint="PackageEntrypoint",
+        port=8000,
+        k8s_namespace="k8s_namespace",
+        envs=dict()
+    )
+
+
+def get_test_model_container()->ModelContainer:
+    model_cont=ModelContainer(
+        name="test-model",
+        project_name="MyProject",
+        features_numeric=["num_feature1"],
+        features_categorical=["cat_feature1"],
+        target="target_feature",
+        services=None
+    )
+    df=pd.DataFrame({"num_feature1":[1,2],"cat_feature1":["val11","val12"]})
+    model_cont.analyze_distributions(df)
+    model_cont.bind_model(SumModel())
+    return model_cont
+
+
+def test_predict():
+    app=get_instance_of_HmlInferenceApp()
+    app.models["test-model"]=get_test_model_container()
+    assert app.predict("test-model",{"num_feature1":"3","cat_feature1":"val11"})==4
+
+    with pytest.raises(KeyError):
+        app.predict("not-a-model",{})
+
+
+def test_predict_micro_batching():
+    app=get_instance_of_HmlInferenceApp().with_micro_batching(max_batch_size=4,max_wait_ms=1)
+    app.models["test-model"]=get_test_model_container()
+
+    assert app.predict("test-model",{"num_feature1":"3","cat_feature1":"val11"})==4
+    assert app.predict("test-model",{"num_feature1":"1","cat_feature1":"val12"})==2
+
+    metrics=app.get_batching_metrics()
+    assert metrics["test-model"]["requests"]==2
+    app.batchers["test-model"].stop()
+
+
+def test_predict_batch_json_array():
+    app=get_instance_of_HmlInferenceApp()
+    app.models["test-model"]=get_test_model_container()
+    client=app.flask.test_client()
+
+    records=[{"num_feature1":i,"cat_feature1":"val11" if i%2==0 else "val12"} for i in range(25)]
+    response=client.post("/predict/batch",json=records)
+    assert response.status_code==200
+    assert json.loads(response.data)==[i+1 for i in range(25)]
+
+    # As with MessagePack, a single set of features gets a single prediction, and columns of values an array
+    response=client.post("/predict/batch",json={"num_feature1":3,"cat_feature1":"val11"})
+    assert response.status_code==200
+    assert json.loads(response.data)==4
+    response=client.post("/predict/batch",json={"num_feature1":[1.5,2.5],"cat_feature1":["val11","val12"]})
+    assert json.loads(response.data)==[2.5,3.5]
+    assert client.post("/predict/batch",json="features").status_code==400
+
+    # Unseen values are rejected up front when asked to
+    response=client.post("/predict/batch?throw_on_missing=true",json=[{"num_feature1":1,"cat_feature1":"unseen"}])
+    assert response.status_code==400
+
+
+def test_predict_batch_fails_on_later_chunks():
+    app=get_instance_of_HmlInferenceApp()
+    app.models["test-model"]=get_test_model_container()
+    chunked=flask.Flask("chunked")
+    bind_batch_routes(chunked,app,chunk_rows=2)
+    client=chunked.test_client()
+
+    # The bad row is in the last chunk, but the whole request still fails rather than being cut short
+    records=[{"num_feature1":i,"cat_feature1":"val11"} for i in range(4)]+[{"num_feature1":1,"cat_feature1":"unseen"}]
+    response=client.post("/predict/batch?throw_on_missing=true",json=records)
+    assert response.status_code==400
+    assert json.loads(response.data)["success"] is False
+    response=client.post("/predict/batch?throw_on_missing=true",data=msgpack.packb(records),content_type="application/msgpack")
+    assert response.status_code==400
+
+    # Which NDJSON can only report in-band, after the predictions already sent
+    response=client.post(
+        "/predict/batch?throw_on_missing=true",
+        data="\n".join(json.dumps(r) for r in records),
+        content_type="application/x-ndjson"
+    )
+    lines=[json.loads(line) for line in response.data.decode().splitlines()]
+    assert lines[:4]==[1,2,3,4]
+    assert lines[4]["success"] is False
+
+
+def test_predict_batch_ndjson():
+    app=get_instance_of_HmlInferenceApp()
+    app.models["test-model"]=get_test_model_container()
+    client=app.flask.test_client()
+
+    # Features missing from a record are encoded as nulls
+    lines=[json.dumps({"num_feature1":i,"cat_feature1":"val11"}) for i in range(5)]+[json.dumps({"num_feature1":9})]
+    response=client.post(
+        "/predict/batch?model=test-model",
+        data="\n".join(lines),
+        content_type="application/x-ndjson"
+    )
+    assert response.status_code==200
+    predictions=[json.loads(line) for line in response.data.decode().splitlines()]
+    assert predictions==[1,2,3,4,5,9]
+
+
+def test_predict_msgpack():
+    app=get_instance_of_HmlInferenceApp()
+    app.models["test-model"]=get_test_model_container()
+    client=app.flask.test_client()
+
+    def post(payload):
+        response=client.post("/predict/batch",data=msgpack.packb(payload),content_type="application/msgpack")
+        assert response.status_code==200
+        assert response.mimetype=="application/msgpack"
+        return msgpack.unpackb(response.data)
+
+    # A single set of features gets a single prediction
+    assert post({"num_feature1":3,"cat_feature1":"val11"})==4
+    # Rows of features, or columns of values, get an array of predictions
+    assert post([{"num_feature1":i,"cat_feature1":"val12"} for i in range(3)])==[1,2,3]
+    assert post({"num_feature1":[1.5,2.5],"cat_feature1":["val11","val12"]})==[2.5,3.5]
+
+    response=client.post("/predict/batch",data=b"\xc1",content_type="application/msgpack")
+    assert response.status_code==400
+
+
+def test_predict_batch_rejects_bad_shapes():
+    app=get_instance_of_HmlInferenceApp()
+    app.models["test-model"]=get_test_model_container()
+    client=app.flask.test_client()
+
+    bad_bodies=[
+        {"num_feature1":[1,2],"cat_feature1":["val11"]},
+        {"num_feature1":[1,2],"cat_feature1":"val11"},
+        {},
+        [[1,2]],
+        [1,2,3],
+        "features",
+    ]
+    for body in bad_bodies:
+        response=client.post("/predict/batch",json=body)
+        assert response.status_code==400,body
+        assert json.loads(response.data)["success"] is False
+        response=client.post("/predict/batch",data=msgpack.packb(body),content_type="application/msgpack")
+        assert response.status_code==400,body
+        assert json.loads(response.data)["success"] is False
+
+
+def test_predict_batch_unknown_model():
+    app=get_instance_of_HmlInferenceApp()
+    client=app.flask.test_client()
+    assert client.post("/predict/batch",json=[]).status_code==400
+    assert client.post("/predict/batch?model=nope",json=[]).status_code==404
+
+
+def call_asgi(app, scope, body=b""):
+    """
+    Make a single call to an ASGI app, returning the messages it sent
+    """
+    requests=[{"type":"http.request","body":body,"more_body":False}]
+    if scope["type"]=="lifespan":
+        requests=[{"type":"lifespan.startup"},{"type":"lifespan.shutdown"}]
+    sent=[]
+
+    async def receive():
+        return requests.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope,receive,send))
+    return sent
+
+
+def http_scope(method,path,query_string=b"",headers=[]):
+    return {"type":"http","method":method,"path":path,"query_string":query_string,"headers":headers}
+
+
+def test_async_lifespan_runs_init_callbacks():
+    app=get_instance_of_HmlInferenceApp()
+    called=[]
+
+    @app.on_init
+    def init_sync(inference_app):
+        # Run on the executor, so a slow load doesn't block the health checks
+        assert threading.current_thread() is not threading.main_thread()
+        called.append("sync")
+
+    @app.on_init
+    async def init_async(inference_app):
+        called.append("async")
+
+    loaded=threading.Event()
+
+    @app.on_init
+    async def init_slowly(inference_app):
+        while not loaded.is_set():
+            await asyncio.sleep(0.01)
+
+    async def status(path):
+        messages=[]
+
+        async def receive():
+            return {"type":"http.request","body":b"","more_body":False}
+
+        async def send(message):
+            messages.append(message)
+
+        await app.asgi(http_scope("GET",path),receive,send)
+        return messages[0]["status"]
+
+    async def lifespan():
+        sent=[]
+        requests=[{"type":"lifespan.startup"}]
+
+        async def receive():
+            if requests:
+                return requests.pop(0)
+            # Startup completed (so Uvicorn would bind its socket) while the callbacks are still running
+            await asyncio.sleep(0.01)
+            assert called==["sync","async"] and not app.ready
+            assert await status("/readyz")==503
+            assert await status("/healthz")==200
+            loaded.set()
+            await app._initialising
+            assert await status("/readyz")==200
+            return {"type":"lifespan.shutdown"}
+
+        async def send(message):
+            sent.append(message)
+
+        await app.asgi({"type":"lifespan"},receive,send)
+        return sent
+
+    sent=asyncio.run(lifespan())
+    assert [m["type"] for m in sent]==["lifespan.startup.complete","lifespan.shutdown.complete"]
+
+
+def test_async_route_predicts_on_executor():
+    app=get_instance_of_HmlInferenceApp()
+    app.models["test-model"]=get_test_model_container()
+
+    @app.async_route("/predict/async",methods=["POST"])
+    async def predict(request):
+        return {"prediction":float(await app.predict_async("test-model",request.get_json()))}
+
+    body=json.dumps({"num_feature1":"3","cat_feature1":"val11"}).encode("utf-8")
+    sent=call_asgi(app.asgi,http_scope("POST","/predict/async"),body)
+    assert sent[0]["status"]==200
+    assert json.loads(sent[1]["body"])=={"prediction":4.0}
+
+    @app.async_route("/nothing",methods=["POST"])
+    async def nothing(request):
+        return None
+
+    sent=call_asgi(app.asgi,http_scope("POST","/nothing"))
+    assert sent[0]["status"]==204
+    assert sent[1]["body"]==b""
+
+    with pytest.raises(TypeError):
+        app.async_route("/not-async")(lambda request: None)
+
+
+def test_async_falls_back_to_flask_routes():
+    app=get_instance_of_HmlInferenceApp()
+    app.models["test-model"]=get_test_model_container()
+
+    sent=call_asgi(app.asgi,http_scope("GET","/healthz"))
+    assert sent[0]["status"]==200
+    assert b"".join(m.get("body",b"") for m in sent[1:])==b"I am healthy!"
+
+    records=[{"num_feature1":i,"cat_feature1":"val11"} for i in range(5)]
+    scope=http_scope("POST","/predict/batch",headers=[(b"content-type",b"application/x-ndjson")])
+    sent=call_asgi(app.asgi,scope,"\n".join(json.dumps(r) for r in records).encode("utf-8"))
+    assert sent[0]["status"]==200
+    lines=b"".join(m.get("body",b"") for m in sent[1:]).decode("utf-8").splitlines()
+    assert [json.loads(l) for l in lines]==[i+1 for i in range(5)]
+
+    sent=call_asgi(app.asgi,http_scope("GET","/not-a-route"))
+    assert sent[0]["status"]==404
+
+
+def test_async_streams_request_bodies_to_flask():
+    app=get_instance_of_HmlInferenceApp()
+
+    @app.flask.route("/echo",methods=["POST"])
+    def echo():
+        stream=flask.request.stream
+        return flask.Response(flask.stream_with_context(line.upper() for line in stream))
+
+    async def post():
+        sent=[]
+        echoed=asyncio.Event()
+        requests=[
+            {"type":"http.request","body":b"first\nsec","more_body":True},
+            {"type":"http.request","body":b"ond\n","more_body":False},
+        ]
+
+        async def receive():
+            if len(requests)==1:
+                # Only send the rest of the body once the first line has been answered
+                await asyncio.wait_for(echoed.wait(),timeout=10)
+            return requests.pop(0)
+
+        async def send(message):
+            sent.append(message)
+            if message.get("body")==b"FIRST\n":
+                echoed.set()
+
+        await app.asgi(http_scope("POST","/echo"),receive,send)
+        return sent
+
+    sent=asyncio.run(post())
+    assert sent[0]["status"]==200
+    assert b"".join(m.get("body",b"") for m in sent[1:])==b"FIRST\nSECOND\n"
+
+
+def test_async_stops_streaming_when_the_client_goes():
+    app=get_instance_of_HmlInferenceApp()
+    closed=threading.Event()
+
+    @app.flask.route("/forever")
+    def forever():
+        def _lines():
+            try:
+                while True:
+                    yield b"line\n"
+            finally:
+                closed.set()
+        return flask.Response(_lines())
+
+    async def get():
+        async def receive():
+            return {"type":"http.request","body":b"","more_body":False}
+
+        async def send(message):
+            if message["type"]=="http.response.body":
+                raise OSError("The client has gone")
+
+        with pytest.raises(OSError):
+            await app.asgi(http_scope("GET","/forever"),receive,send)
+        # Rather than blocking forever once the queue of unsent lines is full (with the loop still running)
+        return await asyncio.get_event_loop().run_in_executor(None,closed.wait,10)
+
+    assert asyncio.run(get())
+
+
+def test_async_aborts_responses_failing_part_way():
+    app=get_instance_of_HmlInferenceApp()
+
+    @app.flask.route("/partial")
+    def partial():
+        def _lines():
+            yield b"first\n"
+            raise ValueError("Nope")
+        return flask.Response(_lines())
+
+    sent=[]
+
+    async def get():
+        async def receive():
+            return {"type":"http.request","body":b"","more_body":False}
+
+        async def send(message):
+            sent.append(message)
+
+        await app.asgi(http_scope("GET","/partial"),receive,send)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(get())
+    assert sent[0]["status"]==200
+    # The truncated body is never ended as though it were complete
+    assert all(m.get("more_body") for m in sent[1:])
+
+
+def test_start_async_command_is_registered():
+    app=get_instance_of_HmlInferenceApp()
+    assert "start-async" in app.cli_inference_group.commands
+
+
+def test_prefork_workers_share_loaded_models():
+    app=get_instance_of_HmlInferenceApp()
+    app.models["test-model"]=get_test_model_container()
+    app.port=0
+
+    @app.flask.route("/predict/pid")
+    def predict_pid():
+        prediction=app.predict("test-model",{"num_feature1":"3","cat_feature1":"val11"})
+        return json.dumps({"pid":os.getpid(),"prediction":float(prediction)})
+
+    server=app._build_prefork_server(workers=2,threads=2).start()
+    try:
+        assert len(server.pids)==2
+        for i in range(10):
+            with urllib.request.urlopen(f"http://127.0.0.1:{server.port}/predict/pid",timeout=10) as response:
+                result=json.loads(response.read())
+            assert result["prediction"]==4.0
+            assert result["pid"] in server.pids
+    finally:
+        server.stop()
+    assert len(server.pids)==0
+
+
+def get_status(url):
+    try:
+        with urllib.request.urlopen(url,timeout=10) as response:
+            return response.status
+    except urllib.error.HTTPError as ex:
+        return ex.code
+
+
+def test_prefork_serves_health_checks_while_loading():
+    app=get_instance_of_HmlInferenceApp()
+    app.port=0
+    loading=threading.Event()
+    loaded=threading.Event()
+
+    @app.on_init
+    def init(inference_app):
+        loading.set()
+        assert loaded.wait(timeout=10)
+        inference_app.models["test-model"]=get_test_model_container()
+
+    server=app._build_prefork_server(workers=1,threads=2,before_fork=app._initialise)
+    starting=threading.Thread(target=server.start)
+    starting.start()
+    try:
+        assert loading.wait(timeout=10)
+        # Served by the parent, while the models are still loading
+        assert get_status(f"http://127.0.0.1:{server.port}/healthz")==200
+        assert get_status(f"http://127.0.0.1:{server.port}/readyz")==503
+        assert len(server.pids)==0
+
+        loaded.set()
+        starting.join(timeout=10)
+        assert len(server.pids)==1
+        assert get_status(f"http://127.0.0.1:{server.port}/readyz")==200
+    finally:
+        loaded.set()
+        starting.join(timeout=10)
+        server.stop()
+
+
+class ScaledSumModel(SumModel):
+    """
+    A second version of the `SumModel`, which predicts ten times the sum of each row
+    """
+
+    def predict(self, matrix):
+        return matrix.sum(axis=1)*10
+
+
+class FileLake:
+    def download(self, from_path, to_path):
+        shutil.copyfile(from_path, to_path)
+
+    def download_many(self, bucket_name, transfers):
+        for from_path, to_path in transfers:
+            self.download(from_path, to_path)
+        return [TransferResult(from_path, to_path, True) for from_path, to_path in transfers]
+
+
+def publish_test_model(tmp_path, model, version):
+    """
+    Publish a version of the test model to a lake on the local filesystem,
+    returning the reference to it
+    """
+    services=types.SimpleNamespace(
+        config=types.SimpleNamespace(kfp_artifact_path=str(tmp_path/"publish")),
+        lake=FileLake()
+    )
+    model_cont=get_test_model_container()
+    model_cont.services=services
+    model_cont.bind_model(model)
+
+    reference={}
+    for name,local_path in [("distributions",model_cont.dump_distributions()),("model",model_cont.dump_model())]:
+        lake_path=str(tmp_path/f"{version}-{os.path.basename(local_path)}")
+        shutil.copyfile(local_path,lake_path)
+        reference[name]={"path":lake_path,"md5":file_md5(lake_path)}
+    return reference
+
+
+def load_test_model(tmp_path, reference_file):
+    services=types.SimpleNamespace(
+        config=types.SimpleNamespace(kfp_artifact_path=str(tmp_path/"serve"),artifact_cache_max_bytes=0),
+        lake=FileLake()
+    )
+    model_cont=get_test_model_container()
+    model_cont.services=services
+    model_cont.load(reference_file)
+    return model_cont
+
+
+def test_reload_model(tmp_path):
+    reference_file=str(tmp_path/"test-model-reference.json")
+    with open(reference_file,"w") as f:
+        json.dump(publish_test_model(tmp_path,SumModel(),"v1"),f)
+
+    app=get_instance_of_HmlInferenceApp()
+    app.models["test-model"]=load_test_model(tmp_path,reference_file)
+    old_container=app.models["test-model"]
+    features={"num_feature1":"3","cat_feature1":"val11"}
+    assert app.predict("test-model",features)==4
+
+    # Nothing has changed, so nothing is reloaded
+    assert app.reload_model("test-model") is False
+    assert app.models["test-model"] is old_container
+
+    with open(reference_file,"w") as f:
+        json.dump(publish_test_model(tmp_path,ScaledSumModel(),"v2"),f)
+    assert app.reload_model("test-model") is True
+    assert app.predict("test-model",features)==40
+    # Anything still holding the old version can keep using it
+    assert old_container.model.predict(old_container.encode_row(features))[0]==4
+
+    # A broken reference keeps the current version
+    with open(reference_file,"w") as f:
+        json.dump({"model":{"path":"missing"},"distributions":{"path":"missing"}},f)
+    assert app.reload_model("test-model") is False
+    assert app.predict("test-model",features)==40
+
+
+def test_reload_verifies_downloads(tmp_path):
+    reference_file=str(tmp_path/"test-model-reference.json")
+    with open(reference_file,"w") as f:
+        json.dump(publish_test_model(tmp_path,SumModel(),"v1"),f)
+
+    app=get_instance_of_HmlInferenceApp()
+    app.models["test-model"]=load_test_model(tmp_path,reference_file)
+    lake=app.models["test-model"].services.lake
+    download_paths=[]
+    download=lake.download
+    lake.download=lambda from_path,to_path: download_paths.append(to_path) or download(from_path,to_path)
+
+    # An artifact which doesn't match its md5 (e.g. torn by a concurrent write) is never swapped in
+    reference=publish_test_model(tmp_path,ScaledSumModel(),"v2")
+    reference["model"]["md5"]="not-the-md5"
+    with open(reference_file,"w") as f:
+        json.dump(reference,f)
+    assert app.reload_model("test-model") is False
+    assert app.predict("test-model",{"num_feature1":"3","cat_feature1":"val11"})==4
+
+    # Each attempt downloads to paths of its own, which are cleaned up
+    reference["model"]["md5"]=file_md5(reference["model"]["path"])
+    with open(reference_file,"w") as f:
+        json.dump(reference,f)
+    assert app.reload_model("test-model") is True
+    assert app.predict("test-model",{"num_feature1":"3","cat_feature1":"val11"})==40
+    assert len(set(download_paths))==len(download_paths)==4
+    assert not any(os.path.exists(path) for path in download_paths)
+    assert all(f".{os.getpid()}." in path for path in download_paths)
+
+
+def test_model_reloader_watches_reference_files(tmp_path):
+    reference_file=str(tmp_path/"test-model-reference.json")
+    with open(reference_file,"w") as f:
+        json.dump(publish_test_model(tmp_path,SumModel(),"v1"),f)
+
+    app=get_instance_of_HmlInferenceApp().with_hot_reload(poll_seconds=60)
+    app.models["test-model"]=load_test_model(tmp_path,reference_file)
+    assert app.reloader.check()==[]
+
+    with open(reference_file,"w") as f:
+        json.dump(publish_test_model(tmp_path,ScaledSumModel(),"v2"),f)
+    os.utime(reference_file,(0,0))
+    assert app.reloader.check()==["test-model"]
+    assert app.reloader.check()==[]
+    assert app.predict("test-model",{"num_feature1":"3","cat_feature1":"val11"})==40
+
+    # A reference whose model can't be loaded yet (e.g. still uploading) is retried
+    reference=publish_test_model(tmp_path,SumModel(),"v3")
+    os.rename(reference["model"]["path"],reference["model"]["path"]+".uploading")
+    with open(reference_file,"w") as f:
+        json.dump(reference,f)
+    assert app.reloader.check()==[]
+    os.rename(reference["model"]["path"]+".uploading",reference["model"]["path"])
+    assert app.reloader.check()==["test-model"]
+    assert app.predict("test-model",{"num_feature1":"3","cat_feature1":"val11"})==4
+
+
+def test_register_model_versions():
+    app=get_instance_of_HmlInferenceApp()
+    stable=app.register_model(get_test_model_container(),version="stable")
+    canary=get_test_model_container().bind_model(ScaledSumModel())
+    app.register_model(canary,version="canary",weight=0)
+    features={"num_feature1":"3","cat_feature1":"val11"}
+
+    assert app.models["test-model"] is stable
+    assert app.predict("test-model",features)==4
+    assert app.predict("test-model",features,version="canary")==40
+    with pytest.raises(KeyError):
+        app.predict("test-model",features,version="not-a-version")
+
+    client=app.flask.test_client()
+    records=[{"num_feature1":1,"cat_feature1":"val11"}]
+    response=client.post("/predict/batch",json=records,headers={"X-Model-Version":"canary"})
+    assert json.loads(response.data)==[20]
+    response=client.post("/predict/batch",json=records[0],headers={"X-Model-Version":"canary"})
+    assert json.loads(response.data)==20
+    assert client.post("/predict/batch",json=records,headers={"X-Model-Version":"nope"}).status_code==404
+
+    # Other routes handle the same headers, whether served by Flask or asynchronously
+    @app.flask.route("/predict")
+    def predict():
+        model=app.select_model("test-model",**request_routing(flask.request.headers))
+        response=flask.jsonify(float(app.predict_with(model,flask.request.args.to_dict())))
+        response.headers.extend(version_headers(model))
+        return response
+
+    response=client.get("/predict",query_string=features,headers={"X-Model-Version":"canary"})
+    assert json.loads(response.data)==40
+
+    @app.async_route("/predict/async")
+    async def predict_async(request):
+        return {"prediction":float(await app.predict_async("test-model",features,**request_routing(request.headers)))}
+
+    sent=call_asgi(app.asgi,http_scope("GET","/predict/async",headers=[(b"x-model-version",b"canary")]))
+    assert json.loads(sent[1]["body"])=={"prediction":40.0}
+
+
+def test_predict_with_prediction_cache(tmp_path):
+    reference_file=str(tmp_path/"test-model-reference.json")
+    with open(reference_file,"w") as f:
+        json.dump(publish_test_model(tmp_path,SumModel(),"v1"),f)
+
+    app=get_instance_of_HmlInferenceApp().with_prediction_cache(max_entries=100)
+    app.models["test-model"]=load_test_model(tmp_path,reference_file)
+    features={"num_feature1":"3","cat_feature1":"val11"}
+
+    assert app.predict("test-model",features)==4
+    # Different raw values which encode to the same vector are a hit
+    assert app.predict("test-model",{"num_feature1":3.0,"cat_feature1":"val11","extra":"ignored"})==4
+    assert app.get_cache_metrics()["hits"]==1
+
+    # Swapping the model drops its cached predictions
+    with open(reference_file,"w") as f:
+        json.dump(publish_test_model(tmp_path,ScaledSumModel(),"v2"),f)
+    assert app.reload_model("test-model") is True
+    assert app.get_cache_metrics()["size"]==0
+    assert app.predict("test-model",features)==40
+
+
+def test_prediction_cache_with_micro_batching():
+    app=get_instance_of_HmlInferenceApp().with_prediction_cache(max_entries=100).with_micro_batching(max_wait_ms=1)
+    model_cont=get_test_model_container()
+    app.models["test-model"]=model_cont
+    encoded=[]
+    encode_row=model_cont.get_encoder().encode_row
+
+    def counting_encode_row(*args,**kwargs):
+        encoded.append(args[0])
+        return encode_row(*args,**kwargs)
+
+    # The row encoded for the cache is passed to the batcher, rather than encoded again
+    model_cont.get_encoder().encode_row=counting_encode_row
+    assert app.predict("test-model",{"num_feature1":"3","cat_feature1":"val11"})==4
+    assert len(encoded)==1
+    app.batchers["test-model"].stop()
+
+
+def test_metrics_route(tmp_path):
+    reference_file=str(tmp_path/"test-model-reference.json")
+    with open(reference_file,"w") as f:
+        json.dump(publish_test_model(tmp_path,SumModel(),"v1"),f)
+
+    app=get_instance_of_HmlInferenceApp()
+    model_cont=load_test_model(tmp_path,reference_file)
+    app.register_model(model_cont,version="v1")
+    client=app.flask.test_client()
+
+    response=client.post("/predict/batch",json=[{"num_feature1":1,"cat_feature1":"val11"}])
+    assert json.loads(response.data)==[2]
+    response.close()
+    app.predict("test-model",{"num_feature1":"3","cat_feature1":"val11"})
+
+    response=client.get("/metrics")
+    assert response.status_code==200
+    assert response.mimetype=="text/plain"
+    text=response.data.decode("utf-8")
+    assert 'hml_requests_total{method="POST",route="/predict/batch",status="200"} 1' in text
+    for stage in ["decode","encode","predict","serialize"]:
+        assert f'hml_stage_duration_seconds_count{{model="test-model",stage="{stage}"}}' in text
+    # Sized from the artifacts as they were loaded, rather than by measuring the model
+    size=os.path.getsize(tmp_path/"v1-test-model.joblib")+os.path.getsize(tmp_path/"v1-test-model-distributions.json")
+    assert model_cont.size_bytes==size
+    assert f'hml_model_size_bytes{{model="test-model",version="v1"}} {size}' in text
+    # The scrape itself is in flight
+    assert "hml_requests_in_flight 1" in text
+
+
+class CountingModel(SumModel):
+    """
+    A `SumModel` which remembers every matrix it was asked to predict
+    """
+
+    def __init__(self):
+        self.matrices=[]
+
+    def predict(self, matrix):
+        self.matrices.append(matrix)
+        return SumModel.predict(self, matrix)
+
+
+def test_readiness_waits_for_warm_up():
+    app=get_instance_of_HmlInferenceApp().with_warm_up(rows=4)
+    client=app.flask.test_client()
+    model=CountingModel()
+    ready_during_warm_up=[]
+
+    @app.on_init
+    def init(inference_app):
+        model_container=get_test_model_container()
+        model_container.bind_model(model)
+        inference_app.register_model(model_container,version="v1")
+
+    @app.on_warm_up
+    def warm_up(inference_app):
+        ready_during_warm_up.append(client.get("/readyz").status_code)
+
+    assert client.get("/healthz").status_code==200
+    assert client.get("/readyz").status_code==503
+
+    app._initialise_in_background().join(timeout=10)
+    assert ready_during_warm_up==[503]
+    assert client.get("/readyz").status_code==200
+
+    # Four single predictions from the stored distributions, then one batch of four
+    assert [m.shape[0] for m in model.matrices]==[1,1,1,1,4]
+    # val11 with the median, then val12 with the lower quartile
+    assert model.matrices[0].sum()==2.5 and model.matrices[1].sum()==2.25
+
+
+def test_failed_initialisation_is_not_alive():
+    app=get_instance_of_HmlInferenceApp()
+    client=app.flask.test_client()
+
+    @app.on_init
+    def init(inference_app):
+        raise ValueError("no models for you")
+
+    app._initialise_in_background().join(timeout=10)
+    assert client.get("/readyz").status_code==503
+    assert client.get("/healthz").status_code==500
+
+
+def test_deployment_probes():
+    deployment=get_instance_of_HmlInferenceApp().deployment
+    container=deployment.k8s_container
+    assert container.liveness_probe.http_get.path=="/healthz"
+    assert container.readiness_probe.http_get.path=="/readyz"
+
+    deployment.with_readiness_probe(initial_delay_seconds=1,period_seconds=2,failure_threshold=5)
+    assert container.readiness_probe.initial_delay_seconds==1
+    assert container.readiness_probe.failure_threshold==5
+
+
+def test_deployment_autoscaling():
+    from kubernetes.client import ApiClient
+
+    deployment=get_instance_of_HmlInferenceApp().deployment
+    assert deployment.k8s_autoscaler is None
+
+    deployment.with_autoscaling(min_replicas=2,max_replicas=6,scale_down_stabilization_seconds=120)
+    deployment.with_autoscaling_metric("hml_requests_per_second","50")
+    assert deployment.k8s_deployment.spec.replicas is None
+
+    body=ApiClient().sanitize_for_serialization(deployment.k8s_autoscaler)
+    assert body["spec"]["scaleTargetRef"]["name"]==deployment.deployment_name
+    assert (body["spec"]["minReplicas"],body["spec"]["maxReplicas"])==(2,6)
+    assert body["spec"]["behavior"]=={"scaleDown":{"stabilizationWindowSeconds":120}}
+    assert [m["type"] for m in body["spec"]["metrics"]]==["Resource","Pods"]
+    assert body["spec"]["metrics"][0]["resource"]["target"]["averageUtilization"]==80
+    assert body["spec"]["metrics"][1]["pods"]["metric"]["name"]=="hml_requests_per_second"
+    assert "HorizontalPodAutoscaler" in deployment.get_yaml()
+
+    with pytest.raises(ValueError):
+        deployment.with_autoscaling(min_replicas=3,max_replicas=2)
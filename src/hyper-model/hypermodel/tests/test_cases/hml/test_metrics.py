@@ -0,0 +1,53 @@
+import pytest
+
+from hypermodel.hml.prediction.metrics import InferenceMetrics, Counter, Gauge, Histogram, _Metric
+
+
+def test_histogram_render():
+    histogram = Histogram("latency_seconds", "Some latency", buckets=(0.1, 1.0))
+    histogram.observe(0.05, route="/a")
+    histogram.observe(0.5, route="/a")
+    histogram.observe(5, route="/a")
+
+    assert histogram.render() == [
+        "# HELP latency_seconds Some latency",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{route="/a",le="0.1"} 1',
+        'latency_seconds_bucket{route="/a",le="1.0"} 2',
+        'latency_seconds_bucket{route="/a",le="+Inf"} 3',
+        'latency_seconds_sum{route="/a"} 5.55',
+        'latency_seconds_count{route="/a"} 3',
+    ]
+
+
+def test_counter_and_gauge_render():
+    counter = Counter("requests_total", "Requests")
+    counter.inc(route="/a", status=200)
+    counter.inc(route="/a", status=200)
+    gauge = Gauge("in_flight", "In flight")
+    gauge.inc()
+    gauge.inc()
+    gauge.dec()
+
+    assert counter.render()[-1] == 'requests_total{route="/a",status="200"} 2'
+    assert gauge.render()[-1] == "in_flight 1"
+
+
+def test_inference_metrics_render():
+    metrics = InferenceMetrics()
+    with metrics.time_stage("encode", "my-model"):
+        pass
+    metrics.add_collector(lambda: [Gauge("extra", "Collected when rendered")])
+
+    text = metrics.render()
+    assert 'hml_stage_duration_seconds_count{model="my-model",stage="encode"} 1' in text
+    assert "# TYPE extra gauge" in text
+    assert text.endswith("\n")
+
+
+def test_metrics_must_render_samples():
+    class Incomplete(_Metric):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete("incomplete", "Renders nothing")
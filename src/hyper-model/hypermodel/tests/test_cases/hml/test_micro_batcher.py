@@ -0,0 +1,125 @@
+import threading
+import numpy
+import pandas as pd
+import pytest
+
+from hypermodel.hml.model_container import ModelContainer
+from hypermodel.hml.prediction.micro_batcher import MicroBatcher
+
+
+class SumModel:
+    """
+    A stand in for a real model, which predicts the sum of each row and
+    remembers the size of each batch it was asked to predict
+    """
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def predict(self, matrix):
+        self.batch_sizes.append(matrix.shape[0])
+        return matrix.sum(axis=1)
+
+
+def get_test_model_container()->ModelContainer:
+    model_cont=ModelContainer(
+        name="test",
+        project_name="MyProject",
+        features_numeric=["num_feature1"],
+        features_categorical=["cat_feature1"],
+        target="target_feature",
+        services=None
+    )
+    df=pd.DataFrame({"num_feature1":[1,2],"cat_feature1":["val11","val12"]})
+    model_cont.analyze_distributions(df)
+    model_cont.bind_model(SumModel())
+    return model_cont
+
+
+def test_predict_single():
+    batcher=MicroBatcher(get_test_model_container(),max_batch_size=8,max_wait_ms=1)
+    try:
+        assert batcher.predict({"num_feature1":5,"cat_feature1":"val12"},timeout=5)==6
+    finally:
+        batcher.stop()
+
+    metrics=batcher.metrics()
+    assert metrics["requests"]==1
+    assert metrics["batches"]==1
+
+
+def test_predict_concurrent_requests_are_batched():
+    model_cont=get_test_model_container()
+    batcher=MicroBatcher(model_cont,max_batch_size=8,max_wait_ms=200)
+
+    results={}
+    def request(i):
+        results[i]=batcher.predict({"num_feature1":i,"cat_feature1":"val11"},timeout=5)
+
+    threads=[threading.Thread(target=request,args=(i,)) for i in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    batcher.stop()
+
+    # Every request gets its own result back
+    assert results=={i:i+1 for i in range(20)}
+
+    metrics=batcher.metrics()
+    assert metrics["requests"]==20
+    assert metrics["batch_size_max"]<=8
+    assert metrics["batches"]<20
+    assert sum(model_cont.model.batch_sizes)==20
+    assert metrics["queue_delay_max_ms"]>=0
+
+
+def test_predict_failure_is_isolated():
+    batcher=MicroBatcher(get_test_model_container(),max_batch_size=2,max_wait_ms=200)
+    good=batcher.submit({"num_feature1":1,"cat_feature1":"val11"})
+    bad=batcher.submit({"num_feature1":1,"cat_feature1":"unseen"},throw_on_missing=True)
+
+    assert good.result(timeout=5)==2
+    with pytest.raises(Exception, match="unseen"):
+        bad.result(timeout=5)
+    batcher.stop()
+
+
+def test_predict_already_encoded_rows():
+    model_cont=get_test_model_container()
+    batcher=MicroBatcher(model_cont,max_batch_size=2,max_wait_ms=200)
+    row=model_cont.encode_row({"num_feature1":5,"cat_feature1":"val12"})
+
+    # The features aren't encoded again, so even unseen values can't fail
+    encoded=batcher.submit({"num_feature1":1,"cat_feature1":"unseen"},throw_on_missing=True,row=row)
+    other=batcher.submit({"num_feature1":1,"cat_feature1":"val11"})
+    assert encoded.result(timeout=5)==6
+    assert other.result(timeout=5)==2
+    batcher.stop()
+
+
+def test_submit_after_stop():
+    model_cont=get_test_model_container()
+    batcher=MicroBatcher(model_cont,max_batch_size=8,max_wait_ms=1).start()
+    batcher.stop()
+
+    # Predicted on the calling thread, rather than starting the batcher again
+    assert batcher.predict({"num_feature1":5,"cat_feature1":"val12"},timeout=5)==6
+    assert batcher.start()._thread is None
+    assert batcher.metrics()["requests"]==1
+
+    # Requests submitted while stopping are still predicted
+    batcher=MicroBatcher(model_cont,max_batch_size=8,max_wait_ms=50)
+    futures=[]
+
+    def submit(i):
+        futures.append(batcher.submit({"num_feature1":i,"cat_feature1":"val11"}))
+
+    threads=[threading.Thread(target=submit,args=(i,)) for i in range(20)]
+    for t in threads:
+        t.start()
+    batcher.stop()
+    for t in threads:
+        t.join()
+    assert sorted(f.result(timeout=5) for f in futures)==[i+1 for i in range(20)]
+    assert batcher._thread is None
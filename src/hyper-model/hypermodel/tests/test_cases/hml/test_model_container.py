@@ -1,10 +1,15 @@
+import types
 import os
 
 import joblib
 import json
+import pandas as pd
+import numpy
+import scipy.sparse
 
 from hypermodel.platform.local.config import TstConfig
 from hypermodel.platform.local.services import LocalPlatformServices
+from hypermodel.hml.model_container import ModelContainer
 from hypermodel.tests.utilities import data_frame_utility, general
 import logging
 
@@ -39,6 +44,20 @@ def test_dump_distributions():
     pass
 
 
+def test_dump_distributions_before_analyzing(tmp_path):
+    config=types.SimpleNamespace(kfp_artifact_path=str(tmp_path/"artifacts"))
+    services=types.SimpleNamespace(config=config)
+    obj=ModelContainer("test","MyProject",["num_feature1"],["cat_feature1"],"target_feature",services)
+
+    # Nothing has been analyzed yet, so there is no encoder to write
+    with open(obj.dump_distributions()) as f:
+        assert json.load(f)=={"feature_uniques":None,"feature_summaries":None,"feature_encoder":None}
+
+    loaded=ModelContainer("test","MyProject",["num_feature1"],["cat_feature1"],"target_feature",services)
+    loaded.load_distributions(obj.get_local_path(obj.filename_distributions))
+    assert loaded.feature_uniques is None and loaded.feature_encoder is None
+
+
 
 def test_build_training_matrix():
     obj,attributes=general.get_instance_of_ModelContainer()
@@ -64,6 +83,71 @@ def test_build_training_matrix():
     # <To-Do> Match the excat values to be confirmed as the order of the columns 
     # is not guranteed
 
+def test_build_training_matrix_sparse():
+    df=pd.DataFrame({
+        "num_feature1":[0,2,3],
+        "num_feature2":[1.5,0.0,2.5],
+        "cat_feature1":["val11","val12","unseen"],
+    })
+    obj=ModelContainer(
+        name="test",
+        project_name="MyProject",
+        features_numeric=["num_feature1","num_feature2"],
+        features_categorical=["cat_feature1"],
+        target="target_feature",
+        services=None
+    )
+    obj.feature_uniques={"cat_feature1":["val11","val12","val13"]}
+
+    dense=obj.build_training_matrix(df)
+    matrix=obj.build_training_matrix(df,sparse=True)
+
+    assert isinstance(matrix,scipy.sparse.csr_matrix)
+    assert matrix.shape==dense.shape
+    assert (matrix.toarray()==dense.astype(float)).all()
+
+    # Every numeric value is stored, including zeros, along with one "1" per seen category
+    assert matrix.nnz==2+len(df)*2
+
+    assert obj.get_training_columns()==[
+        "cat_feature1:val11","cat_feature1:val12","cat_feature1:val13","num_feature1","num_feature2"
+    ]
+
+def test_load_distributions_feature_encoder(tmp_path):
+    obj=ModelContainer(
+        name="test",
+        project_name="MyProject",
+        features_numeric=["num_feature1"],
+        features_categorical=["cat_feature1"],
+        target="target_feature",
+        services=None
+    )
+    df=pd.DataFrame({"num_feature1":[1,2,3],"cat_feature1":["val11","val12","val11"]})
+    obj.analyze_distributions(df)
+    expected_matrix=obj.build_training_matrix(df)
+
+    # Distributions now carry the compiled encoder
+    path=os.path.join(str(tmp_path),"test-distributions.json")
+    with open(path,"w") as f:
+        json.dump({
+            "feature_uniques":obj.feature_uniques,
+            "feature_summaries":obj.feature_summaries,
+            "feature_encoder":obj.get_encoder().to_dict()
+        },f)
+
+    loaded=ModelContainer("test","MyProject",["num_feature1"],["cat_feature1"],"target_feature",None)
+    loaded.load_distributions(path)
+    assert loaded.feature_encoder is not None
+    assert loaded.get_encoder() is loaded.feature_encoder
+    assert loaded.get_training_columns()==obj.get_training_columns()
+    assert (loaded.build_training_matrix(df)==expected_matrix).all()
+
+    # Older distributions files without an encoder still load
+    with open(path,"w") as f:
+        json.dump({"feature_uniques":obj.feature_uniques,"feature_summaries":obj.feature_summaries},f)
+    loaded.load_distributions(path)
+    assert loaded.get_training_columns()==obj.get_training_columns()
+
 def create_job_lib_file():
     services=LocalPlatformServices()
     path=os.path.join(services.config.kfp_artifact_path,"test.joblib")
@@ -155,3 +239,34 @@ def test_load_distributions():
 
     def test_get_bucket_path():
         pass
+
+class ArrayModel:
+    """
+    A stand in for a model (e.g. a random forest) holding large numpy arrays
+    """
+
+    def __init__(self, weights):
+        self.weights = weights
+
+    def predict(self, matrix):
+        return matrix.dot(self.weights[: matrix.shape[1]])
+
+
+def test_load_model_mmap(tmp_path):
+    services=types.SimpleNamespace(config=types.SimpleNamespace(kfp_artifact_path=str(tmp_path)))
+    obj=ModelContainer("test","MyProject",["num_feature1"],["cat_feature1"],"target_feature",services)
+    obj.bind_model(ArrayModel(numpy.arange(100000, dtype=float)))
+    obj.dump_model()
+
+    model=obj.load_model(mmap_mode="r")
+    assert isinstance(model.weights,numpy.memmap)
+    assert model.weights[-1]==99999
+
+    # Without a mmap_mode the model is read into memory as before
+    assert not isinstance(obj.load_model().weights,numpy.memmap)
+
+    # Compressed models can't be mapped, but still load
+    obj.dump_model(compress=3)
+    model=obj.load_model(mmap_mode="r")
+    assert not isinstance(model.weights,numpy.memmap)
+    assert model.weights[-1]==99999
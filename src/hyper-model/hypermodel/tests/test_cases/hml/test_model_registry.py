@@ -0,0 +1,71 @@
+import pandas as pd
+import pytest
+
+from hypermodel.hml.model_container import ModelContainer
+from hypermodel.hml.prediction.model_registry import ModelRegistry
+
+
+def get_model_container(values=["val11", "val12"]) -> ModelContainer:
+    model_cont = ModelContainer(
+        name="test-model",
+        project_name="MyProject",
+        features_numeric=["num_feature1"],
+        features_categorical=["cat_feature1"],
+        target="target_feature",
+        services=None
+    )
+    model_cont.analyze_distributions(pd.DataFrame({"num_feature1": [1] * len(values), "cat_feature1": values}))
+    return model_cont
+
+
+def test_register_requires_a_version():
+    registry = ModelRegistry()
+    with pytest.raises(ValueError):
+        registry.register(get_model_container())
+
+    model_cont = get_model_container()
+    model_cont.reference = {"model": {"md5": "abc"}}
+    assert registry.register(model_cont) == "abc"
+    assert registry.get("test-model", "abc") is model_cont
+
+
+def test_route_by_weight():
+    registry = ModelRegistry()
+    stable, canary, shadow = get_model_container(), get_model_container(), get_model_container()
+    registry.register(stable, version="stable", weight=9)
+    registry.register(canary, version="canary", weight=1)
+    registry.register(shadow, version="shadow", weight=0)
+
+    routed = [registry.route("test-model", routing_key=f"user-{i}") for i in range(1000)]
+    assert 30 < sum(1 for m in routed if m is canary) < 200
+    assert all(m is not shadow for m in routed)
+
+    # The same key always goes to the same version
+    assert registry.route("test-model", "user-1") is registry.route("test-model", "user-1")
+
+    registry.set_weights("test-model", {"stable": 0})
+    assert registry.route("test-model") is canary
+    assert registry.route("not-a-model") is None
+
+
+def test_versions_share_encoders():
+    registry = ModelRegistry()
+    first, second, different = get_model_container(), get_model_container(), get_model_container(["val13"])
+    registry.register(first, version="1")
+    registry.register(second, version="2")
+    registry.register(different, version="3")
+
+    assert second.get_encoder() is first.get_encoder()
+    assert second.feature_summaries is first.feature_summaries
+    assert different.get_encoder() is not first.get_encoder()
+
+
+def test_replace_keeps_weight():
+    registry = ModelRegistry()
+    current, reloaded = get_model_container(), get_model_container()
+    registry.register(current, version="1", weight=3)
+    reloaded.reference = {"model": {"md5": "2"}}
+
+    assert registry.replace(current, reloaded) == "2"
+    assert registry.list_versions("test-model") == {"2": 3}
+    assert registry.get("test-model", "1") is None
@@ -0,0 +1,69 @@
+import time
+
+import numpy
+import pandas as pd
+
+from hypermodel.hml.model_container import ModelContainer
+from hypermodel.hml.prediction.prediction_cache import PredictionCache
+
+
+def get_model_container() -> ModelContainer:
+    model_cont = ModelContainer(
+        name="test-model",
+        project_name="MyProject",
+        features_numeric=["num_feature1"],
+        features_categorical=["cat_feature1"],
+        target="target_feature",
+        services=None
+    )
+    model_cont.analyze_distributions(pd.DataFrame({"num_feature1": [1, 2], "cat_feature1": ["val11", "val12"]}))
+    return model_cont
+
+
+def test_get_and_put():
+    cache = PredictionCache(max_entries=10)
+    model_cont = get_model_container()
+    vector = model_cont.encode_row({"num_feature1": 3, "cat_feature1": "val11"})
+
+    assert cache.get(model_cont, vector) == (False, None)
+    cache.put(model_cont, vector, 42)
+    # An equal vector (e.g. from another request) hits
+    assert cache.get(model_cont, vector.copy()) == (True, 42)
+    # As long as it is for the same model
+    assert cache.get(get_model_container(), vector) == (False, None)
+
+    metrics = cache.metrics()
+    assert metrics["hits"] == 1
+    assert metrics["misses"] == 2
+    assert metrics["size"] == 1
+
+
+def test_evicts_least_recently_used():
+    cache = PredictionCache(max_entries=2)
+    model_cont = get_model_container()
+    vectors = [numpy.array([[float(i)]]) for i in range(3)]
+
+    cache.put(model_cont, vectors[0], 0)
+    cache.put(model_cont, vectors[1], 1)
+    cache.get(model_cont, vectors[0])
+    cache.put(model_cont, vectors[2], 2)
+
+    assert cache.get(model_cont, vectors[0]) == (True, 0)
+    assert cache.get(model_cont, vectors[1]) == (False, None)
+    assert cache.metrics()["evictions"] == 1
+
+
+def test_expires_and_invalidates():
+    cache = PredictionCache(max_entries=10, ttl_seconds=0.01)
+    model_cont = get_model_container()
+    vector = numpy.array([[1.0, 2.0]])
+
+    cache.put(model_cont, vector, 1)
+    time.sleep(0.02)
+    assert cache.get(model_cont, vector) == (False, None)
+    assert cache.metrics()["expirations"] == 1
+
+    cache.ttl_seconds = 60
+    cache.put(model_cont, vector, 1)
+    assert cache.invalidate(model_cont) == 1
+    assert cache.get(model_cont, vector) == (False, None)
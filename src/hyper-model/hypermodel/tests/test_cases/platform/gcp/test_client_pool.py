@@ -0,0 +1,66 @@
+import os
+import types
+import threading
+
+from hypermodel.platform.gcp import client_pool
+from hypermodel.platform.gcp.client_pool import GoogleClientPool
+
+
+class CountingClient:
+    """
+    A stand in for a Google client, which counts how many have been created
+    """
+
+    created = []
+
+    def __init__(self, project=None):
+        CountingClient.created.append(self)
+        self.project = project
+        self.buckets = []
+
+    def bucket(self, name):
+        self.buckets.append(name)
+        return types.SimpleNamespace(name=name, client=self)
+
+
+def get_pool(monkeypatch) -> GoogleClientPool:
+    CountingClient.created = []
+    monkeypatch.setattr(client_pool, "storage", types.SimpleNamespace(Client=CountingClient))
+    monkeypatch.setattr(client_pool, "bigquery", types.SimpleNamespace(Client=CountingClient))
+    return GoogleClientPool(types.SimpleNamespace(gcp_project="my-project"))
+
+
+def test_clients_are_created_once(monkeypatch):
+    pool=get_pool(monkeypatch)
+    assert len(CountingClient.created)==0
+
+    clients=[]
+    threads=[threading.Thread(target=lambda: clients.append(pool.storage_client())) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(set(id(c) for c in clients))==1
+
+    assert pool.bigquery_client() is pool.bigquery_client()
+    assert pool.bigquery_client().project=="my-project"
+    assert len(CountingClient.created)==2
+
+
+def test_bucket_handles_are_reused(monkeypatch):
+    pool=get_pool(monkeypatch)
+    bucket=pool.bucket("my-bucket")
+    assert pool.bucket("my-bucket") is bucket
+    assert pool.bucket("other-bucket") is not bucket
+    assert pool.storage_client().buckets==["my-bucket","other-bucket"]
+
+
+def test_clients_are_recreated_after_fork(monkeypatch):
+    pool=get_pool(monkeypatch)
+    client=pool.storage_client()
+    bucket=pool.bucket("my-bucket")
+
+    # Pretend we are now a forked child
+    pool._pid=os.getpid()+1
+    assert pool.storage_client() is not client
+    assert pool.bucket("my-bucket") is not bucket
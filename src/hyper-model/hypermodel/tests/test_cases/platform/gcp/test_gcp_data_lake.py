@@ -0,0 +1,61 @@
+import gzip
+import io
+import types
+import pandas as pd
+
+from hypermodel.platform.gcp.data_lake import DataLake
+
+
+class UploadStream(io.BytesIO):
+    """
+    A stand in for a resumable upload, which keeps what was written once closed
+    """
+
+    def close(self):
+        self.uploaded=self.getvalue()
+        io.BytesIO.close(self)
+
+
+class StreamingBlob:
+    def __init__(self, name):
+        self.name=name
+        self.content_encoding=None
+        self.open_args=None
+        self.stream=UploadStream()
+
+    def open(self, mode, **kwargs):
+        self.open_args=(mode,kwargs)
+        return self.stream
+
+
+def get_lake():
+    blobs=dict()
+
+    def blob(name, chunk_size=None):
+        return blobs.setdefault(name,StreamingBlob(name))
+
+    bucket=types.SimpleNamespace(blob=blob)
+    clients=types.SimpleNamespace(bucket=lambda bucket_name: bucket)
+    config=types.SimpleNamespace(lake_path="lake",lake_bucket="bucket",CHUNK_SIZE=256*1024)
+    return DataLake(config,clients),blobs
+
+
+def test_upload_dataframe_streams_csv():
+    lake,blobs=get_lake()
+    df=pd.DataFrame({"a":[1,2,3],"b":["x","y","z"]})
+
+    assert lake.upload_dataframe("bucket","artifacts/df.csv",df)=="artifacts/df.csv"
+    blob=blobs["lake/artifacts/df.csv"]
+    assert blob.open_args[0]=="wb"
+    assert blob.content_encoding is None
+    assert blob.stream.uploaded==df.to_csv(sep="\t").encode("utf-8")
+
+
+def test_upload_dataframe_compressed():
+    lake,blobs=get_lake()
+    df=pd.DataFrame({"a":[1,2,3],"b":["x","y","z"]})
+
+    lake.upload_dataframe("bucket","artifacts/df.csv",df,compress=True)
+    blob=blobs["lake/artifacts/df.csv"]
+    assert blob.content_encoding=="gzip"
+    assert gzip.decompress(blob.stream.uploaded)==df.to_csv(sep="\t").encode("utf-8")
@@ -0,0 +1,149 @@
+import types
+import threading
+import time
+import numpy
+import pandas as pd
+import pytest
+
+from hypermodel.platform.gcp.data_warehouse import DataWarehouse
+
+
+class LocalReadClient:
+    """
+    A local stand in for the BigQuery Storage Read API, serving a DataFrame
+    as if it were a table, split across several streams of Arrow record batches
+    """
+
+    def __init__(self, tables):
+        self.tables=tables
+        self.requests=[]
+        self.reading_threads=set()
+
+    def create_read_session(self, request):
+        self.requests.append(request)
+        table=request["read_session"]["table"].split("/tables/")[1]
+        options=request["read_session"]["read_options"]
+
+        frame=self.tables[table]
+        if "row_restriction" in options:
+            frame=frame.query(options["row_restriction"])
+        if "selected_fields" in options:
+            frame=frame[[c for c in frame.columns if c in options["selected_fields"]]]
+
+        stream_count=min(request["max_stream_count"],len(frame))
+        parts=numpy.array_split(numpy.arange(len(frame)),stream_count) if stream_count>0 else []
+        streams=[types.SimpleNamespace(name=f"stream-{i}",frame=frame.iloc[p]) for i,p in enumerate(parts)]
+        return types.SimpleNamespace(streams=streams)
+
+    def read_rows(self, name):
+        client=self
+
+        class Reader:
+            def to_arrow(self, session):
+                import pyarrow
+
+                client.reading_threads.add(threading.get_ident())
+                time.sleep(0.05)
+                frame=next(s.frame for s in session.streams if s.name==name)
+                return pyarrow.Table.from_pandas(frame,preserve_index=False)
+
+        return Reader()
+
+
+def get_warehouse(read_client):
+    config=types.SimpleNamespace(gcp_project="my-project",warehouse_storage_api=True)
+    clients=types.SimpleNamespace(bigquery_storage_client=lambda: read_client)
+    return DataWarehouse(config,clients)
+
+
+def test_read_table():
+    pytest.importorskip("pyarrow")
+
+    frame=pd.DataFrame({"id":range(100),"age":[i%50 for i in range(100)],"name":[f"n{i}" for i in range(100)]})
+    read_client=LocalReadClient({"people":frame})
+    warehouse=get_warehouse(read_client)
+
+    result=warehouse.read_table("crm","people",columns=["name","id"],row_filter="age > 40",max_streams=4)
+    request=read_client.requests[0]
+    assert request["parent"]=="projects/my-project"
+    assert request["read_session"]["table"]=="projects/my-project/datasets/crm/tables/people"
+    assert request["read_session"]["data_format"]=="ARROW"
+
+    expected=frame[frame.age>40][["name","id"]].reset_index(drop=True)
+    pd.testing.assert_frame_equal(result,expected)
+    assert len(read_client.reading_threads)>1
+
+    # With the storage api enabled, whole tables are read through it too
+    assert len(warehouse.dataframe_from_table("crm","people"))==100
+
+
+def test_read_table_without_rows():
+    pytest.importorskip("pyarrow")
+
+    frame=pd.DataFrame({"id":range(10)})
+    warehouse=get_warehouse(LocalReadClient({"people":frame}))
+    result=warehouse.read_table("crm","people",columns=["id"],row_filter="id > 100")
+    assert list(result.columns)==["id"] and len(result)==0
+
+
+class PagedRows:
+    """
+    A stand in for a BigQuery `RowIterator`, returning a DataFrame a page at a time
+    """
+
+    def __init__(self, frame, page_size):
+        self.frame=frame
+        self.page_size=page_size
+
+    def to_dataframe_iterable(self):
+        for start in range(0,len(self.frame),self.page_size):
+            yield self.frame.iloc[start:start+self.page_size]
+
+
+def test_iter_dataframes():
+    frame=pd.DataFrame({"id":range(7)})
+    listed=[]
+
+    def list_rows(table_id, page_size):
+        listed.append(table_id)
+        return PagedRows(frame,page_size)
+
+    query_job=types.SimpleNamespace(
+        result=lambda page_size: PagedRows(frame,page_size),
+        total_bytes_processed=None,
+        state="DONE"
+    )
+    client=types.SimpleNamespace(query=lambda query: query_job,list_rows=list_rows)
+    config=types.SimpleNamespace(gcp_project="my-project",warehouse_storage_api=False)
+    warehouse=DataWarehouse(config,types.SimpleNamespace(bigquery_client=lambda: client))
+
+    assert [len(f) for f in warehouse.iter_dataframes("SELECT id FROM t",chunk_rows=3)]==[3,3,1]
+    assert [len(f) for f in warehouse.iter_dataframes_from_table("crm","people",chunk_rows=5)]==[5,2]
+    assert listed==["my-project.crm.people"]
+
+
+def test_table_version():
+    import datetime
+    from google.api_core.exceptions import NotFound
+
+    modified=datetime.datetime(2020,1,1,tzinfo=datetime.timezone.utc)
+    tables={
+        "crashed.crashes_raw":types.SimpleNamespace(table_type="TABLE",streaming_buffer=None,modified=modified,num_rows=10,num_bytes=100),
+        "crashed.crashes_view":types.SimpleNamespace(table_type="VIEW",streaming_buffer=None,modified=modified,num_rows=None,num_bytes=None),
+        "crashed.crashes_live":types.SimpleNamespace(table_type="TABLE",streaming_buffer=object(),modified=modified,num_rows=10,num_bytes=100),
+    }
+
+    def get_table(name):
+        if name not in tables:
+            raise NotFound(name)
+        return tables[name]
+
+    config=types.SimpleNamespace(gcp_project="my-project",warehouse_storage_api=False)
+    clients=types.SimpleNamespace(bigquery_client=lambda: types.SimpleNamespace(get_table=get_table))
+    warehouse=DataWarehouse(config,clients)
+
+    assert warehouse.table_version("crashed","crashes_raw")=="2020-01-01T00:00:00+00:00/10/100"
+    assert warehouse.table_version("crashed","crashes_view") is None
+    assert warehouse.table_version("crashed","crashes_live") is None
+    assert warehouse.table_version("crashed","missing") is None
+    assert warehouse.table_version(None,"crashes_raw") is None
@@ -171,4 +171,87 @@ def test_table_schema():
     expectedTable=SqlTable(table2,table2,testDataColumns)
     
     # see if all column count match
-    assert  expectedTable==retVal
\ No newline at end of file
+    assert  expectedTable==retVal
+
+def test_iter_dataframes(tmp_path):
+    import types
+
+    db=str(tmp_path/"chunks.db")
+    connection=sqlite3.connect(db)
+    pd.DataFrame({"id":range(25),"value":[i*2 for i in range(25)]}).to_sql("numbers",connection,index=False)
+    connection.close()
+
+    classObj=SqliteDataWarehouse(types.SimpleNamespace(default_sql_lite_db_file=db))
+
+    chunks=list(classObj.iter_dataframes_from_table(db,"numbers",chunk_rows=10))
+    assert [len(c) for c in chunks]==[10,10,5]
+    assert pd.concat(chunks)["value"].sum()==sum(i*2 for i in range(25))
+
+    chunks=list(classObj.iter_dataframes("SELECT id FROM numbers WHERE id >= 20",chunk_rows=3))
+    assert [c["id"].tolist() for c in chunks]==[[20,21,22],[23,24]]
+
+
+def write_passengers_csv(path)->str:
+    pd.DataFrame({
+        "Survived":[0,1,1,0,1],
+        "Name":["Mr. Owen","Mrs. \"Florence\"",None,"Miss. Laina","Mr. William"],
+        "Siblings/Spouses Aboard":[1,1,0,0,2],
+        "Fare":[7.25,71.2833,None,8.05,53.1],
+    }).to_csv(path,index=False)
+    return path
+
+
+def test_bulk_import_csv(tmp_path):
+    import types
+
+    db=str(tmp_path/"bulk.db")
+    csv=write_passengers_csv(str(tmp_path/"passengers.csv"))
+
+    # What `to_sql` makes of the csv, on a connection of its own
+    connection=sqlite3.connect(db)
+    pd.read_csv(csv).to_sql("pandas_table",connection)
+    connection.close()
+
+    classObj=SqliteDataWarehouse(types.SimpleNamespace(default_sql_lite_db_file=db))
+    assert classObj.import_csv(csv,db,"default_table") is True
+    assert classObj.import_csv(csv,db,"bulk_table",bulk=True,chunk_rows=2) is True
+    # Loading again replaces the table
+    assert classObj.import_csv(csv,db,"bulk_table",bulk=True,chunk_rows=2) is True
+
+    # Both loads match the pandas round-trip, row for row and type for type
+    expected=classObj.dataframe_from_table(db,"pandas_table")
+    pd.testing.assert_frame_equal(expected,classObj.dataframe_from_table(db,"default_table"))
+    pd.testing.assert_frame_equal(expected,classObj.dataframe_from_table(db,"bulk_table"))
+    with classObj.pool.connection(db) as connection:
+        schemas=dict(connection.execute("SELECT name, sql FROM sqlite_master WHERE type = 'table'").fetchall())
+    assert schemas["default_table"]==schemas["pandas_table"].replace('"pandas_table"','"default_table"')
+    classObj.pool.close()
+
+
+def test_import_csv_is_one_transaction(tmp_path):
+    import types
+    from hypermodel.platform.local.sqlite_pool import SqliteConnectionPool
+
+    statements=[]
+
+    class TracingPool(SqliteConnectionPool):
+        def _open(self, key):
+            connection=SqliteConnectionPool._open(self,key)
+            connection.set_trace_callback(statements.append)
+            return connection
+
+    db=str(tmp_path/"traced.db")
+    csv=write_passengers_csv(str(tmp_path/"passengers.csv"))
+    classObj=SqliteDataWarehouse(types.SimpleNamespace(default_sql_lite_db_file=db),TracingPool())
+
+    for kwargs in [dict(),dict(bulk=True,chunk_rows=2)]:
+        del statements[:]
+        assert classObj.import_csv(csv,db,"passengers",**kwargs) is True
+
+        # Every statement (the rows included) is in the single transaction
+        executed=[s for s in statements if not s.startswith("PRAGMA")]
+        assert executed[0]=="BEGIN IMMEDIATE"
+        assert executed[-1]=="COMMIT"
+        assert [s for s in executed if s in ("BEGIN IMMEDIATE","COMMIT")]==["BEGIN IMMEDIATE","COMMIT"]
+        assert len([s for s in executed if s.startswith("INSERT")])==5
+    classObj.pool.close()
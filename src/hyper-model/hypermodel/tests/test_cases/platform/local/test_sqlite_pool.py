@@ -0,0 +1,88 @@
+import os
+import sqlite3
+import threading
+import types
+
+import pandas as pd
+import pytest
+
+from hypermodel.platform.local.data_warehouse import SqliteDataWarehouse
+from hypermodel.platform.local.sqlite_pool import SqliteConnectionPool
+
+
+def test_pool_reuses_tuned_connections(tmp_path):
+    db = str(tmp_path / "pool.db")
+    pool = SqliteConnectionPool(max_idle=1)
+
+    with pool.connection(db) as connection:
+        assert connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert connection.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+        first = connection
+
+    with pool.connection(db) as connection:
+        assert connection is first
+        # Only `max_idle` connections are kept once returned
+        with pool.connection(db) as other:
+            assert other is not first
+
+    # Replacing the file means the pooled connection can't be reused
+    pool.close(db)
+    with pool.connection(db) as connection:
+        held = connection
+    os.remove(db)
+    with pool.connection(db) as connection:
+        assert connection is not held
+    pool.close()
+
+
+def test_pool_transactions(tmp_path):
+    db = str(tmp_path / "pool.db")
+    pool = SqliteConnectionPool()
+
+    with pool.transaction(db) as connection:
+        connection.execute("CREATE TABLE t (a INTEGER)")
+        connection.execute("INSERT INTO t VALUES (1)")
+
+    with pytest.raises(ValueError):
+        with pool.transaction(db) as connection:
+            connection.execute("INSERT INTO t VALUES (2)")
+            raise ValueError("rolled back")
+
+    with pool.connection(db) as connection:
+        assert not connection.in_transaction
+        assert connection.execute("SELECT a FROM t").fetchall() == [(1,)]
+    pool.close()
+
+
+def test_warehouse_shares_pool_across_threads(tmp_path):
+    db = str(tmp_path / "warehouse.db")
+    csv = str(tmp_path / "values.csv")
+    pd.DataFrame({"a": range(10)}).to_csv(csv, index=False)
+
+    warehouse = SqliteDataWarehouse(types.SimpleNamespace(default_sql_lite_db_file=db))
+    assert warehouse.import_csv(csv, db, "source") is True
+    assert warehouse.select_into("SELECT a FROM source WHERE a >= 5", db, "selected") is True
+    # `select_into` replaces the table, and its results are committed
+    assert warehouse.select_into("SELECT a FROM source WHERE a >= 8", db, "selected") is True
+    # A separate connection only sees committed data
+    connection = sqlite3.connect(db)
+    assert connection.execute("SELECT count(*) FROM selected").fetchone()[0] == 2
+    connection.close()
+
+    errors = []
+
+    def read():
+        try:
+            for _ in range(20):
+                assert list(warehouse.dataframe_from_query("SELECT a FROM source")["a"]) == list(range(10))
+        except Exception as ex:
+            errors.append(ex)
+
+    threads = [threading.Thread(target=read) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    warehouse.pool.close()
@@ -0,0 +1,129 @@
+import os
+import sqlite3
+import types
+
+import pandas as pd
+import pytest
+
+from hypermodel.platform.abstract.cached_data_warehouse import CachedDataWarehouse, is_volatile, normalize_sql, referenced_tables
+from hypermodel.platform.local.data_warehouse import SqliteDataWarehouse
+
+
+class CountingWarehouse(SqliteDataWarehouse):
+    def __init__(self, db: str):
+        SqliteDataWarehouse.__init__(self, types.SimpleNamespace(default_sql_lite_db_file=db))
+        self.queries = 0
+
+    def dataframe_from_query(self, query: str) -> pd.DataFrame:
+        self.queries += 1
+        return SqliteDataWarehouse.dataframe_from_query(self, query)
+
+
+def build_warehouse(tmp_path) -> CountingWarehouse:
+    db = str(tmp_path / "warehouse.db")
+    connection = sqlite3.connect(db)
+    pd.DataFrame({"id": range(100), "speed_zone": [f"zone-{i % 4}" for i in range(100)]}).to_sql(
+        "crashes_raw", connection, index=False
+    )
+    connection.execute("CREATE VIEW crashes_view AS SELECT * FROM crashes_raw")
+    connection.commit()
+    connection.close()
+    return CountingWarehouse(db)
+
+
+def test_normalize_sql():
+    query = """
+        -- The raw extract
+        SELECT id,   speed_zone  /* all of them */
+        FROM crashed.crashes_raw
+        WHERE speed_zone = 'Zone  1';
+    """
+    assert normalize_sql(query) == "SELECT id, speed_zone FROM crashed.crashes_raw WHERE speed_zone = 'Zone  1'"
+
+    query = "WITH recent AS (SELECT * FROM crashed.crashes_raw) SELECT * FROM recent r, `project.crashed.lookup` JOIN zones z ON 1=1"
+    assert referenced_tables(query) == [("crashed", "crashes_raw"), ("project.crashed", "lookup"), (None, "zones")]
+
+
+def test_cached_query_results(tmp_path):
+    warehouse = build_warehouse(tmp_path)
+    cache = CachedDataWarehouse(warehouse, str(tmp_path / "cache"), 10 * 1024 * 1024, format="pickle")
+
+    expected = warehouse.dataframe_from_query("SELECT * FROM crashes_raw WHERE id < 50")
+    warehouse.queries = 0
+
+    # Formatting differences don't matter
+    first = cache.dataframe_from_query("SELECT * FROM crashes_raw WHERE id < 50")
+    second = cache.dataframe_from_query("SELECT *\n  FROM crashes_raw\n  WHERE id < 50;")
+    assert warehouse.queries == 1
+    pd.testing.assert_frame_equal(first, expected)
+    pd.testing.assert_frame_equal(second, expected)
+
+    # Changing the table means querying again
+    with warehouse.pool.transaction(warehouse.config.default_sql_lite_db_file) as connection:
+        connection.execute("DELETE FROM crashes_raw WHERE id >= 10")
+    assert len(cache.dataframe_from_query("SELECT * FROM crashes_raw WHERE id < 50")) == 10
+    assert warehouse.queries == 2
+
+    # Views (and unknown tables) are never cached
+    cache.dataframe_from_query("SELECT * FROM crashes_view")
+    cache.dataframe_from_query("SELECT * FROM crashes_view")
+    assert warehouse.queries == 4
+
+    # Everything else is passed through to the warehouse
+    assert len(cache.dataframe_from_table(warehouse.config.default_sql_lite_db_file, "crashes_raw")) == 10
+    warehouse.pool.close()
+
+
+def test_volatile_queries_are_not_cached(tmp_path):
+    assert is_volatile("SELECT a, strftime('%Y-%m-%d %H:%M:%f', 'now'), random() FROM t")
+    assert is_volatile("SELECT * FROM t WHERE created > CURRENT_DATE")
+    assert is_volatile("SELECT RAND ( ) FROM t")
+    assert not is_volatile("SELECT current_balance, 'rand()' AS label FROM t -- now()")
+
+    warehouse = build_warehouse(tmp_path)
+    cache = CachedDataWarehouse(warehouse, str(tmp_path / "cache"), 10 * 1024 * 1024, format="pickle")
+
+    query = "SELECT id, strftime('%Y-%m-%d %H:%M:%f', 'now') AS queried, random() AS r FROM crashes_raw"
+    first = cache.dataframe_from_query(query)
+    second = cache.dataframe_from_query(query)
+    assert warehouse.queries == 2
+    assert cache.size() == 0
+    assert not first["r"].equals(second["r"])
+    warehouse.pool.close()
+
+
+def test_cache_eviction(tmp_path):
+    warehouse = build_warehouse(tmp_path)
+    cache = CachedDataWarehouse(warehouse, str(tmp_path / "cache"), 10 * 1024 * 1024, format="pickle")
+
+    queries = [f"SELECT * FROM crashes_raw WHERE id >= {i}" for i in range(3)]
+    cache.dataframe_from_query(queries[0])
+    entry_size = cache.size()
+
+    # Room for two results, so the least recently used is evicted
+    cache.max_bytes = int(entry_size * 2.5)
+    cache.dataframe_from_query(queries[1])
+    os.utime(cache._entry_path(cache.cache_key(queries[0])), (200, 200))
+    os.utime(cache._entry_path(cache.cache_key(queries[1])), (100, 100))
+    cache.dataframe_from_query(queries[2])
+
+    assert cache.size() <= cache.max_bytes
+    assert cache.get(cache.cache_key(queries[0])) is not None
+    assert cache.get(cache.cache_key(queries[1])) is None
+
+    cache.clear()
+    assert cache.size() == 0
+    warehouse.pool.close()
+
+
+def test_parquet_results(tmp_path):
+    pytest.importorskip("pyarrow")
+
+    warehouse = build_warehouse(tmp_path)
+    cache = CachedDataWarehouse(warehouse, str(tmp_path / "cache"), 10 * 1024 * 1024)
+
+    first = cache.dataframe_from_query("SELECT * FROM crashes_raw")
+    second = cache.dataframe_from_query("SELECT * FROM crashes_raw")
+    assert warehouse.queries == 1
+    pd.testing.assert_frame_equal(first, second, check_dtype=False)
+    warehouse.pool.close()
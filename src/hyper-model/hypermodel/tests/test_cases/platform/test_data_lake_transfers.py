@@ -0,0 +1,74 @@
+import os
+import shutil
+import threading
+import time
+
+from hypermodel.platform.abstract.data_lake import DataLakeBase
+
+
+class FolderLake(DataLakeBase):
+    """
+    A data lake in a local folder, which records how many transfers run at once
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.running = 0
+        self.most_running = 0
+        self._lock = threading.Lock()
+
+    def _copy(self, from_path, to_path):
+        with self._lock:
+            self.running += 1
+            self.most_running = max(self.most_running, self.running)
+        try:
+            time.sleep(0.05)
+            shutil.copyfile(from_path, to_path)
+        finally:
+            with self._lock:
+                self.running -= 1
+
+    def upload(self, bucket_name, bucket_path, local_path):
+        self._copy(local_path, os.path.join(self.path, bucket_name, bucket_path))
+        return bucket_path
+
+    def download(self, bucket_name, bucket_path, destination_local_path):
+        self._copy(os.path.join(self.path, bucket_name, bucket_path), destination_local_path)
+        return True
+
+    def upload_string(self, bucket_name, bucket_path, string):
+        pass
+
+    def upload_dataframe(self, bucket_name, bucket_path, dataframe):
+        pass
+
+    def download_string(self, bucket_name, bucket_path):
+        pass
+
+    def download_csv(self, bucket_name, bucket_path):
+        pass
+
+
+def test_upload_and_download_many(tmp_path):
+    lake=FolderLake(str(tmp_path))
+    (tmp_path/"bucket").mkdir()
+
+    uploads=[]
+    for i in range(6):
+        local_path=tmp_path/f"local-{i}.txt"
+        local_path.write_text(f"file {i}")
+        uploads.append((f"file-{i}.txt",str(local_path)))
+
+    results=lake.upload_many("bucket",uploads,max_workers=3)
+    assert all(r.success for r in results)
+    assert [r.bucket_path for r in results]==[b for b,_ in uploads]
+    assert lake.most_running==3
+
+    downloads=[(f"file-{i}.txt",str(tmp_path/f"downloaded-{i}.txt")) for i in range(6)]
+    downloads.append(("missing.txt",str(tmp_path/"missing.txt")))
+    results=lake.download_many("bucket",downloads)
+
+    # Each transfer succeeds or fails on its own
+    assert [r.success for r in results]==[True]*6+[False]
+    assert isinstance(results[-1].error,FileNotFoundError)
+    assert (tmp_path/"downloaded-4.txt").read_text()=="file 4"
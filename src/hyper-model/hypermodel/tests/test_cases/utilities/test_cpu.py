@@ -0,0 +1,36 @@
+import os
+
+from hypermodel.utilities.cpu import get_cpu_limit, CPU_LIMIT_ENV
+
+
+def write_file(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+
+
+def test_get_cpu_limit_from_env(monkeypatch, tmp_path):
+    monkeypatch.setenv(CPU_LIMIT_ENV, "3")
+    assert get_cpu_limit(str(tmp_path)) == 3
+
+    monkeypatch.setenv(CPU_LIMIT_ENV, "1500m")
+    assert get_cpu_limit(str(tmp_path)) == 2
+
+
+def test_get_cpu_limit_from_cgroup_v2(monkeypatch, tmp_path):
+    monkeypatch.delenv(CPU_LIMIT_ENV, raising=False)
+    write_file(str(tmp_path / "cpu.max"), "250000 100000\n")
+    assert get_cpu_limit(str(tmp_path)) == 3
+
+
+def test_get_cpu_limit_from_cgroup_v1(monkeypatch, tmp_path):
+    monkeypatch.delenv(CPU_LIMIT_ENV, raising=False)
+    write_file(str(tmp_path / "cpu" / "cpu.cfs_quota_us"), "200000\n")
+    write_file(str(tmp_path / "cpu" / "cpu.cfs_period_us"), "100000\n")
+    assert get_cpu_limit(str(tmp_path)) == 2
+
+
+def test_get_cpu_limit_unlimited(monkeypatch, tmp_path):
+    monkeypatch.delenv(CPU_LIMIT_ENV, raising=False)
+    write_file(str(tmp_path / "cpu.max"), "max 100000\n")
+    assert get_cpu_limit(str(tmp_path)) == (os.cpu_count() or 1)
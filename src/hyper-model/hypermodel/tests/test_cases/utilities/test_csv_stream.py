@@ -0,0 +1,36 @@
+import gzip
+import io
+import pandas as pd
+
+from hypermodel.utilities.csv_stream import write_csv_stream
+
+
+def get_test_data_frame():
+    return pd.DataFrame({"num_feature1":range(25),"cat_feature1":[f"val{i%3}" for i in range(25)]})
+
+
+def test_write_csv_stream_matches_to_csv():
+    df=get_test_data_frame()
+    stream=io.BytesIO()
+    written=write_csv_stream(df,stream,chunk_rows=7)
+
+    expected=df.to_csv(sep="\t").encode("utf-8")
+    assert stream.getvalue()==expected
+    assert written==len(expected)
+
+
+def test_write_csv_stream_compressed():
+    df=get_test_data_frame()
+    stream=io.BytesIO()
+    write_csv_stream(df,stream,sep=",",compress=True,chunk_rows=10)
+
+    # The stream is left open for the caller
+    assert not stream.closed
+    assert gzip.decompress(stream.getvalue())==df.to_csv(sep=",").encode("utf-8")
+
+
+def test_write_csv_stream_empty_frame():
+    df=get_test_data_frame().iloc[0:0]
+    stream=io.BytesIO()
+    write_csv_stream(df,stream)
+    assert stream.getvalue()==df.to_csv(sep="\t").encode("utf-8")
@@ -0,0 +1,67 @@
+"""
+    Utility functions for working out how much CPU this process may use,
+    taking into account container (cgroup) CPU limits
+"""
+import math
+import os
+from typing import Optional
+
+
+# Set on inference containers from their `limits.cpu` via the downward API
+CPU_LIMIT_ENV = "HM_CPU_LIMIT"
+
+
+def get_cpu_limit(cgroup_root: str = "/sys/fs/cgroup") -> int:
+    """
+    Get the number of whole CPUs this process may use, preferring (in order) the
+    `HM_CPU_LIMIT` environment variable, the cgroup CPU quota (v2 then v1), and
+    finally the number of CPUs on the machine.  Fractional limits are rounded up.
+
+    Args:
+        cgroup_root (str): The path the cgroup filesystem is mounted at
+
+    Returns:
+        The number of CPUs available, which is always at least 1
+    """
+    limit = _cpu_limit_from_env()
+    if limit is None:
+        limit = _cpu_limit_from_cgroup(cgroup_root)
+    if limit is None:
+        limit = os.cpu_count() or 1
+
+    return max(1, int(math.ceil(limit)))
+
+
+def _cpu_limit_from_env() -> Optional[float]:
+    value = os.environ.get(CPU_LIMIT_ENV, "").strip()
+    if value == "":
+        return None
+    # Kubernetes quantities may be given in millicores (e.g. "1500m")
+    if value.endswith("m"):
+        return float(value[:-1]) / 1000
+    return float(value)
+
+
+def _cpu_limit_from_cgroup(cgroup_root: str) -> Optional[float]:
+    # cgroup v2: "<quota> <period>", where quota is "max" when unlimited
+    cpu_max = _read_file(os.path.join(cgroup_root, "cpu.max"))
+    if cpu_max is not None:
+        quota, period = cpu_max.split()[:2]
+        if quota == "max":
+            return None
+        return int(quota) / int(period)
+
+    # cgroup v1: a quota of -1 means unlimited
+    quota = _read_file(os.path.join(cgroup_root, "cpu", "cpu.cfs_quota_us"))
+    period = _read_file(os.path.join(cgroup_root, "cpu", "cpu.cfs_period_us"))
+    if quota is None or period is None or int(quota) <= 0:
+        return None
+    return int(quota) / int(period)
+
+
+def _read_file(path: str) -> Optional[str]:
+    try:
+        with open(path, "r") as f:
+            return f.read().strip()
+    except (OSError, IOError):
+        return None
@@ -0,0 +1,50 @@
+import gzip
+import io
+
+import pandas as pd
+
+from typing import BinaryIO
+
+
+# The number of rows serialized at a time, bounding the memory used for the text of each chunk
+DEFAULT_CHUNK_ROWS = 100000
+
+
+def write_csv_stream(
+    dataframe: pd.DataFrame, stream: BinaryIO, sep: str = "\t", compress: bool = False, chunk_rows: int = DEFAULT_CHUNK_ROWS
+) -> int:
+    """
+    Write `dataframe` as CSV (as per `DataFrame.to_csv`) to a binary stream (e.g. an
+    upload to the lake) a chunk of rows at a time, so that neither a temporary file nor
+    the text of the whole frame is needed.
+
+    Args:
+        dataframe (pd.DataFrame): The frame to write
+        stream (BinaryIO): The writable binary stream to write to
+        sep (str): The field delimiter
+        compress (bool): Gzip the CSV as it is written
+        chunk_rows (int): The number of rows to serialize at a time
+
+    Returns:
+        The number of (uncompressed) bytes of CSV written
+    """
+    if chunk_rows < 1:
+        raise ValueError("Parameter: `chunk_rows` must be at least 1")
+
+    output = gzip.GzipFile(fileobj=stream, mode="wb") if compress else stream
+    written = 0
+    try:
+        # The header is written even when there are no rows, as `to_csv` would
+        starts = range(0, len(dataframe), chunk_rows) if len(dataframe) > 0 else [0]
+        for i, start in enumerate(starts):
+            buffer = io.StringIO()
+            dataframe.iloc[start : start + chunk_rows].to_csv(buffer, sep=sep, header=(i == 0))
+            data = buffer.getvalue().encode("utf-8")
+            output.write(data)
+            written += len(data)
+    finally:
+        if compress:
+            # Only ends the gzip stream, leaving `stream` open
+            output.close()
+
+    return written
@@ -20,6 +20,7 @@ REQUIRES = [
     "click",
     "kfp",
     "pandas",
+    "scipy",
     "joblib",
     "google-cloud",
     "google-cloud-bigquery",
@@ -30,10 +31,18 @@ REQUIRES = [
     # API Serving
     "flask",
     "waitress",
+    "uvicorn",
+    "msgpack",
     "sphinx_rtd_theme",
     "kubernetes>=8.0.0, <=9.0.0",
     "pytest",
 ]
+EXTRAS = {
+    # Fast reads of whole tables via the BigQuery Storage Read API (see `DataWarehouse.read_table`)
+    "bigquery-storage": ["google-cloud-bigquery-storage", "pyarrow"],
+    # Caching query results as parquet (see `CachedDataWarehouse`)
+    "query-cache": ["pyarrow"],
+}
 
 setup(
     name=NAME,
@@ -41,6 +50,7 @@ setup(
     description="Hyper Model provides functionality to support MLOps",
     author="Growing Data",
     install_requires=REQUIRES,
+    extras_require=EXTRAS,
     packages=find_packages(),
     classifiers=[
         "Intended Audience :: Developers",